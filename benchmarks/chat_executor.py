@@ -0,0 +1,84 @@
+"""Throughput of the conversation handler with updates handled inline or on a per-chat executor.
+
+Every update is a command whose handler waits a few milliseconds, like a bot
+that sends a message per state transition. Updates of each chat must be
+handled in the order they arrived.
+
+    python -m benchmarks.chat_executor [chats] [updates per chat]
+"""
+import collections
+import datetime
+import sys
+import threading
+import time
+
+import telegram
+from telegram.ext import CallbackContext, CommandHandler, Dispatcher
+
+from bot.telegram_extensions.chat_executor import ChatExecutor
+from bot.telegram_extensions.handlers.conversation_handler import ConversationHandler
+
+
+HANDLER_SECONDS = 0.005
+
+
+def make_update(update_id, chat_id, command, bot):
+    chat = telegram.Chat(chat_id, telegram.Chat.GROUP)
+    user = telegram.User(chat_id, 'user', False)
+    message = telegram.Message(
+        update_id, datetime.datetime.now(), chat, from_user=user, text=command, bot=bot,
+        entities=[telegram.MessageEntity(telegram.MessageEntity.BOT_COMMAND, 0, len(command))],
+    )
+    return telegram.Update(update_id, message=message)
+
+
+def measure(name, executor, chats, updates_per_chat):
+    bot = telegram.Bot('123:token')
+    bot.bot = telegram.User(1, 'bot', True, username='bot')
+    bot._commands = []
+    dispatcher = Dispatcher(bot, None, workers=1)
+    handled = collections.defaultdict(list)
+    done = threading.Semaphore(0)
+
+    def step(update, context):
+        time.sleep(HANDLER_SECONDS)
+        handled[update.effective_chat.id].append(update.update_id)
+        done.release()
+        return 'STEP'
+
+    handler = ConversationHandler(
+        entry_points=[CommandHandler('step', step)],
+        states={'STEP': [CommandHandler('step', step)]},
+        fallbacks=[],
+        allow_reentry=True,
+        executor=executor,
+    )
+    updates = [
+        make_update(update_idx * chats + chat_idx, -chat_idx - 1, '/step', bot)
+        for update_idx in range(updates_per_chat) for chat_idx in range(chats)
+    ]
+
+    started = time.perf_counter()
+    for update in updates:
+        check_result = handler.check_update(update)
+        handler.handle_update(update, dispatcher, check_result, CallbackContext.from_update(update, dispatcher))
+    for _ in updates:
+        done.acquire()
+    seconds = time.perf_counter() - started
+    if executor is not None:
+        executor.shutdown()
+
+    in_order = all(update_ids == sorted(update_ids) for update_ids in handled.values())
+    print(f'{name:>12}: {len(updates) / seconds:,.0f} updates/sec, in order: {in_order}')
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    updates_per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    measure('inline', None, chats, updates_per_chat)
+    for workers in (1, 4, 16, 64):
+        measure(f'{workers} workers', ChatExecutor(workers), chats, updates_per_chat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Handler latency and old state mix-ups of conversation context tracking under concurrent updates.
+
+Every chat alternates between two states, so each update knows which old
+state it must see. The legacy tracking took the handler-wide lock on every
+update and kept the old state in shared `bot_data`.
+
+    python -m benchmarks.conversation_context [chats] [updates per chat]
+"""
+import statistics
+import sys
+import threading
+import time
+
+import telegram
+from telegram.ext import CallbackContext, CommandHandler, Dispatcher
+
+from bot.telegram_extensions.conversation_context import ConversationContext
+from bot.telegram_extensions.handlers.conversation_handler import ConversationHandler
+
+from benchmarks.chat_executor import make_update
+
+
+class LegacyConversationHandler(ConversationHandler):
+    def collect_additional_context(self, context, update, dispatcher, check_result):
+        conversation_key, _, _ = check_result
+        with self._conversations_lock:
+            state = self.conversations.get(conversation_key)
+        context.bot_data['conversation_context'] = ConversationContext(old_state=state, key=conversation_key)
+        context.conversation_context = context.bot_data['conversation_context']
+
+    def update_state(self, new_state, key, update, context):
+        context.conversation_context = context.bot_data['conversation_context']
+        super(LegacyConversationHandler, self).update_state(new_state, key, update, context)
+
+
+def measure(name, handler_class, chats, updates_per_chat):
+    bot = telegram.Bot('123:token')
+    bot.bot = telegram.User(1, 'bot', True, username='bot')
+    bot._commands = []
+    dispatcher = Dispatcher(bot, None, workers=1)
+    mix_ups = 0
+    mix_ups_lock = threading.Lock()
+
+    def step(update, context):
+        time.sleep(0)
+        return 'ODD' if update.update_id % 2 == 0 else 'EVEN'
+
+    def entry(update, context):
+        nonlocal mix_ups
+        expected = None if update.update_id < chats * 2 else ('ODD' if update.update_id % 2 else 'EVEN')
+        if context.conversation_context.old_state != expected:
+            with mix_ups_lock:
+                mix_ups += 1
+
+    handler = handler_class(
+        entry_points=[CommandHandler('step', step)],
+        states={'ODD': [CommandHandler('step', step)], 'EVEN': [CommandHandler('step', step)]},
+        state_entry_callbacks={'ODD': entry, 'EVEN': entry},
+        fallbacks=[],
+        allow_reentry=True,
+    )
+    latencies = []
+
+    def chat(chat_idx):
+        chat_latencies = []
+        for update_idx in range(updates_per_chat):
+            update = make_update((update_idx * chats + chat_idx) * 2 + update_idx % 2, -chat_idx - 1, '/step', bot)
+            started = time.perf_counter()
+            check_result = handler.check_update(update)
+            handler.handle_update(update, dispatcher, check_result, CallbackContext.from_update(update, dispatcher))
+            chat_latencies.append(time.perf_counter() - started)
+        latencies.extend(chat_latencies)
+
+    threads = [threading.Thread(target=chat, args=(chat_idx,)) for chat_idx in range(chats)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    print(f'{name:>8}: {len(latencies) / seconds:,.0f} updates/sec, '
+          f'p50 {statistics.median(latencies) * 1e6:.0f} us, p99 {latencies[len(latencies) * 99 // 100] * 1e6:.0f} us, '
+          f'old state mix-ups {mix_ups}')
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    updates_per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    measure('legacy', LegacyConversationHandler, chats, updates_per_chat)
+    measure('current', ConversationHandler, chats, updates_per_chat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""A local stand-in for the Telegram Bot API that answers every call after a fixed delay.
+
+Chats listed in `blocked` get the 403 the real API returns when a user has
+blocked the bot. With `chat_rate` a chat that gets more than that many
+messages within a second gets a 429 with `retry_after`, like a flood limit.
+"""
+import collections
+import http.server
+import itertools
+import json
+import threading
+import time
+
+
+class FakeBotApi:
+    def __init__(self, delay: float = 0.05, blocked=(), chat_rate=None):
+        self.delay = delay
+        self.blocked = set(blocked)
+        self.chat_rate = chat_rate
+        self.calls = []
+        self.flood_errors = 0
+        chat_sends = collections.defaultdict(collections.deque)
+        lock = threading.Lock()
+        message_ids = itertools.count(1)
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                method = self.path.rsplit('/', 1)[-1]
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                params = json.loads(body) if body else {}
+                api.calls.append((method, params))
+                time.sleep(api.delay)
+                chat_id = params.get('chat_id')
+                if chat_id is not None and int(chat_id) in api.blocked:
+                    self.__reply(403, {'ok': False, 'error_code': 403,
+                                       'description': 'Forbidden: bot was blocked by the user'})
+                    return
+                if chat_id is not None and api.chat_rate is not None:
+                    with lock:
+                        now = time.monotonic()
+                        sends = chat_sends[chat_id]
+                        while sends and sends[0] <= now - 1:
+                            sends.popleft()
+                        flooded = len(sends) >= api.chat_rate
+                        if flooded:
+                            api.flood_errors += 1
+                        else:
+                            sends.append(now)
+                    if flooded:
+                        self.__reply(429, {'ok': False, 'error_code': 429,
+                                           'description': 'Too Many Requests: retry after 1',
+                                           'parameters': {'retry_after': 1}})
+                        return
+                result = {
+                    'message_id': next(message_ids),
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id or 0, 'type': 'private'},
+                    'text': params.get('text', ''),
+                }
+                self.__reply(200, {'ok': True, 'result': result})
+
+            def __reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}/bot'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
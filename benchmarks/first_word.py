@@ -0,0 +1,71 @@
+"""Time from /start_game to the first word with an empty word pool, with and without filling the questions in the
+background, for a few game lengths.
+
+Every word takes 200 ms to generate, as a Wiktionary fetch does. The legacy way took all the words of the game before
+starting it. Also measured is how long /next waits right after the game has started, the worst case of players who
+answer and vote at once.
+
+    python -m benchmarks.first_word
+"""
+import itertools
+import logging
+import pathlib
+import time
+import types
+
+import telegram
+
+from bot.bot import Bot
+
+
+FETCH_SECONDS = 0.2
+ROOM_ID = '-1'
+WORD_IDS = itertools.count()
+
+
+def generate(n):
+    time.sleep(FETCH_SECONDS * n)
+    return [(f'word{next(WORD_IDS)}', 'description') for _ in range(n)]
+
+
+def make_bot(words_per_game):
+    bot = Bot('123:token', pathlib.Path(__file__).parent.parent / 'assets')
+    bot.words_per_game = words_per_game
+    bot.word_pool.in_place_source = generate
+    bot.word_pool.start = lambda: None
+    bot.storage_controller.create_room(ROOM_ID)
+    user = telegram.User(1, 'user', False)
+    bot.storage_controller.add_user_to_room(ROOM_ID, user)
+    message = types.SimpleNamespace(reply_text=lambda text, **kwargs: None)
+    update = types.SimpleNamespace(effective_chat=types.SimpleNamespace(id=int(ROOM_ID)), effective_user=user,
+                                   message=message)
+    context = types.SimpleNamespace(bot=types.SimpleNamespace(send_message=lambda *args, **kwargs: None), args=[])
+    return bot, update, context
+
+
+def legacy_start(bot, update, context):
+    bot.storage_controller.start_game(ROOM_ID, bot.word_pool.take(bot.words_per_game, ROOM_ID))
+
+
+def main():
+    logging.disable(logging.INFO)
+    for words_per_game in (1, 4, 8):
+        bot, update, context = make_bot(words_per_game)
+        started = time.perf_counter()
+        legacy_start(bot, update, context)
+        legacy_seconds = time.perf_counter() - started
+
+        bot, update, context = make_bot(words_per_game)
+        started = time.perf_counter()
+        bot.start_game_command(update, context)
+        seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        bot.next_command(update, context)
+        next_seconds = time.perf_counter() - started
+        bot.message_scheduler.stop()
+        print(f'{words_per_game} words per game: first word after {legacy_seconds * 1000:.0f} ms legacy, '
+              f'{seconds * 1000:.0f} ms now, then /next waits {next_seconds * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
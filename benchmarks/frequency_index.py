@@ -0,0 +1,47 @@
+"""Picking words of a frequency band: with the frequency index, and by fetching random words and checking them with
+`zipf_frequency` one at a time as the generator did before.
+
+Candidates are words of the wordfreq list plus as many words it doesn't know, standing in for the Wiktionary nouns
+category. The legacy way fetches a page for every candidate it checks, so its fetches per accepted word is what a band
+costs in requests.
+
+    python -m benchmarks.frequency_index [candidates]
+"""
+import random
+import sys
+import time
+import timeit
+
+from wordfreq import get_frequency_list, zipf_frequency
+
+from wordlist.FrequencyIndex import FrequencyIndex
+
+
+QUERIES = 10000
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    known = [word for bucket in get_frequency_list('ru') for word in bucket if word.isalpha()]
+    random.seed(0)
+    candidates = random.sample(known, size // 2) + [f'слово{idx}' for idx in range(size - size // 2)]
+    zipf_frequency('слово', 'ru')
+
+    started = time.perf_counter()
+    index = FrequencyIndex.from_words(candidates)
+    print(f'index of {size} words built in {time.perf_counter() - started:.2f} s')
+
+    checked = random.sample(candidates, 2000)
+    seconds = timeit.timeit(lambda: [zipf_frequency(word, 'ru') for word in checked], number=1)
+    print(f'legacy: {seconds / len(checked) * 1e6:.1f} us per zipf_frequency call')
+    for name, band in FrequencyIndex.BANDS.items():
+        min_zipf, max_zipf = band
+        accepted = sum(min_zipf < zipf_frequency(word, 'ru') <= max_zipf for word in checked)
+        fetches = f'{len(checked) / accepted:.1f}' if accepted else 'unbounded'
+        seconds = timeit.timeit(lambda: index.sample(1, min_zipf, max_zipf), number=QUERIES)
+        print(f'{name}: {index.count(min_zipf, max_zipf)} words, legacy {fetches} fetches per accepted word, '
+              f'index 1 fetch and {seconds / QUERIES * 1e6:.1f} us per word')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Recovery time of the journaled storage and the cost of journaling a change.
+
+Fills the journal with 100k rooms, snapshots it, plays a tail of changes
+after the snapshot and times how long a new controller takes to come back up.
+
+    python -m benchmarks.journal_recovery
+"""
+import random
+import tempfile
+import time
+import timeit
+
+import telegram
+
+from bot.storage.inmemory.controller import InmemoryStorageController
+from bot.storage.journal.controller import JournaledStorageController
+
+from benchmarks.storage_lookup import USERS_PER_ROOM, populate
+
+
+ROOMS = 100000
+TAIL_ROOMS = 1000
+
+
+def add_votes(controller, rooms):
+    for room_idx in range(rooms):
+        room_id = str(-room_idx)
+        for user_idx in range(USERS_PER_ROOM):
+            user_id = room_idx * USERS_PER_ROOM + user_idx
+            controller.add_user_description(room_id, user_id, f'description{user_id}')
+            controller.add_user_vote(room_id, user_id, user_idx)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        controller = JournaledStorageController(directory)
+        start = time.perf_counter()
+        populate(controller, ROOMS)
+        controller.snapshot()
+        print(f'{ROOMS} rooms journaled and snapshotted in {time.perf_counter() - start:.1f} s')
+        add_votes(controller, TAIL_ROOMS)
+        controller.set_conversation_state((-1,), 'state')
+        controller.close()
+        del controller
+
+        start = time.perf_counter()
+        recovered = JournaledStorageController(directory)
+        print(f'recovered {ROOMS} rooms and {TAIL_ROOMS * USERS_PER_ROOM * 2} later changes '
+              f'in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        room_idx = random.randrange(TAIL_ROOMS)
+        room_id = str(-room_idx)
+        assert recovered.get_room_id_by_poll_id(f'poll{room_idx}') == room_id
+        assert recovered.get_room_id_by_private_message_id(room_idx * USERS_PER_ROOM, room_idx) == room_id
+        assert recovered.get_user_votes(room_id) == {
+            room_idx * USERS_PER_ROOM + user_idx: user_idx for user_idx in range(USERS_PER_ROOM)
+        }
+        assert recovered.get_conversation_states() == {(-1,): 'state'}
+        recovered.close()
+
+    user = telegram.User(1, 'user', False)
+    for name, make_controller in (
+            ('in memory', lambda directory: InmemoryStorageController()),
+            ('journaled', JournaledStorageController),
+    ):
+        with tempfile.TemporaryDirectory() as directory:
+            controller = make_controller(directory)
+            controller.create_room('-1')
+            seconds = timeit.timeit(lambda: controller.add_user_to_room('-1', user), number=100000)
+            print(f'{name}: {seconds / 100000 * 1e6:.2f} us per change')
+            if isinstance(controller, JournaledStorageController):
+                controller.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Cost of looking up and formatting a message, with the message reader and the legacy pandas one.
+
+The legacy reader kept the TSV in a DataFrame and logged every text it
+returned, as the bot did before messages were parsed at startup.
+
+    python -m benchmarks.message_reader
+"""
+import logging
+import pathlib
+import timeit
+
+import pandas as pd
+
+from bot.messages.message import Message
+from bot.messages.message_reader import MessageReader
+
+
+ASSETS_PATH = pathlib.Path('assets')
+LOOKUPS = 10000
+
+
+class LegacyMessageReader:
+    def __init__(self, root_path, lang='en'):
+        self.messages = pd.read_csv(root_path / f'messages_{lang}.tsv', encoding='utf8', sep='\t', index_col=0)
+        self.logger = logging.getLogger(__name__)
+
+    def format(self, message, **kwargs):
+        text = self.messages.loc[message.name].text
+        self.logger.info(text)
+        return text.replace('\\n', '\n').format(**kwargs)
+
+
+def main():
+    # Logged like the bot does, to a file rather than the terminal
+    logging.basicConfig(filename='/dev/null', level=logging.INFO)
+    for name, reader in (('legacy', LegacyMessageReader(ASSETS_PATH)), ('current', MessageReader(ASSETS_PATH))):
+        for message, kwargs in ((Message.ANSWER_SAVED, {}), (Message.ROUND_START_1, {'word': 'word'})):
+            assert reader.format(message, **kwargs) == MessageReader(ASSETS_PATH).format(message, **kwargs)
+            seconds = timeit.timeit(lambda: reader.format(message, **kwargs), number=LOOKUPS)
+            print(f'{name}: {seconds / LOOKUPS * 1e6:.2f} us per {message.name} message')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Busy rooms sending bursts of messages straight to a flood-limited fake Bot API or through the message scheduler.
+
+Every room sends a burst of acknowledgements followed by a round start. The
+fake API allows 5 messages per second per chat, so direct sends fail with
+`RetryAfter` while the scheduler keeps to the limit and sends round starts first.
+
+    python -m benchmarks.message_scheduler [rooms] [messages per room]
+"""
+import concurrent.futures
+import statistics
+import sys
+import time
+
+import telegram
+from telegram.error import RetryAfter
+from telegram.utils.request import Request
+
+from bot.telegram_extensions.message_scheduler import MessageScheduler, Priority
+
+from benchmarks.fake_bot_api import FakeBotApi
+
+
+CHAT_RATE = 5
+
+
+def burst(rooms, messages_per_room):
+    for message_idx in range(messages_per_room):
+        for room_idx in range(rooms):
+            priority = Priority.HIGH if message_idx == messages_per_room - 1 else Priority.LOW
+            yield -room_idx - 1, priority
+
+
+def direct(api, rooms, messages_per_room):
+    bot = telegram.Bot('123:token', base_url=api.url, request=Request(con_pool_size=12))
+    failed = 0
+    latencies = {Priority.HIGH: [], Priority.LOW: []}
+    started = time.perf_counter()
+
+    def send(chat_id, priority):
+        bot.send_message(chat_id, priority.name)
+        latencies[priority].append(time.perf_counter() - started)
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        futures = [executor.submit(send, chat_id, priority) for chat_id, priority in burst(rooms, messages_per_room)]
+        for future in futures:
+            try:
+                future.result()
+            except RetryAfter:
+                failed += 1
+    return time.perf_counter() - started, failed, latencies
+
+
+def scheduled(api, rooms, messages_per_room):
+    bot = telegram.Bot('123:token', base_url=api.url, request=Request(con_pool_size=12))
+    scheduler = MessageScheduler(workers=8, global_rate=1000., group_chat_rate=CHAT_RATE, group_chat_burst=CHAT_RATE)
+    latencies = {Priority.HIGH: [], Priority.LOW: []}
+    started = time.perf_counter()
+
+    def sent(priority):
+        return lambda future: latencies[priority].append(time.perf_counter() - started)
+
+    futures = []
+    for chat_id, priority in burst(rooms, messages_per_room):
+        future = scheduler.submit(chat_id, lambda chat_id=chat_id, priority=priority: bot.send_message(
+            chat_id, priority.name
+        ), priority)
+        future.add_done_callback(sent(priority))
+        futures.append(future)
+    max_queue_depth = scheduler.stats['queue_depth']
+    failed = sum(1 for future in concurrent.futures.as_completed(futures) if future.exception() is not None)
+    seconds = time.perf_counter() - started
+    stats = scheduler.stats
+    scheduler.stop()
+    print(f'scheduler stats: queue depth at start {max_queue_depth}, sent {stats["sent"]}, '
+          f'retried {stats["retried"]}, latency p50 {stats["latency_p50"] * 1e3:.0f} ms, '
+          f'p95 {stats["latency_p95"] * 1e3:.0f} ms')
+    return seconds, failed, latencies
+
+
+def median_ms(latencies):
+    return f'{statistics.median(latencies) * 1e3:.0f} ms' if latencies else 'none sent'
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    messages_per_room = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for name, run in (('direct', direct), ('scheduled', scheduled)):
+        with FakeBotApi(delay=0.02, chat_rate=CHAT_RATE) as api:
+            seconds, failed, latencies = run(api, rooms, messages_per_room)
+            print(f'{name:>10}: {seconds:.2f} s, {failed} failed, {api.flood_errors} flood errors, '
+                  f'round start p50 {median_ms(latencies[Priority.HIGH])}, '
+                  f'acknowledgement p50 {median_ms(latencies[Priority.LOW])}')
+
+
+if __name__ == '__main__':
+    main()
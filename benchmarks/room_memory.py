@@ -0,0 +1,73 @@
+"""Memory taken by idle and active rooms in the in-memory storage.
+
+An idle room has just been started in a chat. An active room has four
+participants in the middle of a round, all of them answered and two voted.
+Strings are shared between rooms, so the numbers are what the room structures
+themselves cost. Each count is filled in a new process and measured by how
+much its peak resident memory grows.
+
+    python -m benchmarks.room_memory [rooms...]
+"""
+import concurrent.futures
+import resource
+import sys
+
+import telegram
+
+from bot.storage.inmemory.controller import InmemoryStorageController
+
+
+USERS_PER_ROOM = 4
+QUESTIONS = [('word', 'description')] * 4
+
+
+def start_rooms(controller, rooms):
+    for room_idx in range(rooms):
+        controller.create_room(str(-room_idx))
+
+
+def play_rooms(controller, rooms):
+    for room_idx in range(rooms):
+        room_id = str(-room_idx)
+        controller.create_room(room_id)
+        for user_idx in range(USERS_PER_ROOM):
+            user_id = room_idx * USERS_PER_ROOM + user_idx
+            controller.add_user_to_room(
+                room_id, telegram.User(user_id, 'Player', False, last_name='Surname', username='player')
+            )
+        controller.start_game(room_id, QUESTIONS)
+        for user_idx in range(USERS_PER_ROOM):
+            user_id = room_idx * USERS_PER_ROOM + user_idx
+            controller.add_user_question_message_id(room_id, user_id, room_idx)
+            controller.add_user_description(room_id, user_id, 'answer')
+        controller.set_poll_description_order(room_id, [('description', None)])
+        controller.add_poll(room_id, f'poll{room_idx}', room_idx)
+        for user_idx in range(2):
+            controller.add_user_vote(room_id, room_idx * USERS_PER_ROOM + user_idx, 0)
+
+
+def peak_memory():
+    # Kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def fill_and_measure(fill, rooms):
+    start_memory = peak_memory()
+    controller = InmemoryStorageController()
+    fill(controller, rooms)
+    return (peak_memory() - start_memory) / rooms
+
+
+def bytes_per_room(fill, rooms):
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        return executor.submit(fill_and_measure, fill, rooms).result()
+
+
+def main():
+    for rooms in map(int, sys.argv[1:]) if len(sys.argv) > 1 else (10000, 100000, 1000000):
+        print(f'{rooms:>8} rooms: {bytes_per_room(start_rooms, rooms):.0f} B per idle room, '
+              f'{bytes_per_room(play_rooms, rooms):.0f} B per active room')
+
+
+if __name__ == '__main__':
+    main()
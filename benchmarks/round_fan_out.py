@@ -0,0 +1,55 @@
+"""Time to start a round, i.e. to send the word to every player, against a fake Bot API with 50 ms round trips.
+
+One player has blocked the bot; the others must still get their word.
+
+    python -m benchmarks.round_fan_out [players]
+"""
+import pathlib
+import sys
+import time
+import types
+
+import telegram
+from telegram.utils.request import Request
+
+from bot.bot import Bot
+from bot.telegram_extensions.fan_out import FanOut
+
+from benchmarks.fake_bot_api import FakeBotApi
+
+
+ROOM_ID = '-1'
+BLOCKED_USER_ID = 1
+
+
+def measure(name, api, players, max_parallel):
+    bot = Bot('123:token', pathlib.Path(__file__).parent.parent / 'assets')
+    bot.fan_out = FanOut(max_parallel)
+    bot.word_pool.take = lambda n, key=None: [('word', 'description')] * n
+    bot.storage_controller.create_room(ROOM_ID)
+    for user_id in range(1, players + 1):
+        bot.storage_controller.add_user_to_room(ROOM_ID, telegram.User(user_id, f'user{user_id}', False))
+    bot.storage_controller.start_game(ROOM_ID, bot.word_pool.take(bot.words_per_game))
+
+    telegram_bot = telegram.Bot('123:token', base_url=api.url, request=Request(con_pool_size=max_parallel + 4))
+    context = types.SimpleNamespace(bot=telegram_bot)
+    update = types.SimpleNamespace(effective_chat=types.SimpleNamespace(id=int(ROOM_ID)))
+
+    started = time.perf_counter()
+    bot.wait_ans_entry(update, context)
+    seconds = time.perf_counter() - started
+    bot.fan_out.shutdown()
+
+    recorded = len(bot.storage_controller.load_room(ROOM_ID).room.game_state.user_question_message_id)
+    print(f'{name:>12}: {seconds * 1e3:.0f} ms, {recorded} of {players - 1} reachable players recorded')
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    with FakeBotApi(delay=0.05, blocked=[BLOCKED_USER_ID]) as api:
+        measure('sequential', api, players, 1)
+        measure('concurrent', api, players, 8)
+
+
+if __name__ == '__main__':
+    main()
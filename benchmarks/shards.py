@@ -0,0 +1,75 @@
+"""Throughput of the sharded deployment: the supervisor routes group chat updates to shard processes whose handler
+does a millisecond of CPU work, so throughput is bound by the cores the shards get.
+
+    python -m benchmarks.shards [updates] [chats]
+"""
+import datetime
+import multiprocessing
+import os
+import sys
+import time
+
+import telegram
+from telegram.ext import TypeHandler, Updater
+
+from bot.shards import ShardSupervisor
+from bot.telegram_extensions.update_sources import read_updates
+
+
+WORK = 20000
+
+
+class CpuBoundBot:
+    def __init__(self, handled):
+        self.handled = handled
+        self.route_reporter = None
+
+    def handle(self, update, context):
+        sum(i * i for i in range(WORK))
+        with self.handled.get_lock():
+            self.handled.value += 1
+
+    def start(self, updates):
+        updater = Updater('123:token', use_context=True, workers=0)
+        updater.bot.bot = telegram.User(1, 'bot', True, username='bot')
+        updater.bot._commands = []
+        updater.dispatcher.add_handler(TypeHandler(telegram.Update, self.handle))
+        read_updates(updater, updates)
+
+
+class MakeBot:
+    def __init__(self, handled):
+        self.handled = handled
+
+    def __call__(self, shard):
+        return CpuBoundBot(self.handled)
+
+
+def measure(shards, updates, chats):
+    handled = multiprocessing.Value('i', 0)
+    supervisor = ShardSupervisor('123:token', MakeBot(handled), shards)
+    supervisor.start_shards()
+    bot = telegram.Bot('123:token')
+
+    started = time.perf_counter()
+    for update_id in range(updates):
+        chat = telegram.Chat(-(update_id % chats) - 1, telegram.Chat.GROUP)
+        message = telegram.Message(update_id, datetime.datetime.now(), chat, text='/next', bot=bot)
+        supervisor.route(telegram.Update(update_id, message=message))
+    while handled.value < updates:
+        time.sleep(0.01)
+    seconds = time.perf_counter() - started
+    supervisor.stop_shards()
+    print(f'{shards:>2} shards: {updates / seconds:,.0f} updates/sec')
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f'{os.cpu_count()} cores')
+    for shards in (1, 2, 4):
+        measure(shards, updates, chats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Cold start: the time to import `main` and the time from starting a bot process to handling its first update.
+
+Each number is the median of fresh processes. The bot gets its first update
+through the shard queue, so no network is involved, and getMe and
+getMyCommands are answered locally. Fails when a number is over its budget
+or when `main` imports a module that should only be imported once the bot
+runs.
+
+    python -m benchmarks.startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Seconds, with some headroom over a single core of a small cloud VM
+BUDGETS = {'import': 0.7, 'first update': 2.}
+LAZY_MODULES = ('wordfreq', 'bs4', 'requests', 'pandas')
+
+FIRST_UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1, 'date': 0, 'chat': {'id': -1, 'type': 'group'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'user'},
+        'text': '/start', 'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+    },
+}
+
+
+def child_import():
+    started = time.perf_counter()
+    import main
+    print(time.perf_counter() - started)
+    print(' '.join(module for module in LAZY_MODULES if module in sys.modules))
+
+
+def child_first_update():
+    import multiprocessing
+    import pathlib
+
+    import telegram
+
+    from bot.bot import Bot
+    from bot.storage.inmemory.controller import InmemoryStorageController
+
+    def get_me(self, *args, **kwargs):
+        self.bot = telegram.User(1, 'bot', True, username='bot')
+        self._commands = []
+        return self.bot
+
+    telegram.Bot.get_me = get_me
+
+    class FirstUpdateStorage(InmemoryStorageController):
+        def create_room(self, room_id):
+            print('handled', flush=True)
+            os._exit(0)
+
+    updates = multiprocessing.Queue()
+    updates.put(FIRST_UPDATE)
+    Bot('123:token', pathlib.Path('assets'), storage_controller=FirstUpdateStorage()).start(updates=updates)
+
+
+def run_child(mode):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', 'child', mode], check=True, capture_output=True, text=True
+    ).stdout
+    return time.perf_counter() - started, output.splitlines()
+
+
+def main():
+    if sys.argv[1:2] == ['child']:
+        {'import': child_import, 'first update': child_first_update}[sys.argv[2]]()
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    import_seconds = []
+    lazy_modules = set()
+    for _ in range(runs):
+        _, (seconds, imported) = run_child('import')
+        import_seconds.append(float(seconds))
+        lazy_modules.update(imported.split())
+    failed = bool(lazy_modules)
+    if lazy_modules:
+        print(f'main imports {", ".join(sorted(lazy_modules))}')
+    first_update_seconds = [run_child('first update')[0] for _ in range(runs)]
+
+    for name, seconds in (('import', import_seconds), ('first update', first_update_seconds)):
+        median = statistics.median(seconds)
+        over_budget = median > BUDGETS[name]
+        failed = failed or over_budget
+        print(f'{name}: {median * 1000:.0f} ms (budget {BUDGETS[name] * 1000:.0f} ms)'
+              f'{", over budget" if over_budget else ""}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Latency of poll and private message lookups as the number of live rooms grows.
+
+    python -m benchmarks.storage_lookup
+"""
+import random
+import timeit
+
+import telegram
+
+from bot.storage.inmemory.controller import InmemoryStorageController
+
+
+USERS_PER_ROOM = 4
+
+
+def populate(controller, rooms):
+    for room_idx in range(rooms):
+        room_id = str(-room_idx)
+        controller.create_room(room_id)
+        for user_idx in range(USERS_PER_ROOM):
+            user_id = room_idx * USERS_PER_ROOM + user_idx
+            controller.add_user_to_room(room_id, telegram.User(user_id, f'user{user_id}', False))
+        controller.start_game(room_id, [('word', 'description')] * 4)
+        for user_idx in range(USERS_PER_ROOM):
+            user_id = room_idx * USERS_PER_ROOM + user_idx
+            controller.add_user_question_message_id(room_id, user_id, room_idx)
+        controller.add_poll(room_id, f'poll{room_idx}', room_idx)
+
+
+def main():
+    for rooms in (1000, 10000, 100000):
+        controller = InmemoryStorageController()
+        populate(controller, rooms)
+        room_idxs = [random.randrange(rooms) for _ in range(10000)]
+
+        poll_seconds = timeit.timeit(
+            lambda: [controller.get_room_id_by_poll_id(f'poll{room_idx}') for room_idx in room_idxs], number=1
+        )
+        private_seconds = timeit.timeit(
+            lambda: [
+                controller.get_room_id_by_private_message_id(room_idx * USERS_PER_ROOM, room_idx)
+                for room_idx in room_idxs
+            ],
+            number=1,
+        )
+        print(f'{rooms:>7} rooms: poll lookup {poll_seconds / len(room_idxs) * 1e6:.2f} us, '
+              f'private message lookup {private_seconds / len(room_idxs) * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Synthetic game workload against the in-memory and SQLite storage controllers.
+
+Every room plays a full game: players join, four rounds of private answers,
+a poll and votes, with the lookups the bot does on each update.
+
+    python -m benchmarks.storage_workload [rooms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import telegram
+
+from bot.storage.inmemory.controller import InmemoryStorageController
+from bot.storage.sqlite.controller import SqliteStorageController
+
+
+USERS_PER_ROOM = 4
+WORDS_PER_GAME = 4
+
+
+def play(controller, rooms):
+    operations = 0
+    for room_idx in range(rooms):
+        room_id = str(-room_idx)
+        users = [
+            telegram.User(room_idx * USERS_PER_ROOM + user_idx, f'user{user_idx}', False)
+            for user_idx in range(USERS_PER_ROOM)
+        ]
+        controller.create_room(room_id)
+        for user in users:
+            if not controller.is_user_in_room(room_id, user.id):
+                controller.add_user_to_room(room_id, user)
+        controller.start_game(room_id, [(f'word{idx}', f'description{idx}') for idx in range(WORDS_PER_GAME)])
+        operations += 2 + 2 * USERS_PER_ROOM
+
+        for round_idx in range(WORDS_PER_GAME):
+            controller.get_current_word(room_id)
+            for user in users:
+                controller.add_user_question_message_id(room_id, user.id, round_idx)
+            for user in users:
+                answer_room_id = controller.get_room_id_by_private_message_id(user.id, round_idx)
+                controller.add_user_description(answer_room_id, user.id, f'answer of {user.id}')
+                len(controller.get_users_in_room(answer_room_id))
+                len(controller.get_current_user_descriptions(answer_room_id))
+            description_order = [(controller.get_current_description(room_id), None)]
+            description_order.extend(
+                (description, user_id)
+                for user_id, description in controller.get_current_user_descriptions(room_id).items()
+            )
+            controller.set_poll_description_order(room_id, description_order)
+            controller.add_poll(room_id, f'{room_id}:{round_idx}', round_idx)
+            for user in users:
+                vote_room_id = controller.get_room_id_by_poll_id(f'{room_id}:{round_idx}')
+                controller.add_user_vote(vote_room_id, user.id, 0)
+                len(controller.get_user_votes(vote_room_id))
+            controller.get_description_order(room_id)
+            controller.get_user_votes(room_id)
+            operations += 1 + 5 * USERS_PER_ROOM + 3 + 3 * USERS_PER_ROOM + 2
+            try:
+                controller.next_round(room_id)
+            except IndexError:
+                pass
+            operations += 1
+        controller.remove_room(room_id)
+        operations += 1
+    return operations
+
+
+def measure(name, controller, rooms):
+    started = time.perf_counter()
+    operations = play(controller, rooms)
+    seconds = time.perf_counter() - started
+    print(f'{name:>10}: {operations / seconds:,.0f} operations/sec, {seconds / rooms * 1e3:.2f} ms per game')
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    measure('in-memory', InmemoryStorageController(), rooms)
+    with tempfile.TemporaryDirectory() as directory:
+        controller = SqliteStorageController(os.path.join(directory, 'rooms.db'))
+        measure('sqlite', controller, rooms)
+        controller.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Idle timers of many rooms kept in the timing wheel or as a JobQueue job per room.
+
+Every room gets a timer, then a stream of updates touches random rooms and
+reschedules theirs. Reports the time per touch and the memory the timers
+take, and checks the wheel expires exactly the rooms left idle.
+
+    python -m benchmarks.timing_wheel [rooms]
+"""
+import queue
+import random
+import sys
+import time
+import tracemalloc
+
+import telegram
+from telegram.ext import Dispatcher, JobQueue
+
+from bot.telegram_extensions.timing_wheel import TimingWheel
+
+
+IDLE_TIMEOUT = 24 * 60 * 60
+TOUCHES = 100000
+
+
+def measure(rooms, schedule):
+    tracemalloc.start()
+    for room_idx in range(rooms):
+        schedule(str(-room_idx))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    room_ids = [str(-random.randrange(rooms)) for _ in range(TOUCHES)]
+    start = time.perf_counter()
+    for room_id in room_ids:
+        schedule(room_id)
+    return (time.perf_counter() - start) / TOUCHES, memory
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    now = [0.]
+    wheel = TimingWheel(clock=lambda: now[0])
+    seconds, memory = measure(rooms, lambda room_id: wheel.schedule(room_id, IDLE_TIMEOUT))
+    print(f'timing wheel: {seconds * 1e6:.2f} us per touch, {memory / rooms:.0f} B per room')
+
+    job_queue = JobQueue()
+    job_queue.set_dispatcher(Dispatcher(telegram.Bot('123:token'), queue.Queue(), job_queue=job_queue))
+    job_queue.start()
+    jobs = {}
+
+    def schedule_job(room_id):
+        job = jobs.pop(room_id, None)
+        if job is not None:
+            job.schedule_removal()
+        jobs[room_id] = job_queue.run_once(lambda context: None, IDLE_TIMEOUT, name=room_id)
+
+    seconds, memory = measure(rooms, schedule_job)
+    print(f'job per room: {seconds * 1e6:.2f} us per touch, {memory / rooms:.0f} B per room')
+    job_queue.stop()
+
+    # Half of the rooms get an update an hour before the others expire
+    now[0] += IDLE_TIMEOUT - 60 * 60
+    wheel.advance()
+    active = {str(-room_idx) for room_idx in range(0, rooms, 2)}
+    for room_id in active:
+        wheel.schedule(room_id, IDLE_TIMEOUT)
+    now[0] += 60 * 60
+    start = time.perf_counter()
+    expired = wheel.advance()
+    print(f'{len(expired)} idle rooms expired in {(time.perf_counter() - start) * 1000:.0f} ms')
+    assert set(expired) == {str(-room_idx) for room_idx in range(rooms)} - active
+    assert len(wheel) == len(active)
+
+
+if __name__ == '__main__':
+    main()
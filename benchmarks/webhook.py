@@ -0,0 +1,90 @@
+"""Update intake of the webhook server: recorded updates are posted at full speed over keep-alive connections and
+the time from posting an update to its handler running is measured.
+
+The second run has a small pending limit and slow handlers to show updates being refused with 429 instead of piling up.
+
+    python -m benchmarks.webhook [updates] [connections]
+"""
+import copy
+import http.client
+import json
+import pathlib
+import queue
+import statistics
+import sys
+import threading
+import time
+
+import telegram
+from telegram.ext import Dispatcher, TypeHandler
+
+from bot.telegram_extensions.webhook_server import WebhookServer
+
+
+SECRET_TOKEN = 'benchmark-secret'
+
+
+def measure(name, updates, connections, max_pending_updates, handler_seconds):
+    recorded = json.loads((pathlib.Path(__file__).parent / 'data' / 'updates.json').read_text('utf8'))
+    bot = telegram.Bot('123:token')
+    dispatcher = Dispatcher(bot, queue.Queue(), workers=0)
+    posted = {}
+    latencies = []
+
+    def handle(update, context):
+        latencies.append(time.perf_counter() - posted[update.update_id])
+        time.sleep(handler_seconds)
+
+    dispatcher.add_handler(TypeHandler(telegram.Update, handle))
+    dispatcher_thread = threading.Thread(target=dispatcher.start)
+    dispatcher_thread.start()
+    server = WebhookServer(bot, dispatcher.update_queue, listen='127.0.0.1', port=0, secret_token=SECRET_TOKEN,
+                           max_pending_updates=max_pending_updates)
+    server.start()
+
+    statuses = []
+
+    def client(connection_idx):
+        connection = http.client.HTTPConnection('127.0.0.1', server.port)
+        for update_id in range(connection_idx, updates, connections):
+            update = copy.deepcopy(recorded[update_id % len(recorded)])
+            update['update_id'] = update_id
+            body = json.dumps(update).encode('utf8')
+            posted[update_id] = time.perf_counter()
+            connection.request('POST', '/', body, {
+                'Content-Type': 'application/json', WebhookServer.SECRET_TOKEN_HEADER: SECRET_TOKEN,
+            })
+            response = connection.getresponse()
+            response.read()
+            statuses.append(response.status)
+        connection.close()
+
+    clients = [threading.Thread(target=client, args=(connection_idx,)) for connection_idx in range(connections)]
+    started = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    while len(latencies) < server.accepted:
+        time.sleep(0.01)
+    seconds = time.perf_counter() - started
+
+    server.stop()
+    dispatcher.stop()
+    dispatcher_thread.join()
+
+    latencies.sort()
+    print(f'{name:>12}: {server.accepted / seconds:,.0f} updates/sec, {server.accepted} handled, '
+          f'{statuses.count(429)} refused with 429, handler latency p50 {statistics.median(latencies) * 1e3:.2f} ms, '
+          f'p99 {latencies[len(latencies) * 99 // 100] * 1e3:.2f} ms')
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    measure('unbounded', updates, connections, updates, 0.)
+    measure('backpressure', updates // 10, connections, 100, 0.001)
+
+
+if __name__ == '__main__':
+    main()
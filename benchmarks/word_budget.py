@@ -0,0 +1,57 @@
+"""Time to get the words of a game when the word pool is empty, with a healthy, a stalling and a failing Wiktionary.
+
+Wiktionary is the stub server of the wordlist tests. Words are generated the way the bot generates them in place,
+within a budget and with the fallback words as the last resort.
+
+    python -m benchmarks.word_budget [games]
+"""
+import logging
+import math
+import statistics
+import sys
+import time
+
+sys.path.insert(0, 'wordlist/test')
+
+from stub_server import StubWiktionary  # noqa: E402
+from wordlist.Generator import generate_wordlist  # noqa: E402
+
+
+BUDGET = 1.
+WORDS_PER_GAME = 4
+
+
+def healthy(stub):
+    stub.delay = 0.05
+
+
+def stalling(stub):
+    stub.stalls = {word: 3. for word in stub.words}
+
+
+def failing(stub):
+    stub.status = 503
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    # Every game of the failing runs warns that it falls back
+    logging.disable(logging.WARNING)
+    for fault in (healthy, stalling, failing):
+        with StubWiktionary() as stub:
+            # The nouns are listed while the site is healthy, as the bot does on warm up
+            generate_wordlist(1, url=stub.url)
+            fault(stub)
+            seconds = []
+            for _ in range(games):
+                started = time.perf_counter()
+                generate_wordlist(WORDS_PER_GAME, concurrency=4, url=stub.url, hedge_delay=0.5, budget=BUDGET,
+                                  fallback=True)
+                seconds.append(time.perf_counter() - started)
+        p99 = sorted(seconds)[math.ceil(0.99 * len(seconds)) - 1]
+        print(f'{fault.__name__}: median {statistics.median(seconds) * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms '
+              f'(budget {BUDGET * 1000:.0f} ms)')
+
+
+if __name__ == '__main__':
+    main()
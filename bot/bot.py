@@ -1,22 +1,36 @@
+from concurrent.futures import Future
 from enum import Enum, auto
+import collections
+import functools
+import logging
 import random
+import multiprocessing
 import pathlib
-from typing import Optional
+import threading
+import time
+from typing import Optional, Callable, Any, Dict, Hashable, Tuple
 
 from telegram import Update, ForceReply, Message as TelegramMessage
 from telegram.ext import Updater, CommandHandler, MessageHandler, Filters, \
-    CallbackContext, PollAnswerHandler
+    CallbackContext, PollAnswerHandler, TypeHandler
 
 from bot.telegram_extensions.handlers.conversation_handler import ConversationHandler
+from bot.telegram_extensions.chat_executor import ChatExecutor
+from bot.telegram_extensions.fan_out import FanOut
+from bot.telegram_extensions.message_scheduler import MessageScheduler, Priority
+from bot.telegram_extensions.timing_wheel import TimingWheel
+from bot.telegram_extensions.update_sources import read_updates, receive_updates
 from bot.telegram_extensions.conversation_context import ConversationContext
 
+from bot.dto.room import Room
 from bot.storage.exceptions import RoomNotFoundError
 
+from bot.storage.storage_controller_base import StorageControllerBase
 from bot.storage.inmemory.controller import InmemoryStorageController
 from bot.messages.message_reader import MessageReader
 from bot.messages.message import Message
 
-from wordlist import generate_wordlist
+from wordlist import Corpus, FrequencyIndex, WordPool, generate_wordlist, warm_up
 
 
 def chat_id_to_room_id(chat_id: int) -> str:
@@ -34,26 +48,145 @@ class Bot:
         WAIT_VOTE = auto()
         ROUND_FINISH = auto()
 
-    def __init__(self, token, assets_path: pathlib.Path):
+    class Timer(Enum):
+        IDLE = auto()
+        ANSWERS = auto()
+        VOTES = auto()
+
+    message_priorities = {
+        Message.ROUND_START_1: Priority.HIGH,
+        Message.ROUND_START_2: Priority.HIGH,
+        Message.ROUND_END_1: Priority.HIGH,
+        Message.ROUND_END_2: Priority.HIGH,
+        Message.ADD_ME_SUCCESS: Priority.LOW,
+        Message.ADD_ME_DUB: Priority.LOW,
+        Message.REMOVE_ME_SUCCESS: Priority.LOW,
+        Message.ANSWER_SAVED: Priority.LOW,
+    }
+
+    def __init__(self, token, assets_path: pathlib.Path, corpus_path: Optional[pathlib.Path] = None,
+                 cache_path: Optional[pathlib.Path] = None,
+                 storage_controller: Optional[StorageControllerBase] = None,
+                 workers: int = 8, chat_workers: int = 16,
+                 idle_timeout: float = 24 * 60 * 60, answer_timeout: float = 10 * 60, vote_timeout: float = 10 * 60,
+                 room_archive: Optional[Callable[[Room], None]] = None, difficulty: str = 'hard',
+                 word_budget: float = 5., message_rate: float = 30.):
+        """Rooms without updates for `idle_timeout` seconds are removed, and passed to `room_archive` first if it is
+        given. Players are reminded to start the vote `answer_timeout` seconds into a round, and the poll is closed
+        after `vote_timeout` seconds. Games are played with words of `difficulty` unless the room chooses another one
+        of `FrequencyIndex.BANDS`. A game waits at most `word_budget` seconds for words the word pool doesn't have,
+        then plays with the bundled fallback words. At most `message_rate` messages are sent per second
+        """
         self.token = token
-        self.storage_controller = InmemoryStorageController()
+        if storage_controller is None:
+            storage_controller = InmemoryStorageController()
+        self.storage_controller = storage_controller
         self.message_reader = MessageReader(assets_path)
+        self.corpus = Corpus(corpus_path) if corpus_path is not None else None
+        self.cache_path = cache_path
+        # A pool per difficulty, the default one is started on warm up and the others by the first game using them
+        self.word_pools = {}
+        for band in FrequencyIndex.BANDS:
+            source = functools.partial(
+                generate_wordlist, corpus=self.corpus, concurrency=4, cache_path=cache_path, sections=True,
+                difficulty=band,
+            )
+            self.word_pools[band] = WordPool(
+                source, in_place_source=functools.partial(source, budget=word_budget, fallback=True)
+            )
+        self.difficulty = difficulty
+        self.word_pool = self.word_pools[difficulty]
 
         self.words_per_game = 4
+        self.word_budget = word_budget
+        # A game starts as soon as its first word is ready, the others are added by `__fill_questions` on a thread of
+        # the room's own while it is played, so a slow fill doesn't hold up the others. The rooms being filled map to
+        # a token of their fill, and `questions_added` is notified with `questions_version` bumped whenever a word is
+        # added or a fill ends, so a round that reaches a missing word waits for it
+        self.question_fills: Dict[str, object] = {}
+        self.questions_version = 0
+        self.questions_added = threading.Condition()
+        self.workers = workers
+        self.chat_workers = chat_workers
+        self.fan_out = FanOut(max_parallel=8)
+        self.message_scheduler = MessageScheduler(workers=8, global_rate=message_rate)
+        # Called with ('poll', poll_id) and ('private_message', (user_id, message_id)) when a room starts expecting
+        # updates that don't come from its chat, so a shard supervisor can route them. The private replies it didn't
+        # know a route for are sent to every shard and their ids kept here until handled, the most recent
+        # `max_broadcast_updates` of them
+        self.route_reporter: Optional[Callable[[str, Hashable], None]] = None
+        self.broadcast_updates: Dict[int, None] = collections.OrderedDict()
+        self.max_broadcast_updates = 10000
+        self.broadcast_updates_lock = threading.Lock()
+        self.idle_timeout = idle_timeout
+        self.answer_timeout = answer_timeout
+        self.vote_timeout = vote_timeout
+        self.room_archive = room_archive
+        # One wheel for the timers of all rooms, advanced by a single job
+        self.timing_wheel = TimingWheel()
+        self.chat_executor: Optional[ChatExecutor] = None
+        self.conversation_handler: Optional[ConversationHandler] = None
+        self.logger = logging.getLogger(__name__)
+
+    def __report_route(self, kind: str, key: Hashable) -> None:
+        if self.route_reporter is not None:
+            self.route_reporter(kind, key)
+
+    def __add_broadcast(self, update: Update) -> None:
+        with self.broadcast_updates_lock:
+            self.broadcast_updates[update.update_id] = None
+            if len(self.broadcast_updates) > self.max_broadcast_updates:
+                self.broadcast_updates.popitem(last=False)
+
+    def __take_broadcast(self, update: Update) -> bool:
+        with self.broadcast_updates_lock:
+            if update.update_id not in self.broadcast_updates:
+                return False
+            del self.broadcast_updates[update.update_id]
+            return True
+
+    def __save_conversation_state(self, key: Tuple[int, ...], state: Optional['Bot.State']) -> None:
+        self.storage_controller.set_conversation_state(key, state.name if state is not None else None)
+
+    def __touch(self, room_id: str) -> None:
+        self.timing_wheel.schedule((Bot.Timer.IDLE, room_id), self.idle_timeout)
+
+    def __call(self, chat_id: int, call: Callable[[], Any], priority: Priority) -> Optional[Any]:
+        """Sends through the message scheduler and waits for the result, except for low priority calls whose result
+        nobody needs
+        """
+        future = self.message_scheduler.submit(chat_id, call, priority)
+        if priority == Priority.LOW:
+            future.add_done_callback(self.__log_failure)
+            return None
+        return future.result()
+
+    def __log_failure(self, future: Future) -> None:
+        if future.exception() is not None:
+            self.logger.error(f'Sending failed: {future.exception()}')
 
     def __send(self, message: Message, context: CallbackContext, update: Update,
                reply: bool = True, chat_id: Optional[int] = None, format_kwargs: Optional[dict] = None,
-               send_message_kwargs: Optional[dict] = None) -> TelegramMessage:
+               send_message_kwargs: Optional[dict] = None) -> Optional[TelegramMessage]:
         if format_kwargs is None:
             format_kwargs = {}
         if send_message_kwargs is None:
             send_message_kwargs = {}
-        message = self.message_reader[message].format(**format_kwargs)
+        priority = self.message_priorities.get(message, Priority.NORMAL)
+        text = self.message_reader.format(message, **format_kwargs)
         if chat_id is not None:
-            return context.bot.send_message(chat_id, message, **send_message_kwargs)
+            return self.__call(
+                chat_id, lambda: context.bot.send_message(chat_id, text, **send_message_kwargs), priority
+            )
         if reply:
-            return update.message.reply_text(message, **send_message_kwargs)
-        return context.bot.send_message(update.effective_chat.id, message, **send_message_kwargs)
+            return self.__call(
+                update.effective_chat.id, lambda: update.message.reply_text(text, **send_message_kwargs), priority
+            )
+        return self.__call(
+            update.effective_chat.id,
+            lambda: context.bot.send_message(update.effective_chat.id, text, **send_message_kwargs),
+            priority,
+        )
 
     def start_command(self, update: Update, context: CallbackContext) -> State:
         room_id = chat_id_to_room_id(update.effective_chat.id)
@@ -79,7 +212,7 @@ class Bot:
         self.storage_controller.remove_user_from_room(room_id, update.effective_user)
         self.__send(Message.REMOVE_ME_SUCCESS, context, update)
 
-        conversation_context: Optional[ConversationContext] = context.bot_data.get('conversation_context', None)
+        conversation_context: Optional[ConversationContext] = getattr(context, 'conversation_context', None)
         if conversation_context and conversation_context.old_state == Bot.State.INIT_STATE:
             return None
 
@@ -93,55 +226,90 @@ class Bot:
         if not self.storage_controller.is_user_in_room(room_id, update.effective_user.id):
             self.__send(Message.UNKNOWN_USER, context, update)
             return Bot.State.INIT_STATE
+        difficulty = context.args[0].lower() if context.args else self.difficulty
+        if difficulty not in self.word_pools:
+            self.__send(Message.UNKNOWN_DIFFICULTY, context, update, format_kwargs={
+                'difficulties': ', '.join(self.word_pools),
+            })
+            return Bot.State.INIT_STATE
+        word_pool = self.word_pools[difficulty]
+        word_pool.start()
         self.__send(Message.GAME_START_1, context, update)
-        self.storage_controller.start_game(room_id, generate_wordlist(self.words_per_game))
+        # The words of a previous game that are still being fetched must not be added to this one
+        self.__cancel_questions(room_id)
+        try:
+            words = word_pool.take(1, room_id)
+        except LookupError:
+            self.logger.exception(f'No {difficulty} words for room {room_id}')
+            self.__send(Message.NO_WORDS, context, update)
+            return Bot.State.INIT_STATE
+        self.storage_controller.start_game(room_id, words)
+        if self.words_per_game > 1:
+            self.__start_fill(room_id, word_pool, self.words_per_game - 1)
         self.__send(Message.GAME_START_2, context, update, reply=False)
         return Bot.State.WAIT_ANS
 
     def vote_command(self, update: Update, context: CallbackContext) -> State:
         room_id = chat_id_to_room_id(update.effective_chat.id)
-        if not self.storage_controller.get_current_user_descriptions(room_id):
+        with self.storage_controller.open_room(room_id) as room:
+            user_descriptions = room.user_descriptions
+            description = room.current_description
+            word = room.current_word
+        if not user_descriptions:
             self.__send(Message.NO_VERSIONS, context, update)
             return Bot.State.WAIT_ANS
 
-        description_order = [(self.storage_controller.get_current_description(room_id), None)]
+        description_order = [(description, None)]
         description_order.extend((
             (description, user_id)
-            for user_id, description in self.storage_controller.get_current_user_descriptions(room_id).items()
+            for user_id, description in user_descriptions.items()
         ))
         assert len(description_order) > 1
 
         random.shuffle(description_order)
-        self.storage_controller.set_poll_description_order(room_id, description_order)
 
-        sent_message = update.message.reply_poll(
-            f'{self.storage_controller.get_current_word(room_id)}',
-            [description[:100] for description, user in description_order],
-            is_anonymous=False,
+        sent_message = self.__call(
+            update.effective_chat.id,
+            lambda: update.message.reply_poll(
+                f'{word}',
+                [description[:100] for description, user in description_order],
+                is_anonymous=False,
+            ),
+            Priority.HIGH,
         )
-        self.storage_controller.add_poll(room_id, sent_message.poll.id, sent_message.message_id)
+        with self.storage_controller.open_room(room_id) as room:
+            room.set_poll_description_order(description_order)
+            room.add_poll(sent_message.poll.id, sent_message.message_id)
+        self.__report_route('poll', sent_message.poll.id)
+        self.timing_wheel.cancel((Bot.Timer.ANSWERS, room_id))
+        self.timing_wheel.schedule((Bot.Timer.VOTES, room_id), self.vote_timeout)
         return Bot.State.WAIT_VOTE
 
     def vote_poll_answer(self, update: Update, context: CallbackContext):
         room_id = self.storage_controller.get_room_id_by_poll_id(update.poll_answer.poll_id)
-        chat_id = room_id_to_chat_id(room_id)
         if room_id is None:
             return
-        self.storage_controller.add_user_vote(room_id, update.poll_answer.user.id, update.poll_answer.option_ids[0])
-
-        if len(self.storage_controller.get_user_votes(room_id)) == len(self.storage_controller.get_users_in_room(room_id)):
-            context.bot.stop_poll(
-                chat_id, self.storage_controller.get_poll_message_id(room_id)
-            )
+        self.__touch(room_id)
+        chat_id = room_id_to_chat_id(room_id)
+        with self.storage_controller.open_room(room_id) as room:
+            room.add_user_vote(update.poll_answer.user.id, update.poll_answer.option_ids[0])
+            everybody_voted = len(room.user_votes) == len(room.participants)
+            poll_message_id = room.poll_message_id
+
+        if everybody_voted:
+            self.timing_wheel.cancel((Bot.Timer.VOTES, room_id))
+            self.__call(chat_id, lambda: context.bot.stop_poll(chat_id, poll_message_id), Priority.HIGH)
             self.__send(Message.VOTE_SUCCESS, context, update, chat_id=chat_id)
 
     def results_command(self, update: Update, context: CallbackContext) -> State:
         room_id = chat_id_to_room_id(update.effective_chat.id)
-        user_dict = self.storage_controller.get_users_in_room(room_id)
+        with self.storage_controller.open_room(room_id) as room:
+            user_dict = room.participants
+            description_order = room.description_order
+            user_votes = room.user_votes
         results = {user_id: 0 for user_id in user_dict}
         results['official'] = 0
-        description_order = self.storage_controller.get_description_order(room_id)
-        for user_id, vote in self.storage_controller.get_user_votes(room_id).items():
+        for user_id, vote in user_votes.items():
             author_id = description_order[vote][1]
             if author_id is None:
                 results['official'] += 1
@@ -157,18 +325,101 @@ class Bot:
 
     def next_command(self, update: Update, context: CallbackContext) -> State:
         room_id = chat_id_to_room_id(update.effective_chat.id)
-        try:
-            self.storage_controller.next_round(room_id)
-        except IndexError:
-            self.__send(Message.QUESTIONS_ENDED, context, update)
-            return Bot.State.INIT_STATE
-        return Bot.State.WAIT_ANS
+        # The word pool gives up on a word after `word_budget` and hands out a fallback one, so a fill that takes
+        # longer is stuck and the game ends as if it ran out of words
+        deadline = time.monotonic() + self.word_budget
+        while True:
+            with self.questions_added:
+                filling = room_id in self.question_fills
+                version = self.questions_version
+            try:
+                self.storage_controller.next_round(room_id)
+                return Bot.State.WAIT_ANS
+            except IndexError:
+                if filling and time.monotonic() >= deadline:
+                    self.logger.warning(f'No word for room {room_id} after {self.word_budget} s')
+                    self.__cancel_questions(room_id)
+                    filling = False
+                if not filling:
+                    self.__send(Message.QUESTIONS_ENDED, context, update)
+                    return Bot.State.INIT_STATE
+            # The next word is still being fetched
+            with self.questions_added:
+                self.questions_added.wait_for(
+                    lambda: self.questions_version != version, timeout=max(0., deadline - time.monotonic())
+                )
+
+    def resume_question_fills(self) -> None:
+        """Fills the games left with fewer than `words_per_game` words by a restart, as fills only live in memory.
+        The difficulty of a game isn't stored, so they get words of the default one
+        """
+        for (chat_id,), state in list(self.conversation_handler.conversations.items()):
+            if state not in (Bot.State.WAIT_ANS, Bot.State.WAIT_VOTE, Bot.State.ROUND_FINISH):
+                continue
+            room_id = chat_id_to_room_id(chat_id)
+            with self.questions_added:
+                if room_id in self.question_fills:
+                    continue
+            try:
+                room = self.storage_controller.load_room(room_id).room
+            except KeyError:
+                continue
+            if room.game is None:
+                continue
+            missing = self.words_per_game - len(room.game.question_set.questions)
+            if missing > 0:
+                self.__start_fill(room_id, self.word_pool, missing)
+
+    def __start_fill(self, room_id: str, word_pool: WordPool, count: int) -> None:
+        fill = object()
+        with self.questions_added:
+            self.question_fills[room_id] = fill
+        threading.Thread(
+            target=self.__fill_questions, args=(room_id, word_pool, fill, count), name=f'Questions{room_id}',
+            daemon=True,
+        ).start()
+
+    def __fill_questions(self, room_id: str, word_pool: WordPool, fill: object, count: int) -> None:
+        """Adds `count` words to a game one by one, so the next round only waits for its own word"""
+        for idx in range(count):
+            try:
+                words = word_pool.take(1, room_id)
+            except Exception:
+                self.logger.exception(f'Failed to generate words for room {room_id}')
+                words = None
+            with self.questions_added:
+                # Unless the game has ended or another one has started meanwhile
+                if self.question_fills.get(room_id) is not fill:
+                    return
+                try:
+                    if words is not None:
+                        self.storage_controller.add_questions(room_id, words)
+                except Exception:
+                    self.logger.exception(f'Failed to add words to room {room_id}')
+                    words = None
+                if words is None or idx == count - 1:
+                    del self.question_fills[room_id]
+                self.questions_version += 1
+                self.questions_added.notify_all()
+                if words is None:
+                    return
+
+    def __cancel_questions(self, room_id: str) -> None:
+        with self.questions_added:
+            if self.question_fills.pop(room_id, None) is not None:
+                self.questions_version += 1
+                self.questions_added.notify_all()
+
+    def __forget_words(self, room_id: str) -> None:
+        for word_pool in self.word_pools.values():
+            word_pool.forget(room_id)
 
     def stop_game_command(self, update: Update, context: CallbackContext) -> int:
         self.__send(Message.GAME_END, context, update)
         return ConversationHandler.END
 
     def receive_description_from_user(self, update: Update, context: CallbackContext) -> None:
+        broadcast = self.__take_broadcast(update)
         if not update.message.reply_to_message:
             self.__send(Message.PRIVATE_NEED_REPLY, context, update, chat_id=update.effective_user.id)
             return
@@ -178,41 +429,121 @@ class Bot:
                 update.message.reply_to_message.message_id,
             )
         except RoomNotFoundError:
-            self.__send(Message.PRIVATE_ROOM_NOT_FOUND, context, update)
+            # Another shard may have the room
+            if not broadcast:
+                self.__send(Message.PRIVATE_ROOM_NOT_FOUND, context, update)
             return
-        self.storage_controller.add_user_description(
-            room_id,
-            update.effective_user.id,
-            update.message.text
-        )
+        self.__touch(room_id)
+        with self.storage_controller.open_room(room_id) as room:
+            room.add_user_description(update.effective_user.id, update.message.text)
+            everybody_answered = len(room.participants) == len(room.user_descriptions)
         self.__send(Message.ANSWER_SAVED, context, update)
 
-        if len(self.storage_controller.get_users_in_room(room_id)) == \
-                len(self.storage_controller.get_current_user_descriptions(room_id)):
+        if everybody_answered:
+            self.timing_wheel.cancel((Bot.Timer.ANSWERS, room_id))
             chat_id = room_id_to_chat_id(room_id)
             self.__send(Message.VOTE_READY, context, update, chat_id=chat_id)
 
     def end_state_entry(self, update: Update, context: CallbackContext) -> None:
         room_id = chat_id_to_room_id(update.effective_chat.id)
         self.storage_controller.remove_room(room_id)
+        self.__cancel_questions(room_id)
+        self.__forget_words(room_id)
+        for timer in Bot.Timer:
+            self.timing_wheel.cancel((timer, room_id))
+
+    def __add_question_message(self, room_id: str, user_id: int, message_id: int) -> None:
+        self.storage_controller.add_user_question_message_id(room_id, user_id, message_id)
+        self.__report_route('private_message', (user_id, message_id))
 
     def wait_ans_entry(self, update: Update, context: CallbackContext) -> None:
         room_id = chat_id_to_room_id(update.effective_chat.id)
-        word = self.storage_controller.get_current_word(room_id)
+        with self.storage_controller.open_room(room_id) as room:
+            word = room.current_word
+            participants = dict(room.participants)
+        self.timing_wheel.cancel((Bot.Timer.VOTES, room_id))
+        self.timing_wheel.schedule((Bot.Timer.ANSWERS, room_id), self.answer_timeout)
         self.__send(Message.ROUND_START_1, context, update, reply=False, format_kwargs={'word': word})
         self.__send(Message.ROUND_START_2, context, update, reply=False)
-        for user_id in self.storage_controller.get_users_in_room(room_id):
-            sent_message = self.__send(
+        failed = self.fan_out.map(
+            lambda user_id: self.__send(
                 Message.ROUND_START_1, context, update,
                 chat_id=user_id, format_kwargs={'word': word}, send_message_kwargs={'reply_markup': ForceReply()}
-            )
-            self.storage_controller.add_user_question_message_id(room_id, user_id, sent_message.message_id)
-
-    def start(self):
-        updater = Updater(self.token, use_context=True)
+            ),
+            participants,
+            lambda user_id, sent_message: self.__add_question_message(room_id, user_id, sent_message.message_id),
+        )
+        if failed:
+            names = ', '.join(participants[user_id].username or participants[user_id].first_name for user_id in failed)
+            self.__send(Message.PRIVATE_SEND_FAILED, context, update, reply=False, format_kwargs={'names': names})
+
+    def touch_room(self, update: Update, context: CallbackContext) -> None:
+        chat = update.effective_chat
+        if chat is not None and chat.type != chat.PRIVATE:
+            self.__touch(chat_id_to_room_id(chat.id))
+
+    def expire_timers(self, context: CallbackContext) -> None:
+        for timer, room_id in self.timing_wheel.advance():
+            if self.chat_executor is None:
+                self.__expire(timer, room_id, context)
+            else:
+                # In order with the updates of the room's conversation
+                self.chat_executor.submit((room_id_to_chat_id(room_id),), self.__expire, timer, room_id, context)
 
+    def __expire(self, timer: Timer, room_id: str, context: CallbackContext) -> None:
+        if (timer, room_id) in self.timing_wheel:
+            # Scheduled again by an update handled meanwhile
+            return
+        chat_id = room_id_to_chat_id(room_id)
+        state = None
+        if self.conversation_handler is not None:
+            state = self.conversation_handler.conversations.get((chat_id,))
+        if timer == Bot.Timer.IDLE:
+            self.__evict(room_id)
+        elif timer == Bot.Timer.ANSWERS and state == Bot.State.WAIT_ANS:
+            self.__send(Message.ANSWERS_DEADLINE, context, None, chat_id=chat_id)
+        elif timer == Bot.Timer.VOTES and state == Bot.State.WAIT_VOTE:
+            poll_message_id = self.storage_controller.get_poll_message_id(room_id)
+            self.__call(chat_id, lambda: context.bot.stop_poll(chat_id, poll_message_id), Priority.HIGH)
+            self.__send(Message.VOTES_DEADLINE, context, None, chat_id=chat_id)
+
+    def __evict(self, room_id: str) -> None:
+        if self.room_archive is not None:
+            try:
+                self.room_archive(self.storage_controller.load_room(room_id).room)
+            except KeyError:
+                pass
+        self.storage_controller.remove_room(room_id)
+        self.__cancel_questions(room_id)
+        self.__forget_words(room_id)
+        for timer in Bot.Timer:
+            self.timing_wheel.cancel((timer, room_id))
+        if self.conversation_handler is not None:
+            self.conversation_handler.end_conversation((room_id_to_chat_id(room_id),))
+        self.logger.info(f'Room {room_id} removed after {self.idle_timeout} s without updates')
+
+    def warm_up(self, context: CallbackContext) -> None:
+        """Loads what the first game needs off the startup path and starts filling the word pool"""
+        started = time.perf_counter()
+        if self.corpus is None:
+            # The same searcher the word pools use, so the nouns are listed and indexed once
+            warm_up(cache_path=self.cache_path, sections=True)
+        self.word_pool.start()
+        self.logger.info(f'Warmed up in {time.perf_counter() - started:.2f} s')
+
+    def start(self, webhook_url: Optional[str] = None, webhook_port: int = 8443, webhook_secret: Optional[str] = None,
+              max_pending_updates: int = 1000, updates: Optional[multiprocessing.Queue] = None):
+        """Polls for updates, or with a `webhook_url` receives them on `webhook_port`, or when run as a shard reads
+        them from `updates`
+        """
+        updater = Updater(self.token, use_context=True, workers=self.workers, request_kwargs={
+            'con_pool_size': self.workers + self.message_scheduler.workers + 4,
+        })
+
+        chat_executor = ChatExecutor(self.chat_workers)
+        self.chat_executor = chat_executor
         dispatcher = updater.dispatcher
-        dispatcher.add_handler(ConversationHandler(
+        conversation_handler = ConversationHandler(
             entry_points=[CommandHandler("start", self.start_command)],
             states={
                 Bot.State.INIT_STATE: [
@@ -245,10 +576,35 @@ class Bot:
             per_user=False,
             per_message=False,
             allow_reentry=True,
+            executor=chat_executor,
+            state_listener=self.__save_conversation_state,
+        )
+        conversation_states = {
+            key: Bot.State[state] for key, state in self.storage_controller.get_conversation_states().items()
+        }
+        conversation_handler.conversations.update(conversation_states)
+        self.conversation_handler = conversation_handler
+        for chat_id, in conversation_states:
+            self.__touch(chat_id_to_room_id(chat_id))
+        self.resume_question_fills()
+        dispatcher.add_handler(TypeHandler(Update, self.touch_room), group=-1)
+        dispatcher.add_handler(conversation_handler)
+        dispatcher.add_handler(PollAnswerHandler(self.vote_poll_answer, run_async=True))
+        dispatcher.add_handler(MessageHandler(
+            Filters.chat_type.private, self.receive_description_from_user, run_async=True
         ))
-        dispatcher.add_handler(PollAnswerHandler(self.vote_poll_answer))
-        dispatcher.add_handler(MessageHandler(Filters.chat_type.private, self.receive_description_from_user))
 
-        updater.start_polling()
-
-        updater.idle()
+        updater.job_queue.run_repeating(self.expire_timers, interval=self.timing_wheel.tick)
+        # The job queue starts once updates are being received
+        updater.job_queue.run_once(self.warm_up, 0)
+        if updates is not None:
+            read_updates(updater, updates, on_broadcast=self.__add_broadcast)
+        else:
+            receive_updates(
+                updater, webhook_url, webhook_port, webhook_secret, max_pending_updates,
+                backlog=lambda: dispatcher.update_queue.qsize() + chat_executor.pending,
+            )
+        chat_executor.shutdown()
+        self.fan_out.shutdown()
+        self.message_scheduler.stop()
+        self.storage_controller.close()
@@ -1,8 +1,10 @@
-from dataclasses import dataclass
-
 from bot.dto.question_set import QuestionSet
+from bot.dto.slotted import Slotted
+
 
+class Game(Slotted):
+    __slots__ = ('question_set',)
+    FIELDS = __slots__
 
-@dataclass
-class Game:
-    question_set: QuestionSet
+    def __init__(self, question_set: QuestionSet):
+        self.question_set = question_set
@@ -1,13 +1,83 @@
-from dataclasses import dataclass, field
 import typing
 
+from bot.dto.slotted import EMPTY_MAPPING, Slotted
 
-@dataclass
-class GameState:
-    question_idx: int
-    user_descriptions: typing.Dict[int, str] = field(default_factory=dict)
-    poll_description_order: typing.List[typing.Tuple[str, typing.Optional[int]]] = field(default_factory=list)
-    user_votes: typing.Dict[int, int] = field(default_factory=dict)
-    user_question_message_id: typing.Dict[int, int] = field(default_factory=dict)
-    poll_id: str = None
-    poll_message_id: int = None
+
+class GameState(Slotted):
+    """The state of a round.
+
+    Its dicts and the description order are only allocated when something is
+    put to them, until then they read as empty and read-only, so they are
+    changed through the `add_*` and `set_*` methods.
+    """
+
+    __slots__ = (
+        'question_idx', '_user_descriptions', '_poll_description_order', '_user_votes', '_user_question_message_id',
+        'poll_id', 'poll_message_id',
+    )
+    FIELDS = (
+        'question_idx', 'user_descriptions', 'poll_description_order', 'user_votes', 'user_question_message_id',
+        'poll_id', 'poll_message_id',
+    )
+
+    def __init__(self, question_idx: int,
+                 user_descriptions: typing.Optional[typing.Dict[int, str]] = None,
+                 poll_description_order: typing.Optional[typing.List[typing.Tuple[str, typing.Optional[int]]]] = None,
+                 user_votes: typing.Optional[typing.Dict[int, int]] = None,
+                 user_question_message_id: typing.Optional[typing.Dict[int, int]] = None,
+                 poll_id: typing.Optional[str] = None,
+                 poll_message_id: typing.Optional[int] = None):
+        self.question_idx = question_idx
+        self._user_descriptions = user_descriptions or None
+        self._poll_description_order = poll_description_order or None
+        self._user_votes = user_votes or None
+        self._user_question_message_id = user_question_message_id or None
+        self.poll_id = poll_id
+        self.poll_message_id = poll_message_id
+
+    @property
+    def user_descriptions(self) -> typing.Mapping[int, str]:
+        return self._user_descriptions or EMPTY_MAPPING
+
+    @property
+    def poll_description_order(self) -> typing.Sequence[typing.Tuple[str, typing.Optional[int]]]:
+        return self._poll_description_order or ()
+
+    @property
+    def user_votes(self) -> typing.Mapping[int, int]:
+        return self._user_votes or EMPTY_MAPPING
+
+    @property
+    def user_question_message_id(self) -> typing.Mapping[int, int]:
+        return self._user_question_message_id or EMPTY_MAPPING
+
+    def add_user_description(self, user_id: int, description: str) -> None:
+        if self._user_descriptions is None:
+            self._user_descriptions = {}
+        self._user_descriptions[user_id] = description
+
+    def set_poll_description_order(self,
+                                   description_order: typing.List[typing.Tuple[str, typing.Optional[int]]]) -> None:
+        self._poll_description_order = description_order or None
+
+    def add_user_vote(self, user_id: int, vote: int) -> None:
+        if self._user_votes is None:
+            self._user_votes = {}
+        self._user_votes[user_id] = vote
+
+    def add_user_question_message_id(self, user_id: int, message_id: int) -> None:
+        if self._user_question_message_id is None:
+            self._user_question_message_id = {}
+        self._user_question_message_id[user_id] = message_id
+
+    def remove_user_question_message_id(self, user_id: int) -> typing.Optional[int]:
+        if self._user_question_message_id is None:
+            return None
+        return self._user_question_message_id.pop(user_id, None)
+
+    def copy(self) -> 'GameState':
+        """A copy whose dicts can be changed without changing these"""
+        return GameState(
+            self.question_idx, dict(self.user_descriptions), list(self.poll_description_order), dict(self.user_votes),
+            dict(self.user_question_message_id), self.poll_id, self.poll_message_id,
+        )
@@ -1,7 +1,10 @@
-from dataclasses import dataclass
+from bot.dto.slotted import Slotted
 
 
-@dataclass
-class Question:
-    word: str
-    description: str
+class Question(Slotted):
+    __slots__ = ('word', 'description')
+    FIELDS = __slots__
+
+    def __init__(self, word: str, description: str):
+        self.word = word
+        self.description = description
@@ -1,9 +1,16 @@
-from dataclasses import dataclass, field
 import typing
 
 from bot.dto.question import Question
+from bot.dto.slotted import Slotted
 
 
-@dataclass
-class QuestionSet:
-    questions: typing.List[Question] = field(default_factory=list)
+class QuestionSet(Slotted):
+    """The questions of a game. A game can start with only its first question, the others are appended while it is
+    played
+    """
+
+    __slots__ = ('questions',)
+    FIELDS = __slots__
+
+    def __init__(self, questions: typing.Optional[typing.List[Question]] = None):
+        self.questions = questions if questions is not None else []
@@ -1,16 +1,41 @@
-from dataclasses import dataclass, field
 import typing
 
 from bot.dto.game import Game
 from bot.dto.game_state import GameState
+from bot.dto.slotted import EMPTY_MAPPING, Slotted
 from bot.dto.user import User
 
 
-@dataclass
-class Room:
+class Room(Slotted):
+    """A chat's game. Participants read as an empty read-only dict until somebody joins, so they are changed
+    through `add_participant` and `remove_participant`
+    """
+
     ID_TYPE = str
 
-    id: ID_TYPE
-    game: Game = None
-    game_state: GameState = None
-    participants: typing.Dict[int, User] = field(default_factory=dict)
+    __slots__ = ('id', 'game', 'game_state', '_participants')
+    FIELDS = ('id', 'game', 'game_state', 'participants')
+
+    def __init__(self, id: ID_TYPE, game: typing.Optional[Game] = None, game_state: typing.Optional[GameState] = None,
+                 participants: typing.Optional[typing.Dict[int, User]] = None):
+        self.id = id
+        self.game = game
+        self.game_state = game_state
+        self._participants = participants or None
+
+    @property
+    def participants(self) -> typing.Mapping[int, User]:
+        return self._participants or EMPTY_MAPPING
+
+    def add_participant(self, user: User) -> None:
+        if self._participants is None:
+            self._participants = {}
+        self._participants[user.id] = user
+
+    def remove_participant(self, user_id: int) -> typing.Optional[User]:
+        if self._participants is None:
+            return None
+        user = self._participants.pop(user_id, None)
+        if not self._participants:
+            self._participants = None
+        return user
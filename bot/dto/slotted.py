@@ -0,0 +1,40 @@
+import types
+import typing
+
+
+# What lazily allocated dicts read as before anything is put to them
+EMPTY_MAPPING: typing.Mapping = types.MappingProxyType({})
+
+
+class Slotted:
+    """Equality, repr and `to_dict` over the `FIELDS` of a class with `__slots__`, like a dataclass has.
+
+    Instances have no `__dict__`, which matters with a million rooms in memory.
+    """
+
+    __slots__ = ()
+    FIELDS: typing.Tuple[str, ...] = ()
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.FIELDS)
+        return f'{type(self).__name__}({fields})'
+
+    def to_dict(self) -> dict:
+        return {name: _to_data(getattr(self, name)) for name in self.FIELDS}
+
+
+def _to_data(value: object) -> object:
+    if isinstance(value, Slotted):
+        return value.to_dict()
+    if isinstance(value, typing.Mapping):
+        return {key: _to_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_data(item) for item in value]
+    return value
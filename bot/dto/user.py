@@ -1,3 +1,26 @@
-import telegram
+import typing
 
-User = telegram.User
+from bot.dto.slotted import Slotted
+
+
+class User(Slotted):
+    """The fields of a `telegram.User` the game needs"""
+
+    __slots__ = ('id', 'first_name', 'username')
+    FIELDS = __slots__
+
+    def __init__(self, id: int, first_name: str, username: typing.Optional[str] = None):
+        self.id = id
+        self.first_name = first_name
+        self.username = username
+
+    @classmethod
+    def of(cls, user: typing.Any) -> 'User':
+        """The `User` of a `telegram.User`, or `user` itself if it is one"""
+        if isinstance(user, cls):
+            return user
+        return cls(user.id, user.first_name, user.username)
+
+    @classmethod
+    def from_dict(cls, data: typing.Mapping[str, typing.Any]) -> 'User':
+        return cls(data['id'], data['first_name'], data.get('username'))
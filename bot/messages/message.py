@@ -10,6 +10,8 @@ class Message(Enum):
     UNKNOWN_USER = auto()
     GAME_START_1 = auto()
     GAME_START_2 = auto()
+    UNKNOWN_DIFFICULTY = auto()
+    NO_WORDS = auto()
     ROUND_START_1 = auto()
     ROUND_START_2 = auto()
     NO_VERSIONS = auto()
@@ -21,5 +23,8 @@ class Message(Enum):
     QUESTIONS_ENDED = auto()
     PRIVATE_NEED_REPLY = auto()
     PRIVATE_ROOM_NOT_FOUND = auto()
+    PRIVATE_SEND_FAILED = auto()
+    ANSWERS_DEADLINE = auto()
+    VOTES_DEADLINE = auto()
     GAME_END_EVERYBODY_LEFT = auto()
     GAME_END = auto()
@@ -1,23 +1,75 @@
+import csv
 import logging
-import os
 import pathlib
-
-import pandas as pd
+import string
+import typing
 
 from bot.messages.message import Message
 
 
+class Template:
+    """A message text parsed once, so formatting it costs a dict lookup when it has no fields"""
+
+    __slots__ = ('text', 'fields')
+
+    def __init__(self, text: str):
+        self.text = text.replace('\\n', '\n')
+        self.fields = tuple(field for _, field, _, _ in string.Formatter().parse(self.text) if field is not None)
+        if not self.fields:
+            # Only braces escaped as {{ and }} to resolve
+            self.text = self.text.format()
+
+    def format(self, **kwargs: typing.Any) -> str:
+        if not self.fields:
+            return self.text
+        return self.text.format_map(kwargs)
+
+
 class MessageReader:
+    """Reads the messages of every language in `root_path` at startup. `lang` is the one used by default"""
+
     def __init__(self, root_path: pathlib.Path, lang: str = 'en') -> None:
-        messages_file = root_path / f'messages_{lang}.tsv'
-        assert os.path.isfile(messages_file), f'Messages for language {lang} do not exist'
-        self.messages = pd.read_csv(messages_file, encoding='utf8', sep='\t', index_col=0)
         self.logger = logging.getLogger(__name__)
+        self.languages = {
+            path.stem[len('messages_'):]: self.__read(path) for path in sorted(root_path.glob('messages_*.tsv'))
+        }
+        assert lang in self.languages, f'Messages for language {lang} do not exist'
+        self.lang = lang
+        self.templates = self.languages[lang]
+        missing = [message.name for message in Message if message not in self.templates]
+        if missing:
+            self.logger.warning(f'No {lang} text for messages {", ".join(missing)}')
 
     def __getitem__(self, message: Message) -> str:
-        if message.name not in self.messages.index:
+        return self.template(message).text
+
+    def template(self, message: Message, lang: typing.Optional[str] = None) -> Template:
+        templates = self.templates if lang is None else self.languages[lang]
+        template = templates.get(message)
+        if template is None:
+            self.logger.error(f'No such message {message}')
+            raise LookupError
+        return template
+
+    def format(self, message: Message, lang: typing.Optional[str] = None, **kwargs: typing.Any) -> str:
+        # Called for every message sent, so `template` and `Template.format` are inlined
+        try:
+            template = (self.templates if lang is None else self.languages[lang])[message]
+        except KeyError:
             self.logger.error(f'No such message {message}')
             raise LookupError
-        message = self.messages.loc[message.name].text
-        self.logger.info(message)
-        return message.replace('\\n', '\n')
+        if not template.fields:
+            return template.text
+        return template.text.format_map(kwargs)
+
+    def __read(self, path: pathlib.Path) -> typing.Dict[Message, Template]:
+        templates = {}
+        with open(path, encoding='utf8', newline='') as f:
+            rows = csv.reader(f, delimiter='\t')
+            # The first row is the header
+            for code, text in list(rows)[1:]:
+                if code not in Message.__members__:
+                    self.logger.warning(f'{path} has unknown message {code}')
+                    continue
+                templates[Message[code]] = Template(text)
+        return templates
@@ -0,0 +1,144 @@
+import collections
+import logging
+import multiprocessing
+import signal
+import threading
+import zlib
+from typing import Callable, Hashable, List, Optional
+
+from telegram import Update
+from telegram.ext import TypeHandler, Updater
+
+from bot.bot import Bot, chat_id_to_room_id
+from bot.telegram_extensions.update_sources import receive_updates
+
+
+def shard_of(room_id: str, shards: int) -> int:
+    # Not `hash`, it differs between processes
+    return zlib.crc32(room_id.encode('utf8')) % shards
+
+
+class ShardRouter:
+    """Decides which shards get an update.
+
+    Updates from a chat go to the shard owning its room. Poll answers and
+    replies to the private round prompts don't say which room they belong to,
+    so shards report the polls and prompts they send and those routes are
+    remembered here, the most recent `max_routes` of each kind. Those not
+    remembered, after a restart or once forgotten, go to every shard.
+    """
+
+    def __init__(self, shards: int, max_routes: int = 100000):
+        self.shards = shards
+        self.max_routes = max_routes
+        self.routes = {
+            'poll': collections.OrderedDict(),
+            'private_message': collections.OrderedDict(),
+        }
+        self.lock = threading.Lock()
+
+    def add_route(self, kind: str, key: Hashable, shard: int) -> None:
+        routes = self.routes[kind]
+        with self.lock:
+            routes[key] = shard
+            routes.move_to_end(key)
+            if len(routes) > self.max_routes:
+                routes.popitem(last=False)
+
+    def route(self, update: Update) -> List[int]:
+        if update.poll_answer is not None:
+            with self.lock:
+                shard = self.routes['poll'].get(update.poll_answer.poll_id)
+            # Every shard ignores a poll it doesn't know
+            return list(range(self.shards)) if shard is None else [shard]
+        chat = update.effective_chat
+        if chat is None:
+            return []
+        message = update.effective_message
+        if chat.type == chat.PRIVATE and message is not None and message.reply_to_message is not None:
+            with self.lock:
+                shard = self.routes['private_message'].get((chat.id, message.reply_to_message.message_id))
+            # Every shard ignores a reply to a prompt it didn't send
+            return list(range(self.shards)) if shard is None else [shard]
+        return [shard_of(chat_id_to_room_id(chat.id), self.shards)]
+
+
+def _run_shard(make_bot: Callable[[int], Bot], shard: int, updates: multiprocessing.Queue,
+               routes: multiprocessing.Queue) -> None:
+    # The supervisor handles signals and tells shards to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    bot = make_bot(shard)
+    bot.route_reporter = lambda kind, key: routes.put((kind, key, shard))
+    bot.start(updates=updates)
+
+
+class ShardSupervisor:
+    """Runs a bot as `shards` worker processes, each owning the rooms whose id hashes to it.
+
+    The supervisor receives updates and sends each to the owning shard over a
+    queue. `make_bot(shard)` is called in the worker process and should give
+    every shard its own storage and a `1 / shards` share of the bot's message
+    rate, as Telegram's flood limit is for the bot as a whole. A webhook
+    refuses updates once the shard queues hold `max_pending_updates` of them.
+    """
+
+    def __init__(self, token: str, make_bot: Callable[[int], Bot], shards: int):
+        self.token = token
+        self.make_bot = make_bot
+        self.router = ShardRouter(shards)
+        self.updates: List[multiprocessing.Queue] = []
+        self.routes: Optional[multiprocessing.Queue] = None
+        self.processes: List[multiprocessing.Process] = []
+        self.routes_thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    def start_shards(self) -> None:
+        self.routes = multiprocessing.Queue()
+        for shard in range(self.router.shards):
+            updates = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_run_shard, args=(self.make_bot, shard, updates, self.routes), name=f'Shard{shard}'
+            )
+            process.start()
+            self.updates.append(updates)
+            self.processes.append(process)
+        self.routes_thread = threading.Thread(target=self.__read_routes, name='ShardRoutes', daemon=True)
+        self.routes_thread.start()
+        self.logger.info(f'Started {len(self.processes)} shards')
+
+    def stop_shards(self) -> None:
+        for updates in self.updates:
+            updates.put(None)
+        for process in self.processes:
+            process.join()
+        self.routes.put(None)
+        self.routes_thread.join()
+
+    def route(self, update: Update) -> None:
+        data = update.to_dict()
+        shards = self.router.route(update)
+        # Shards that don't know a broadcast private reply stay silent instead of each saying so
+        broadcast = len(shards) > 1 and update.poll_answer is None
+        for shard in shards:
+            self.updates[shard].put((data, broadcast))
+
+    def start(self, webhook_url: Optional[str] = None, webhook_port: int = 8443, webhook_secret: Optional[str] = None,
+              max_pending_updates: int = 1000) -> None:
+        self.start_shards()
+        updater = Updater(self.token, use_context=True, workers=0)
+        updater.dispatcher.add_handler(TypeHandler(Update, lambda update, context: self.route(update)))
+        receive_updates(
+            updater, webhook_url, webhook_port, webhook_secret, max_pending_updates,
+            backlog=lambda: updater.dispatcher.update_queue.qsize() + sum(
+                updates.qsize() for updates in self.updates
+            ),
+        )
+        self.stop_shards()
+
+    def __read_routes(self) -> None:
+        while True:
+            route = self.routes.get()
+            if route is None:
+                return
+            self.router.add_route(*route)
@@ -1,3 +1,5 @@
+import contextlib
+import threading
 import typing
 
 from bot.dto.room import Room
@@ -8,6 +10,8 @@ from bot.dto.question_set import QuestionSet
 from bot.dto.question import Question
 
 from bot.storage.exceptions import RoomNotFoundError
+from bot.storage.locks import LockStripes
+from bot.storage.room_handle import RoomHandle
 
 from bot.storage.storage_controller_base import StorageControllerBase
 
@@ -15,89 +19,183 @@ from bot.storage.inmemory.storage import Storage
 
 
 class InmemoryStorageController(StorageControllerBase):
-    def __init__(self, *args, **kwargs):
+    """Keeps rooms in process memory.
+
+    Every room is guarded by one of `room_locks`, so handlers for different
+    chats can run in parallel. `rooms_lock` is only taken to create or remove
+    a room, and `index_lock` for the short updates of the lookup indexes.
+    Getters return copies, so callers can iterate them without a lock.
+    """
+
+    def __init__(self, *args, lock_stripes: int = 256, **kwargs):
         super().__init__(*args, **kwargs)
         self.storage = Storage()
+        self.room_locks = LockStripes(lock_stripes)
+        self.rooms_lock = threading.RLock()
+        self.index_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def open_room(self, room_id: Room.ID_TYPE) -> typing.Iterator[RoomHandle]:
+        with self.room_locks[room_id]:
+            with super().open_room(room_id) as handle:
+                yield handle
+
+    def load_room(self, room_id: Room.ID_TYPE) -> RoomHandle:
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            game_state = room.game_state.copy() if room.game_state is not None else None
+            return RoomHandle(Room(room.id, room.game, game_state, dict(room.participants)))
 
     def create_room(self, room_id: Room.ID_TYPE) -> None:
-        self.storage.rooms[room_id] = Room(room_id)
+        with self.rooms_lock, self.room_locks[room_id]:
+            self.remove_room(room_id)
+            self.storage.rooms[room_id] = Room(room_id)
 
     def remove_room(self, room_id: Room.ID_TYPE) -> None:
-        self.storage.rooms.pop(room_id, None)
+        with self.rooms_lock, self.room_locks[room_id]:
+            room = self.storage.rooms.pop(room_id, None)
+            if room is None:
+                return
+            self._unindex_game_state(room)
+            for user_id in room.participants:
+                self._unindex_user(room_id, user_id)
 
     def add_user_to_room(self, room_id: Room.ID_TYPE, user: User) -> None:
-        self.storage.rooms[room_id].participants[user.id] = user
+        with self.room_locks[room_id]:
+            self.storage.rooms[room_id].add_participant(User.of(user))
+            with self.index_lock:
+                self.storage.user_rooms.setdefault(user.id, set()).add(room_id)
 
     def remove_user_from_room(self, room_id: Room.ID_TYPE, user: User) -> None:
-        room = self.storage.rooms[room_id]
-        if user.id in room.participants:
-            room.participants.pop(user.id)
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            if room.remove_participant(user.id) is None:
+                return
+            self._unindex_user(room_id, user.id)
+            if room.game_state is not None:
+                message_id = room.game_state.remove_user_question_message_id(user.id)
+                if message_id is not None:
+                    with self.index_lock:
+                        self.storage.private_message_rooms.pop((user.id, message_id), None)
 
     def is_user_in_room(self, room_id: Room.ID_TYPE, user_id: int) -> bool:
-        return user_id in self.storage.rooms[room_id].participants
+        with self.room_locks[room_id]:
+            return user_id in self.storage.rooms[room_id].participants
+
+    def get_user_room_ids(self, user_id: int) -> typing.Set[Room.ID_TYPE]:
+        with self.index_lock:
+            return set(self.storage.user_rooms.get(user_id, ()))
 
     def get_users_in_room(self, room_id: Room.ID_TYPE) -> typing.Dict[int, User]:
-        return self.storage.rooms[room_id].participants
+        with self.room_locks[room_id]:
+            return dict(self.storage.rooms[room_id].participants)
 
     def start_game(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
-        self.storage.rooms[room_id].game = Game(QuestionSet(
-            [Question(word, description) for word, description in questions]
-        ))
-        self.storage.rooms[room_id].game_state = GameState(0)
+        questions = [Question(word, description) for word, description in questions]
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            self._unindex_game_state(room)
+            room.game = Game(QuestionSet(questions))
+            room.game_state = GameState(0)
+
+    def add_questions(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        questions = [Question(word, description) for word, description in questions]
+        with self.room_locks[room_id]:
+            self.storage.rooms[room_id].game.question_set.questions.extend(questions)
 
     def next_round(self, room_id: Room.ID_TYPE) -> None:
-        old_question_idx = self.storage.rooms[room_id].game_state.question_idx
-        if old_question_idx == len(self.storage.rooms[room_id].game.question_set.questions) - 1:
-            raise IndexError
-        self.storage.rooms[room_id].game_state = GameState(old_question_idx+1)
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            old_question_idx = room.game_state.question_idx
+            if old_question_idx == len(room.game.question_set.questions) - 1:
+                raise IndexError
+            self._unindex_game_state(room)
+            room.game_state = GameState(old_question_idx+1)
 
     def get_current_word(self, room_id: Room.ID_TYPE) -> str:
-        room = self.storage.rooms[room_id]
-        return room.game.question_set.questions[room.game_state.question_idx].word
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            return room.game.question_set.questions[room.game_state.question_idx].word
 
     def get_current_description(self, room_id: Room.ID_TYPE) -> str:
-        room = self.storage.rooms[room_id]
-        return room.game.question_set.questions[room.game_state.question_idx].description
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            return room.game.question_set.questions[room.game_state.question_idx].description
 
     def get_current_user_descriptions(self, room_id: Room.ID_TYPE) -> typing.Dict[int, str]:
-        room = self.storage.rooms[room_id]
-        return room.game_state.user_descriptions
+        with self.room_locks[room_id]:
+            return dict(self.storage.rooms[room_id].game_state.user_descriptions)
 
     def add_user_question_message_id(self, room_id: Room.ID_TYPE, user_id: int, message_id: int) -> None:
-        room = self.storage.rooms[room_id]
-        room.game_state.user_question_message_id[user_id] = message_id
+        with self.room_locks[room_id]:
+            room = self.storage.rooms[room_id]
+            old_message_id = room.game_state.user_question_message_id.get(user_id)
+            room.game_state.add_user_question_message_id(user_id, message_id)
+            with self.index_lock:
+                if old_message_id is not None:
+                    self.storage.private_message_rooms.pop((user_id, old_message_id), None)
+                self.storage.private_message_rooms[(user_id, message_id)] = room_id
 
     def get_room_id_by_private_message_id(self, user_id: int, message_id: int) -> Room.ID_TYPE:
-        user_rooms = list(filter(lambda room: user_id in room.participants, self.storage.rooms.values()))
-        for room in user_rooms:
-            if room.game_state.user_question_message_id[user_id] == message_id:
-                return room.id
-        raise RoomNotFoundError
+        room_id = self.storage.private_message_rooms.get((user_id, message_id))
+        if room_id is None:
+            raise RoomNotFoundError
+        return room_id
 
     def add_user_description(self, room_id: Room.ID_TYPE, user_id: int, description: str) -> None:
-        self.storage.rooms[room_id].game_state.user_descriptions[user_id] = description
+        with self.room_locks[room_id]:
+            self.storage.rooms[room_id].game_state.add_user_description(user_id, description)
 
     def set_poll_description_order(self, room_id: Room.ID_TYPE,
                                    description_order: typing.List[typing.Tuple[str, typing.Optional[int]]]) -> None:
-        self.storage.rooms[room_id].game_state.poll_description_order = description_order
+        with self.room_locks[room_id]:
+            self.storage.rooms[room_id].game_state.set_poll_description_order(description_order)
 
     def get_description_order(self, room_id: Room.ID_TYPE) -> typing.List[typing.Tuple[str, typing.Optional[int]]]:
-        return self.storage.rooms[room_id].game_state.poll_description_order
+        with self.room_locks[room_id]:
+            return list(self.storage.rooms[room_id].game_state.poll_description_order)
 
     def add_poll(self, room_id: Room.ID_TYPE, poll_id: str, message_id: int) -> None:
-        self.storage.rooms[room_id].game_state.poll_id = poll_id
-        self.storage.rooms[room_id].game_state.poll_message_id = message_id
+        with self.room_locks[room_id]:
+            game_state = self.storage.rooms[room_id].game_state
+            old_poll_id = game_state.poll_id
+            game_state.poll_id = poll_id
+            game_state.poll_message_id = message_id
+            with self.index_lock:
+                if old_poll_id is not None:
+                    self.storage.poll_rooms.pop(old_poll_id, None)
+                self.storage.poll_rooms[poll_id] = room_id
 
     def get_room_id_by_poll_id(self, poll_id: str) -> typing.Optional[Room.ID_TYPE]:
-        for room in self.storage.rooms.values():
-            if room.game_state.poll_id == poll_id:
-                return room.id
+        return self.storage.poll_rooms.get(poll_id)
 
     def get_poll_message_id(self, room_id) -> int:
-        return self.storage.rooms[room_id].game_state.poll_message_id
+        with self.room_locks[room_id]:
+            return self.storage.rooms[room_id].game_state.poll_message_id
 
     def add_user_vote(self, room_id: Room.ID_TYPE, user_id: int, vote: int) -> None:
-        self.storage.rooms[room_id].game_state.user_votes[user_id] = vote
+        with self.room_locks[room_id]:
+            self.storage.rooms[room_id].game_state.add_user_vote(user_id, vote)
 
     def get_user_votes(self, room_id: Room.ID_TYPE) -> typing.Dict[int, int]:
-        return self.storage.rooms[room_id].game_state.user_votes
+        with self.room_locks[room_id]:
+            return dict(self.storage.rooms[room_id].game_state.user_votes)
+
+    def _unindex_game_state(self, room: Room) -> None:
+        game_state = room.game_state
+        if game_state is None:
+            return
+        with self.index_lock:
+            if game_state.poll_id is not None:
+                self.storage.poll_rooms.pop(game_state.poll_id, None)
+            for user_id, message_id in game_state.user_question_message_id.items():
+                self.storage.private_message_rooms.pop((user_id, message_id), None)
+
+    def _unindex_user(self, room_id: Room.ID_TYPE, user_id: int) -> None:
+        with self.index_lock:
+            user_rooms = self.storage.user_rooms.get(user_id)
+            if user_rooms is None:
+                return
+            user_rooms.discard(room_id)
+            if not user_rooms:
+                self.storage.user_rooms.pop(user_id)
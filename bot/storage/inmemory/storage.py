@@ -7,3 +7,6 @@ from bot.dto.room import Room
 @dataclass
 class Storage:
     rooms: typing.Dict[Room.ID_TYPE, Room] = field(default_factory=dict)
+    poll_rooms: typing.Dict[str, Room.ID_TYPE] = field(default_factory=dict)
+    private_message_rooms: typing.Dict[typing.Tuple[int, int], Room.ID_TYPE] = field(default_factory=dict)
+    user_rooms: typing.Dict[int, typing.Set[Room.ID_TYPE]] = field(default_factory=dict)
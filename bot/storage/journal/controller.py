@@ -0,0 +1,199 @@
+import logging
+import pathlib
+import threading
+import typing
+
+from bot.dto.room import Room
+from bot.dto.user import User
+
+from bot.storage.inmemory.controller import InmemoryStorageController
+
+from bot.storage.journal import snapshot
+from bot.storage.journal.journal import Journal
+from bot.storage.journal.snapshot import encode_user, decode_user
+
+
+class JournaledStorageController(InmemoryStorageController):
+    """Keeps rooms in memory like `InmemoryStorageController` and journals every change to `directory`.
+
+    Each change is appended to the journal under the room's lock, so the
+    journal has the changes of a room in the order they were made, and is
+    written to disk by the journal's writer thread. Every `snapshot_records`
+    changes the journal moves to a new segment and a background thread folds
+    the closed segments into a snapshot, so a restart loads the latest
+    snapshot and replays only the segments written after it.
+    """
+
+    def __init__(self, directory: typing.Union[str, pathlib.Path], snapshot_records: int = 100000,
+                 commit_interval: float = 0.01, sync: bool = True, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.conversations: typing.Dict[typing.Tuple[int, ...], str] = {}
+        self.conversations_lock = threading.Lock()
+        self.compaction_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self.journal = None
+        segment = self.__recover()
+        self.journal = Journal(self.directory, commit_interval, snapshot_records, self.__compact_async, sync)
+        self.journal.open(segment)
+
+    def flush(self) -> None:
+        self.journal.flush()
+
+    def snapshot(self) -> None:
+        """Folds everything journaled so far into a snapshot"""
+        self.__compact(self.journal.rotate())
+
+    def close(self) -> None:
+        self.journal.close()
+        with self.compaction_lock:
+            pass
+
+    def create_room(self, room_id: Room.ID_TYPE) -> None:
+        with self.rooms_lock, self.room_locks[room_id]:
+            super().create_room(room_id)
+            self.__journal('create_room', room_id)
+
+    def remove_room(self, room_id: Room.ID_TYPE) -> None:
+        with self.rooms_lock, self.room_locks[room_id]:
+            super().remove_room(room_id)
+            self.__journal('remove_room', room_id)
+
+    def add_user_to_room(self, room_id: Room.ID_TYPE, user: User) -> None:
+        with self.room_locks[room_id]:
+            super().add_user_to_room(room_id, user)
+            self.__journal('add_user_to_room', room_id, encode_user(user))
+
+    def remove_user_from_room(self, room_id: Room.ID_TYPE, user: User) -> None:
+        with self.room_locks[room_id]:
+            super().remove_user_from_room(room_id, user)
+            self.__journal('remove_user_from_room', room_id, encode_user(user))
+
+    def start_game(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        questions = list(questions)
+        with self.room_locks[room_id]:
+            super().start_game(room_id, questions)
+            self.__journal('start_game', room_id, questions)
+
+    def add_questions(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        questions = list(questions)
+        with self.room_locks[room_id]:
+            super().add_questions(room_id, questions)
+            self.__journal('add_questions', room_id, questions)
+
+    def next_round(self, room_id: Room.ID_TYPE) -> None:
+        with self.room_locks[room_id]:
+            super().next_round(room_id)
+            self.__journal('next_round', room_id)
+
+    def add_user_question_message_id(self, room_id: Room.ID_TYPE, user_id: int, message_id: int) -> None:
+        with self.room_locks[room_id]:
+            super().add_user_question_message_id(room_id, user_id, message_id)
+            self.__journal('add_user_question_message_id', room_id, user_id, message_id)
+
+    def add_user_description(self, room_id: Room.ID_TYPE, user_id: int, description: str) -> None:
+        with self.room_locks[room_id]:
+            super().add_user_description(room_id, user_id, description)
+            self.__journal('add_user_description', room_id, user_id, description)
+
+    def set_poll_description_order(self, room_id: Room.ID_TYPE,
+                                   description_order: typing.List[typing.Tuple[str, typing.Optional[int]]]) -> None:
+        with self.room_locks[room_id]:
+            super().set_poll_description_order(room_id, description_order)
+            self.__journal('set_poll_description_order', room_id, description_order)
+
+    def add_poll(self, room_id: Room.ID_TYPE, poll_id: str, message_id: int) -> None:
+        with self.room_locks[room_id]:
+            super().add_poll(room_id, poll_id, message_id)
+            self.__journal('add_poll', room_id, poll_id, message_id)
+
+    def add_user_vote(self, room_id: Room.ID_TYPE, user_id: int, vote: int) -> None:
+        with self.room_locks[room_id]:
+            super().add_user_vote(room_id, user_id, vote)
+            self.__journal('add_user_vote', room_id, user_id, vote)
+
+    def set_conversation_state(self, key: typing.Tuple[int, ...], state: typing.Optional[str]) -> None:
+        with self.conversations_lock:
+            apply_conversation_state(self.conversations, key, state)
+            self.__journal('set_conversation_state', key, state)
+
+    def get_conversation_states(self) -> typing.Dict[typing.Tuple[int, ...], str]:
+        with self.conversations_lock:
+            return dict(self.conversations)
+
+    def __journal(self, *record) -> None:
+        # Nothing is journaled while the journal itself is replayed
+        if self.journal is not None:
+            self.journal.append(record)
+
+    def __recover(self) -> int:
+        """Loads the latest snapshot, replays the segments after it and returns the number of the next segment"""
+        snapshots = snapshot.snapshots(self.directory)
+        first_segment = 0
+        if snapshots:
+            first_segment = snapshots[-1]
+            self.storage, self.conversations = snapshot.load(snapshot.snapshot_path(self.directory, first_segment))
+        segments = [segment for segment in Journal.segments(self.directory) if segment >= first_segment]
+        records = 0
+        for segment in segments:
+            for record in Journal.read(Journal.segment_path(self.directory, segment)):
+                replay(self, self.conversations, record)
+                records += 1
+        self.logger.info(f'Recovered {len(self.storage.rooms)} rooms from {self.directory}, replayed {records} changes')
+        return max(segments + [first_segment - 1]) + 1
+
+    def __compact_async(self, closed_segment: int) -> None:
+        threading.Thread(target=self.__compact, args=(closed_segment,), name='JournalCompaction', daemon=True).start()
+
+    def __compact(self, closed_segment: int) -> None:
+        """Builds the snapshot of everything up to `closed_segment` from the files alone, without touching the live
+        rooms, and removes the files it replaces
+        """
+        with self.compaction_lock:
+            scratch = InmemoryStorageController()
+            conversations = {}
+            snapshots = snapshot.snapshots(self.directory)
+            first_segment = 0
+            if snapshots:
+                first_segment = snapshots[-1]
+                if first_segment > closed_segment:
+                    return
+                scratch.storage, conversations = snapshot.load(snapshot.snapshot_path(self.directory, first_segment))
+            # Segments before the latest snapshot are left over from a crash after it was written, they are only removed
+            segments = [segment for segment in Journal.segments(self.directory) if segment <= closed_segment]
+            for segment in segments:
+                if segment >= first_segment:
+                    for record in Journal.read(Journal.segment_path(self.directory, segment)):
+                        replay(scratch, conversations, record)
+            snapshot.dump(snapshot.snapshot_path(self.directory, closed_segment + 1), scratch.storage, conversations)
+            for segment in segments:
+                Journal.segment_path(self.directory, segment).unlink()
+            for old_snapshot in snapshots:
+                snapshot.snapshot_path(self.directory, old_snapshot).unlink()
+            self.logger.info(f'Snapshot of segments up to {closed_segment} written')
+
+
+def apply_conversation_state(conversations: typing.Dict[typing.Tuple[int, ...], str],
+                             key: typing.Tuple[int, ...], state: typing.Optional[str]) -> None:
+    if state is None:
+        conversations.pop(key, None)
+    else:
+        conversations[key] = state
+
+
+def replay(controller: InmemoryStorageController, conversations: typing.Dict[typing.Tuple[int, ...], str],
+           record: tuple) -> None:
+    method_name, *args = record
+    if method_name == 'set_conversation_state':
+        apply_conversation_state(conversations, *args)
+        return
+    if method_name in ('add_user_to_room', 'remove_user_from_room'):
+        room_id, user = args
+        args = [room_id, decode_user(user)]
+    try:
+        getattr(InmemoryStorageController, method_name)(controller, *args)
+    except (KeyError, IndexError):
+        # The call failed the same way when it was made
+        pass
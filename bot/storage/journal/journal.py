@@ -0,0 +1,139 @@
+import logging
+import os
+import pathlib
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional
+
+
+class Journal:
+    """An append-only log of records in numbered segment files.
+
+    `append` only queues a record. A writer thread writes everything queued
+    since its last round in one go and syncs it to disk once (group commit),
+    so callers never wait for the disk and a crash loses at most the last
+    `commit_interval` seconds. Every `segment_records` records the journal
+    moves on to a new segment and calls `on_rotate` with its number from the
+    writer thread.
+
+    A record is framed by its length and crc32, so a torn write at the end of
+    a segment is detected when reading it back.
+    """
+
+    HEADER = struct.Struct('<II')
+
+    def __init__(self, directory: pathlib.Path, commit_interval: float = 0.01, segment_records: int = 100000,
+                 on_rotate: Optional[Callable[[int], None]] = None, sync: bool = True):
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.segment_records = segment_records
+        self.on_rotate = on_rotate
+        self.sync = sync
+
+        self.condition = threading.Condition()
+        self.pending: List[Any] = []
+        self.appended = 0
+        self.written = 0
+        self.segment: Optional[int] = None
+        self.file: Optional[BinaryIO] = None
+        self.segment_size = 0
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = False
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def segment_path(directory: pathlib.Path, segment: int) -> pathlib.Path:
+        return directory / f'journal-{segment:08d}.log'
+
+    @staticmethod
+    def segments(directory: pathlib.Path) -> List[int]:
+        return sorted(int(path.stem.split('-')[1]) for path in directory.glob('journal-*.log'))
+
+    @classmethod
+    def read(cls, path: pathlib.Path) -> Iterator[Any]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset + cls.HEADER.size <= len(data):
+            length, crc = cls.HEADER.unpack_from(data, offset)
+            payload = data[offset + cls.HEADER.size:offset + cls.HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                logging.getLogger(__name__).warning(f'{path} is torn at {offset}, skipping the rest')
+                return
+            yield pickle.loads(payload)
+            offset += cls.HEADER.size + length
+
+    def open(self, segment: int) -> None:
+        """Starts writing to a new segment, never to an existing one which may end with a torn record"""
+        self.segment = segment
+        self.file = open(self.segment_path(self.directory, segment), 'ab')
+        self.thread = threading.Thread(target=self.__run, name='Journal', daemon=True)
+        self.thread.start()
+
+    def append(self, record: Any) -> None:
+        with self.condition:
+            self.pending.append(record)
+            self.appended += 1
+            self.condition.notify_all()
+
+    def flush(self) -> None:
+        """Waits until everything appended so far is on disk"""
+        with self.condition:
+            target = self.appended
+            while self.written < target:
+                self.condition.wait()
+
+    def rotate(self) -> int:
+        """Moves on to a new segment once everything appended so far is written and returns the closed segment"""
+        with self.condition:
+            self.flush()
+            return self.__rotate()
+
+    def close(self) -> None:
+        self.flush()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        if self.file is not None:
+            self.file.close()
+
+    def __run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+            # Let more records gather for this commit
+            time.sleep(self.commit_interval)
+            with self.condition:
+                records, self.pending = self.pending, []
+            frames = []
+            for record in records:
+                payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                frames.append(self.HEADER.pack(len(payload), zlib.crc32(payload)))
+                frames.append(payload)
+            with self.condition:
+                self.file.write(b''.join(frames))
+                self.file.flush()
+                if self.sync:
+                    os.fsync(self.file.fileno())
+                self.written += len(records)
+                self.segment_size += len(records)
+                closed = self.__rotate() if self.segment_size >= self.segment_records else None
+                self.condition.notify_all()
+            if closed is not None and self.on_rotate is not None:
+                self.on_rotate(closed)
+
+    def __rotate(self) -> int:
+        closed = self.segment
+        self.file.close()
+        self.segment += 1
+        self.segment_size = 0
+        self.file = open(self.segment_path(self.directory, self.segment), 'ab')
+        return closed
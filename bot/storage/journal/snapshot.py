@@ -0,0 +1,144 @@
+import gc
+import os
+import pathlib
+import pickle
+import typing
+
+from bot.dto.room import Room
+from bot.dto.user import User
+from bot.dto.game import Game
+from bot.dto.game_state import GameState
+from bot.dto.question_set import QuestionSet
+from bot.dto.question import Question
+
+from bot.storage.inmemory.storage import Storage
+
+
+def encode_user(user: User) -> tuple:
+    return user.id, user.first_name, user.username
+
+
+def decode_user(data: tuple) -> User:
+    user_id, first_name, username = data
+    return User(user_id, first_name, username)
+
+
+def encode_room(room: Room) -> bytes:
+    game_state = room.game_state
+    return pickle.dumps((
+        room.id,
+        [(question.word, question.description) for question in room.game.question_set.questions]
+        if room.game is not None else None,
+        (
+            game_state.question_idx, dict(game_state.user_descriptions), list(game_state.poll_description_order),
+            dict(game_state.user_votes), dict(game_state.user_question_message_id), game_state.poll_id,
+            game_state.poll_message_id,
+        ) if game_state is not None else None,
+        [encode_user(user) for user in room.participants.values()],
+    ), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_room(data: bytes) -> Room:
+    room_id, questions, game_state, participants = pickle.loads(data)
+    return Room(
+        room_id,
+        Game(QuestionSet([Question(word, description) for word, description in questions]))
+        if questions is not None else None,
+        GameState(*game_state) if game_state is not None else None,
+        {user[0]: decode_user(user) for user in participants},
+    )
+
+
+class EncodedRooms(dict):
+    """Rooms loaded from a snapshot, each decoded the first time it is used.
+
+    Decoding every room takes seconds for 100k rooms, while loading them
+    encoded takes milliseconds and most rooms are never touched again.
+    """
+
+    def __init__(self, encoded: typing.Dict[Room.ID_TYPE, bytes]):
+        super().__init__()
+        self.encoded = encoded
+
+    def __missing__(self, room_id: Room.ID_TYPE) -> Room:
+        room = decode_room(self.encoded.pop(room_id))
+        self[room_id] = room
+        return room
+
+    def __setitem__(self, room_id: Room.ID_TYPE, room: Room) -> None:
+        self.encoded.pop(room_id, None)
+        super().__setitem__(room_id, room)
+
+    def __contains__(self, room_id: object) -> bool:
+        return super().__contains__(room_id) or room_id in self.encoded
+
+    def __len__(self) -> int:
+        return super().__len__() + len(self.encoded)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, room_id, default=None):
+        return self[room_id] if room_id in self else default
+
+    def pop(self, room_id, *default):
+        if room_id in self.encoded:
+            self[room_id]
+        return super().pop(room_id, *default)
+
+    def keys(self):
+        self.decode_all()
+        return super().keys()
+
+    def values(self):
+        self.decode_all()
+        return super().values()
+
+    def items(self):
+        self.decode_all()
+        return super().items()
+
+    def decode_all(self) -> None:
+        for room_id in list(self.encoded):
+            self.get(room_id)
+
+    def encode_all(self) -> typing.Dict[Room.ID_TYPE, bytes]:
+        encoded = dict(self.encoded)
+        for room_id, room in super().items():
+            encoded[room_id] = encode_room(room)
+        return encoded
+
+
+def snapshot_path(directory: pathlib.Path, segment: int) -> pathlib.Path:
+    return directory / f'snapshot-{segment:08d}.bin'
+
+
+def snapshots(directory: pathlib.Path) -> typing.List[int]:
+    return sorted(int(path.stem.split('-')[1]) for path in directory.glob('snapshot-*.bin'))
+
+
+def dump(path: pathlib.Path, storage: Storage, conversations: typing.Dict[typing.Tuple[int, ...], str]) -> None:
+    rooms = storage.rooms
+    encoded = rooms.encode_all() if isinstance(rooms, EncodedRooms) else {
+        room_id: encode_room(room) for room_id, room in rooms.items()
+    }
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(
+            (encoded, storage.poll_rooms, storage.private_message_rooms, conversations, storage.user_rooms),
+            f, protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load(path: pathlib.Path) -> typing.Tuple[Storage, typing.Dict[typing.Tuple[int, ...], str]]:
+    # Loading creates millions of objects that all live on, the collector would only scan them over and over
+    gc.disable()
+    try:
+        with open(path, 'rb') as f:
+            encoded, poll_rooms, private_message_rooms, conversations, user_rooms = pickle.load(f)
+    finally:
+        gc.enable()
+    return Storage(EncodedRooms(encoded), poll_rooms, private_message_rooms, user_rooms), conversations
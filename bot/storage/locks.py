@@ -0,0 +1,16 @@
+import threading
+import typing
+
+
+class LockStripes:
+    """A fixed set of re-entrant locks shared by keys through their hash.
+
+    Keys that land on different stripes can be worked on in parallel, while
+    memory stays constant however many keys there are.
+    """
+
+    def __init__(self, stripes: int = 256):
+        self.locks = [threading.RLock() for _ in range(stripes)]
+
+    def __getitem__(self, key: typing.Hashable) -> threading.RLock:
+        return self.locks[hash(key) % len(self.locks)]
@@ -0,0 +1,25 @@
+import json
+import pathlib
+import threading
+import time
+
+from bot.dto.room import Room
+
+
+class RoomArchive:
+    """Appends rooms to a file as JSON lines, to keep idle rooms that are removed from the storage"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, room: Room) -> None:
+        line = json.dumps({
+            'id': room.id,
+            'archived_at': time.time(),
+            'game': room.game.to_dict() if room.game is not None else None,
+            'game_state': room.game_state.to_dict() if room.game_state is not None else None,
+            'participants': [user.to_dict() for user in room.participants.values()],
+        }, ensure_ascii=False)
+        with self.lock, open(self.path, 'a', encoding='utf8') as f:
+            f.write(line + '\n')
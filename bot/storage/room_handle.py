@@ -0,0 +1,71 @@
+import typing
+
+from bot.dto.room import Room
+from bot.dto.user import User
+
+
+class RoomHandle:
+    """A room loaded once for the duration of a handler.
+
+    Reads are served from the loaded room. Changes are applied to it right
+    away, so later reads in the same handler see them, and are also recorded
+    so the storage controller can write them all at once on commit.
+    """
+
+    def __init__(self, room: Room):
+        self.room = room
+        self.changes: typing.List[typing.Tuple[str, tuple]] = []
+
+    @property
+    def room_id(self) -> Room.ID_TYPE:
+        return self.room.id
+
+    @property
+    def participants(self) -> typing.Mapping[int, User]:
+        return self.room.participants
+
+    @property
+    def current_word(self) -> str:
+        return self.room.game.question_set.questions[self.room.game_state.question_idx].word
+
+    @property
+    def current_description(self) -> str:
+        return self.room.game.question_set.questions[self.room.game_state.question_idx].description
+
+    @property
+    def user_descriptions(self) -> typing.Mapping[int, str]:
+        return self.room.game_state.user_descriptions
+
+    @property
+    def description_order(self) -> typing.Sequence[typing.Tuple[str, typing.Optional[int]]]:
+        return self.room.game_state.poll_description_order
+
+    @property
+    def user_votes(self) -> typing.Mapping[int, int]:
+        return self.room.game_state.user_votes
+
+    @property
+    def poll_message_id(self) -> int:
+        return self.room.game_state.poll_message_id
+
+    def add_user_description(self, user_id: int, description: str) -> None:
+        self.room.game_state.add_user_description(user_id, description)
+        self.changes.append(('add_user_description', (user_id, description)))
+
+    def add_user_question_message_id(self, user_id: int, message_id: int) -> None:
+        self.room.game_state.add_user_question_message_id(user_id, message_id)
+        self.changes.append(('add_user_question_message_id', (user_id, message_id)))
+
+    def set_poll_description_order(self,
+                                   description_order: typing.List[typing.Tuple[str, typing.Optional[int]]]) -> None:
+        self.room.game_state.set_poll_description_order(description_order)
+        self.changes.append(('set_poll_description_order', (description_order,)))
+
+    def add_poll(self, poll_id: str, message_id: int) -> None:
+        self.room.game_state.poll_id = poll_id
+        self.room.game_state.poll_message_id = message_id
+        self.changes.append(('add_poll', (poll_id, message_id)))
+
+    def add_user_vote(self, user_id: int, vote: int) -> None:
+        self.room.game_state.add_user_vote(user_id, vote)
+        self.changes.append(('add_user_vote', (user_id, vote)))
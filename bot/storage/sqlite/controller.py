@@ -0,0 +1,355 @@
+import json
+import sqlite3
+import threading
+import typing
+
+from bot.dto.room import Room
+from bot.dto.user import User
+from bot.dto.game import Game
+from bot.dto.game_state import GameState
+from bot.dto.question_set import QuestionSet
+from bot.dto.question import Question
+
+from bot.storage.exceptions import RoomNotFoundError
+from bot.storage.room_handle import RoomHandle
+
+from bot.storage.storage_controller_base import StorageControllerBase
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    id TEXT PRIMARY KEY,
+    question_idx INTEGER,
+    poll_id TEXT,
+    poll_message_id INTEGER,
+    poll_description_order TEXT
+);
+CREATE INDEX IF NOT EXISTS rooms_poll_id ON rooms (poll_id);
+CREATE TABLE IF NOT EXISTS participants (
+    room_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    UNIQUE (room_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    room_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (room_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS descriptions (
+    room_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    UNIQUE (room_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS votes (
+    room_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    vote INTEGER NOT NULL,
+    UNIQUE (room_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS question_messages (
+    room_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (room_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS question_messages_user_message ON question_messages (user_id, message_id);
+CREATE TABLE IF NOT EXISTS conversations (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+ROUND_TABLES = ('descriptions', 'votes', 'question_messages')
+
+
+class SqliteStorageController(StorageControllerBase):
+    """Keeps rooms in a SQLite database so running games survive restarts.
+
+    The database runs in WAL mode. Writes are committed in batches: after
+    `batch_size` writes or `commit_interval` seconds, whichever comes first,
+    so a crash loses at most that much.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, commit_interval: float = 1., *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.pending_writes = 0
+        self.in_unit_of_work = False
+        self.closed = threading.Event()
+        self.flush_thread = threading.Thread(target=self.__flush_periodically, name='SqliteFlush', daemon=True)
+        self.flush_thread.start()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.pending_writes:
+                self.connection.commit()
+                self.pending_writes = 0
+
+    def close(self) -> None:
+        self.closed.set()
+        self.flush_thread.join()
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+    def load_room(self, room_id: Room.ID_TYPE) -> RoomHandle:
+        with self.lock:
+            question_idx, poll_id, poll_message_id, _ = self.__room(room_id)
+            participants = self.get_users_in_room(room_id)
+            room = Room(room_id, participants=participants)
+            if question_idx is None:
+                return RoomHandle(room)
+            room.game = Game(QuestionSet([
+                Question(word, description) for word, description in self.connection.execute(
+                    'SELECT word, description FROM questions WHERE room_id = ? ORDER BY idx', (room_id,)
+                )
+            ]))
+            room.game_state = GameState(
+                question_idx,
+                user_descriptions=self.get_current_user_descriptions(room_id),
+                poll_description_order=self.get_description_order(room_id),
+                user_votes=self.get_user_votes(room_id),
+                user_question_message_id=dict(self.connection.execute(
+                    'SELECT user_id, message_id FROM question_messages WHERE room_id = ?', (room_id,)
+                )),
+                poll_id=poll_id,
+                poll_message_id=poll_message_id,
+            )
+        return RoomHandle(room)
+
+    def commit_room(self, handle: RoomHandle) -> None:
+        if not handle.changes:
+            return
+        with self.lock:
+            self.flush()
+            self.in_unit_of_work = True
+            try:
+                super().commit_room(handle)
+            except Exception:
+                self.connection.rollback()
+                self.pending_writes = 0
+                raise
+            finally:
+                self.in_unit_of_work = False
+            self.flush()
+
+    def create_room(self, room_id: Room.ID_TYPE) -> None:
+        with self.lock:
+            self.__delete_room(room_id)
+            self.__write('INSERT INTO rooms (id) VALUES (?)', (room_id,))
+
+    def remove_room(self, room_id: Room.ID_TYPE) -> None:
+        with self.lock:
+            self.__delete_room(room_id)
+
+    def add_user_to_room(self, room_id: Room.ID_TYPE, user: User) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write(
+                'INSERT OR REPLACE INTO participants (room_id, user_id, user) VALUES (?, ?, ?)',
+                (room_id, user.id, json.dumps(User.of(user).to_dict())),
+            )
+
+    def remove_user_from_room(self, room_id: Room.ID_TYPE, user: User) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write('DELETE FROM participants WHERE room_id = ? AND user_id = ?', (room_id, user.id))
+            self.__write('DELETE FROM question_messages WHERE room_id = ? AND user_id = ?', (room_id, user.id))
+
+    def is_user_in_room(self, room_id: Room.ID_TYPE, user_id: int) -> bool:
+        with self.lock:
+            self.__room(room_id)
+            return self.__query_one(
+                'SELECT 1 FROM participants WHERE room_id = ? AND user_id = ?', (room_id, user_id)
+            ) is not None
+
+    def get_users_in_room(self, room_id: Room.ID_TYPE) -> typing.Dict[int, User]:
+        with self.lock:
+            self.__room(room_id)
+            rows = self.connection.execute(
+                'SELECT user_id, user FROM participants WHERE room_id = ? ORDER BY rowid', (room_id,)
+            ).fetchall()
+        return {user_id: User.from_dict(json.loads(user)) for user_id, user in rows}
+
+    def start_game(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write('DELETE FROM questions WHERE room_id = ?', (room_id,))
+            self.__write_many(
+                'INSERT INTO questions (room_id, idx, word, description) VALUES (?, ?, ?, ?)',
+                [(room_id, idx, word, description) for idx, (word, description) in enumerate(questions)],
+            )
+            self.__reset_round(room_id, 0)
+
+    def add_questions(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        with self.lock:
+            self.__room(room_id)
+            questions_count, = self.__query_one('SELECT COUNT(*) FROM questions WHERE room_id = ?', (room_id,))
+            self.__write_many(
+                'INSERT INTO questions (room_id, idx, word, description) VALUES (?, ?, ?, ?)',
+                [
+                    (room_id, idx, word, description)
+                    for idx, (word, description) in enumerate(questions, start=questions_count)
+                ],
+            )
+
+    def next_round(self, room_id: Room.ID_TYPE) -> None:
+        with self.lock:
+            question_idx = self.__room(room_id)[0]
+            questions_count, = self.__query_one('SELECT COUNT(*) FROM questions WHERE room_id = ?', (room_id,))
+            if question_idx == questions_count - 1:
+                raise IndexError
+            self.__reset_round(room_id, question_idx + 1)
+
+    def set_conversation_state(self, key: typing.Tuple[int, ...], state: typing.Optional[str]) -> None:
+        with self.lock:
+            if state is None:
+                self.__write('DELETE FROM conversations WHERE key = ?', (json.dumps(key),))
+            else:
+                self.__write('INSERT OR REPLACE INTO conversations (key, state) VALUES (?, ?)', (json.dumps(key), state))
+
+    def get_conversation_states(self) -> typing.Dict[typing.Tuple[int, ...], str]:
+        with self.lock:
+            rows = self.connection.execute('SELECT key, state FROM conversations').fetchall()
+        return {tuple(json.loads(key)): state for key, state in rows}
+
+    def get_current_word(self, room_id: Room.ID_TYPE) -> str:
+        return self.__current_question(room_id)[0]
+
+    def get_current_description(self, room_id: Room.ID_TYPE) -> str:
+        return self.__current_question(room_id)[1]
+
+    def get_current_user_descriptions(self, room_id: Room.ID_TYPE) -> typing.Dict[int, str]:
+        with self.lock:
+            self.__room(room_id)
+            return dict(self.connection.execute(
+                'SELECT user_id, description FROM descriptions WHERE room_id = ? ORDER BY rowid', (room_id,)
+            ))
+
+    def add_user_question_message_id(self, room_id: Room.ID_TYPE, user_id: int, message_id: int) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write(
+                'INSERT OR REPLACE INTO question_messages (room_id, user_id, message_id) VALUES (?, ?, ?)',
+                (room_id, user_id, message_id),
+            )
+
+    def get_room_id_by_private_message_id(self, user_id: int, message_id: int) -> Room.ID_TYPE:
+        with self.lock:
+            row = self.__query_one(
+                'SELECT room_id FROM question_messages WHERE user_id = ? AND message_id = ?', (user_id, message_id)
+            )
+        if row is None:
+            raise RoomNotFoundError
+        return row[0]
+
+    def add_user_description(self, room_id: Room.ID_TYPE, user_id: int, description: str) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write(
+                'INSERT OR REPLACE INTO descriptions (room_id, user_id, description) VALUES (?, ?, ?)',
+                (room_id, user_id, description),
+            )
+
+    def set_poll_description_order(self, room_id: Room.ID_TYPE,
+                                   description_order: typing.List[typing.Tuple[str, typing.Optional[int]]]) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write(
+                'UPDATE rooms SET poll_description_order = ? WHERE id = ?', (json.dumps(description_order), room_id)
+            )
+
+    def get_description_order(self, room_id: Room.ID_TYPE) -> typing.List[typing.Tuple[str, typing.Optional[int]]]:
+        with self.lock:
+            description_order = self.__room(room_id)[3]
+        if description_order is None:
+            return []
+        return [(description, user_id) for description, user_id in json.loads(description_order)]
+
+    def add_poll(self, room_id: Room.ID_TYPE, poll_id: str, message_id: int) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write('UPDATE rooms SET poll_id = ?, poll_message_id = ? WHERE id = ?', (poll_id, message_id, room_id))
+
+    def get_room_id_by_poll_id(self, poll_id: str) -> typing.Optional[Room.ID_TYPE]:
+        with self.lock:
+            row = self.__query_one('SELECT id FROM rooms WHERE poll_id = ?', (poll_id,))
+        return row[0] if row is not None else None
+
+    def get_poll_message_id(self, room_id) -> int:
+        with self.lock:
+            return self.__room(room_id)[2]
+
+    def add_user_vote(self, room_id: Room.ID_TYPE, user_id: int, vote: int) -> None:
+        with self.lock:
+            self.__room(room_id)
+            self.__write(
+                'INSERT OR REPLACE INTO votes (room_id, user_id, vote) VALUES (?, ?, ?)', (room_id, user_id, vote)
+            )
+
+    def get_user_votes(self, room_id: Room.ID_TYPE) -> typing.Dict[int, int]:
+        with self.lock:
+            self.__room(room_id)
+            return dict(self.connection.execute(
+                'SELECT user_id, vote FROM votes WHERE room_id = ? ORDER BY rowid', (room_id,)
+            ))
+
+    def __room(self, room_id: Room.ID_TYPE) -> tuple:
+        row = self.__query_one(
+            'SELECT question_idx, poll_id, poll_message_id, poll_description_order FROM rooms WHERE id = ?', (room_id,)
+        )
+        if row is None:
+            raise KeyError(room_id)
+        return row
+
+    def __current_question(self, room_id: Room.ID_TYPE) -> typing.Tuple[str, str]:
+        with self.lock:
+            question_idx = self.__room(room_id)[0]
+            return self.__query_one(
+                'SELECT word, description FROM questions WHERE room_id = ? AND idx = ?', (room_id, question_idx)
+            )
+
+    def __reset_round(self, room_id: Room.ID_TYPE, question_idx: int) -> None:
+        for table in ROUND_TABLES:
+            self.__write(f'DELETE FROM {table} WHERE room_id = ?', (room_id,))
+        self.__write(
+            'UPDATE rooms SET question_idx = ?, poll_id = NULL, poll_message_id = NULL, poll_description_order = NULL '
+            'WHERE id = ?',
+            (question_idx, room_id),
+        )
+
+    def __delete_room(self, room_id: Room.ID_TYPE) -> None:
+        for table in ('participants', 'questions') + ROUND_TABLES:
+            self.__write(f'DELETE FROM {table} WHERE room_id = ?', (room_id,))
+        self.__write('DELETE FROM rooms WHERE id = ?', (room_id,))
+
+    def __query_one(self, sql: str, parameters: tuple) -> typing.Optional[tuple]:
+        return self.connection.execute(sql, parameters).fetchone()
+
+    def __write(self, sql: str, parameters: tuple) -> None:
+        self.connection.execute(sql, parameters)
+        self.__count_write()
+
+    def __write_many(self, sql: str, parameters: typing.List[tuple]) -> None:
+        self.connection.executemany(sql, parameters)
+        self.__count_write()
+
+    def __count_write(self) -> None:
+        self.pending_writes += 1
+        if self.pending_writes >= self.batch_size and not self.in_unit_of_work:
+            self.connection.commit()
+            self.pending_writes = 0
+
+    def __flush_periodically(self) -> None:
+        while not self.closed.wait(self.commit_interval):
+            self.flush()
@@ -1,13 +1,33 @@
+import contextlib
 import typing
 
 from bot.dto.room import Room
 from bot.dto.user import User
 
+from bot.storage.room_handle import RoomHandle
+
 
 class StorageControllerBase:
     def __init__(self):
         pass
 
+    @contextlib.contextmanager
+    def open_room(self, room_id: Room.ID_TYPE) -> typing.Iterator[RoomHandle]:
+        """Loads a room once for a handler and writes all its changes together when the block exits.
+
+        If the block raises, the changes are discarded.
+        """
+        handle = self.load_room(room_id)
+        yield handle
+        self.commit_room(handle)
+
+    def load_room(self, room_id: Room.ID_TYPE) -> RoomHandle:
+        raise NotImplementedError()
+
+    def commit_room(self, handle: RoomHandle) -> None:
+        for method_name, args in handle.changes:
+            getattr(self, method_name)(handle.room_id, *args)
+
     def create_room(self, room_id: Room.ID_TYPE) -> None:
         raise NotImplementedError()
 
@@ -29,7 +49,12 @@ class StorageControllerBase:
     def start_game(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
         raise NotImplementedError()
 
+    def add_questions(self, room_id: Room.ID_TYPE, questions: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        """Appends questions to the game being played in the room"""
+        raise NotImplementedError()
+
     def next_round(self, room_id: Room.ID_TYPE) -> None:
+        """Moves to the next question, raises `IndexError` if the game has no more questions yet"""
         raise NotImplementedError()
 
     def get_current_word(self, room_id: Room.ID_TYPE) -> str:
@@ -71,3 +96,16 @@ class StorageControllerBase:
 
     def get_user_votes(self, room_id: Room.ID_TYPE) -> typing.Dict[int, int]:
         raise NotImplementedError()
+
+    def set_conversation_state(self, key: typing.Tuple[int, ...], state: typing.Optional[str]) -> None:
+        """Called with the name of the new state on every conversation state change, with None when the conversation
+        ends. Only storages that survive restarts need to keep it
+        """
+        pass
+
+    def get_conversation_states(self) -> typing.Dict[typing.Tuple[int, ...], str]:
+        return {}
+
+    def close(self) -> None:
+        """Writes out anything not yet persisted"""
+        pass
@@ -0,0 +1,54 @@
+import collections
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Callable, Deque, Dict, Hashable, Tuple
+
+
+class ChatExecutor:
+    """Runs tasks on a pool of worker threads, one at a time and in submission order for each key.
+
+    Each key (a conversation) has its own queue. A queue is scheduled on the
+    pool only while it has work and runs one task per turn, so a busy chat
+    can't starve the others and tasks of different chats run in parallel.
+    """
+
+    def __init__(self, workers: int = 8, name: str = 'ChatExecutor'):
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix=name)
+        self.lock = threading.Lock()
+        self.queues: Dict[Hashable, Deque[Tuple[Callable[..., Any], tuple]]] = {}
+        self.pending = 0
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> None:
+        with self.lock:
+            self.pending += 1
+            queue = self.queues.get(key)
+            if queue is not None:
+                queue.append((fn, args))
+                return
+            self.queues[key] = collections.deque([(fn, args)])
+        self.executor.submit(self.__run_next, key)
+
+    def is_busy(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.queues
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait)
+
+    def __run_next(self, key: Hashable) -> None:
+        with self.lock:
+            fn, args = self.queues[key][0]
+        try:
+            fn(*args)
+        except Exception:
+            self.logger.exception(f'Task for {key} failed')
+        with self.lock:
+            self.pending -= 1
+            queue = self.queues[key]
+            queue.popleft()
+            if not queue:
+                del self.queues[key]
+                return
+        self.executor.submit(self.__run_next, key)
@@ -0,0 +1,39 @@
+import concurrent.futures
+import logging
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+from telegram.error import TelegramError
+
+
+class FanOut:
+    """Makes one Bot API call per key concurrently, at most `max_parallel` at a time across all callers.
+
+    Results are handed to `on_result` as soon as each call returns. A call that
+    fails with a `TelegramError`, e.g. because the user blocked the bot, is
+    logged and reported back without holding up the others.
+    """
+
+    def __init__(self, max_parallel: int = 8):
+        self.max_parallel = max_parallel
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_parallel, thread_name_prefix='FanOut')
+        self.logger = logging.getLogger(__name__)
+
+    def map(self,
+            call: Callable[[Hashable], Any],
+            keys: Iterable[Hashable],
+            on_result: Callable[[Hashable, Any], None]) -> Dict[Hashable, TelegramError]:
+        futures = {self.executor.submit(call, key): key for key in keys}
+        failed = {}
+        for future in concurrent.futures.as_completed(futures):
+            key = futures[future]
+            try:
+                result = future.result()
+            except TelegramError as error:
+                self.logger.warning(f'Call for {key} failed: {error}')
+                failed[key] = error
+                continue
+            on_result(key, result)
+        return failed
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait)
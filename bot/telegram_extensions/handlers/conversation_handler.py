@@ -6,6 +6,7 @@ from telegram.ext import ConversationHandler as TelegramConversationHandler, \
 from telegram.ext.conversationhandler import CheckUpdateType, _ConversationTimeoutContext
 from telegram.utils.types import HandlerArg
 
+from bot.telegram_extensions.chat_executor import ChatExecutor
 from bot.telegram_extensions.conversation_context import ConversationContext
 
 
@@ -14,13 +15,39 @@ class ConversationHandler(TelegramConversationHandler):
             self,
             state_entry_callbacks: Dict[object, Callable[[Update, CallbackContext], None]] = None,
             *args,
+            executor: Optional[ChatExecutor] = None,
+            state_listener: Optional[Callable[[Tuple[int, ...], Optional[object]], None]] = None,
             **kwargs
     ):
+        """With an `executor` the updates of each conversation are handled in order on its worker pool instead of
+        the dispatcher thread, so a slow state transition of one chat doesn't hold up the others. `state_listener` is
+        called with every new state, None when a conversation ends
+        """
         super(ConversationHandler, self).__init__(*args, **kwargs)
         if state_entry_callbacks is None:
             self.state_entry_callbacks = {}
         else:
             self.state_entry_callbacks = state_entry_callbacks
+        self.executor = executor
+        self.state_listener = state_listener
+
+    def check_update(self, update: HandlerArg) -> CheckUpdateType:
+        check_result = super(ConversationHandler, self).check_update(update)
+        if check_result is not None or self.executor is None:
+            return check_result
+        # The state this update will be handled in is only known once the queued updates of its conversation are
+        # handled, so it is accepted here and checked again in order
+        if not isinstance(update, Update) or not update.effective_chat or update.channel_post:
+            return None
+        conversation_key = self._get_key(update)
+        if not self.executor.is_busy(conversation_key):
+            return None
+        handlers = [*self.entry_points, *self.fallbacks]
+        for state_handlers in self.states.values():
+            handlers.extend(state_handlers)
+        if not any(handler.check_update(update) not in (None, False) for handler in handlers):
+            return None
+        return conversation_key, None, None
 
     def collect_additional_context(
         self,
@@ -31,9 +58,10 @@ class ConversationHandler(TelegramConversationHandler):
     ) -> None:
         super(ConversationHandler, self).collect_additional_context(context, update, dispatcher, check_result)
         conversation_key, _, _ = check_result
-        with self._conversations_lock:
-            state = self.conversations.get(conversation_key)
-        context.bot_data['conversation_context'] = ConversationContext(old_state=state, key=conversation_key)
+        # A single dict read needs no lock, and the state of a conversation only changes while its own update is
+        # handled, so the old state is carried on the context of this update instead of shared `bot_data`
+        state = self.conversations.get(conversation_key)
+        context.conversation_context = ConversationContext(old_state=state, key=conversation_key)
 
     def handle_update(
             self,
@@ -41,6 +69,30 @@ class ConversationHandler(TelegramConversationHandler):
             dispatcher: Dispatcher,
             check_result: CheckUpdateType,
             context: CallbackContext = None,
+    ) -> Optional[object]:
+        if self.executor is not None:
+            conversation_key, _, _ = check_result
+            self.executor.submit(conversation_key, self.__handle_in_order, update, dispatcher, context)
+            return None
+        return self.__handle_update(update, dispatcher, check_result, context)
+
+    def __handle_in_order(self, update: HandlerArg, dispatcher: Dispatcher, context: CallbackContext) -> None:
+        check_result = super(ConversationHandler, self).check_update(update)
+        if check_result is None:
+            return
+        try:
+            self.__handle_update(update, dispatcher, check_result, context)
+        except DispatcherHandlerStop:
+            pass
+        except Exception as exception:
+            dispatcher.dispatch_error(update, exception)
+
+    def __handle_update(
+            self,
+            update: HandlerArg,
+            dispatcher: Dispatcher,
+            check_result: CheckUpdateType,
+            context: CallbackContext = None,
     ) -> Optional[object]:
         """Copied from super method to run `collect_additional_context` and call `update_state` with more arguments
         """
@@ -93,8 +145,17 @@ class ConversationHandler(TelegramConversationHandler):
             update: HandlerArg,
             context: CallbackContext,
     ) -> None:
-        old_state = context.bot_data['conversation_context'].old_state
+        old_state = context.conversation_context.old_state
         if new_state is not None:
             if new_state in self.state_entry_callbacks and new_state != old_state:
                 self.state_entry_callbacks[new_state](update, context)
         super(ConversationHandler, self).update_state(new_state, key)
+        if self.state_listener is not None and new_state is not None:
+            self.state_listener(key, None if new_state == self.END else new_state)
+
+    def end_conversation(self, key: Tuple[int, ...]) -> None:
+        """Ends a conversation without an update, e.g. when it has been idle for too long"""
+        with self._conversations_lock:
+            self.conversations.pop(key, None)
+        if self.state_listener is not None:
+            self.state_listener(key, None)
@@ -0,0 +1,205 @@
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import statistics
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import RetryAfter
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Takes a token and returns 0, or returns how many seconds to wait until there is one"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.
+        return (1 - self.tokens) / self.rate
+
+
+class MessageScheduler:
+    """A single outbound queue for Bot API calls that keeps within Telegram's flood limits.
+
+    Calls are sent in priority order by a pool of worker threads, at most
+    `global_rate` per second overall and at most one at a time per chat, with
+    a per-chat token bucket (group chats are limited more strictly than private
+    ones). A chat that gets `RetryAfter` is paused for the requested time and
+    the call is sent again. Calls of the same chat and priority keep their order.
+    """
+
+    def __init__(self,
+                 workers: int = 8,
+                 global_rate: float = 30.,
+                 private_chat_rate: float = 1.,
+                 private_chat_burst: float = 3.,
+                 group_chat_rate: float = 20. / 60.,
+                 group_chat_burst: float = 20.,
+                 latency_samples: int = 1000):
+        self.workers = workers
+        self.private_chat_rate = private_chat_rate
+        self.private_chat_burst = private_chat_burst
+        self.group_chat_rate = group_chat_rate
+        self.group_chat_burst = group_chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        # Calls queued for each chat, and the chats that can send next, wait for their bucket or are sending.
+        # A chat with queued calls is in exactly one of `ready`, `sleeping` or `in_flight`
+        self.queues: Dict[int, List[Tuple[int, int, float, Callable[[], Any], concurrent.futures.Future]]] = {}
+        self.ready: List[Tuple[int, int, int]] = []
+        self.sleeping: List[Tuple[float, int]] = []
+        self.in_flight: Set[int] = set()
+        self.queue_depth = 0
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=latency_samples)
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='MessageScheduler')
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = False
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self,
+               chat_id: int,
+               call: Callable[[], Any],
+               priority: Priority = Priority.NORMAL) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.__run, name='MessageScheduler', daemon=True)
+                self.thread.start()
+            entry = (priority, next(self.sequence), time.monotonic(), call, future)
+            queue = self.queues.setdefault(chat_id, [])
+            heapq.heappush(queue, entry)
+            self.queue_depth += 1
+            if len(queue) == 1 and chat_id not in self.in_flight:
+                heapq.heappush(self.ready, (entry[0], entry[1], chat_id))
+            self.condition.notify()
+        return future
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        self.executor.shutdown()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self.condition:
+            latencies = sorted(self.latencies)
+            return {
+                'queue_depth': self.queue_depth,
+                'in_flight': len(self.in_flight),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'latency_p50': statistics.median(latencies) if latencies else 0.,
+                'latency_p95': latencies[len(latencies) * 95 // 100] if latencies else 0.,
+            }
+
+    def __chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_chat_rate, self.group_chat_burst)
+            else:
+                bucket = TokenBucket(self.private_chat_rate, self.private_chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def __run(self) -> None:
+        with self.condition:
+            while not self.stopped:
+                now = time.monotonic()
+                while self.sleeping and self.sleeping[0][0] <= now:
+                    _, chat_id = heapq.heappop(self.sleeping)
+                    priority, sequence, *_ = self.queues[chat_id][0]
+                    heapq.heappush(self.ready, (priority, sequence, chat_id))
+
+                timeout = self.sleeping[0][0] - now if self.sleeping else None
+                if self.ready and len(self.in_flight) < self.workers:
+                    global_wait = self.global_bucket.take(now)
+                    if global_wait:
+                        timeout = global_wait if timeout is None else min(timeout, global_wait)
+                    else:
+                        self.__dispatch(now)
+                        continue
+                self.condition.wait(timeout)
+
+    def __dispatch(self, now: float) -> None:
+        _, _, chat_id = heapq.heappop(self.ready)
+        chat_wait = self.__chat_bucket(chat_id).take(now)
+        if chat_wait:
+            # Give the global token back, this chat can't use it yet
+            self.global_bucket.tokens = min(self.global_bucket.capacity, self.global_bucket.tokens + 1)
+            heapq.heappush(self.sleeping, (now + chat_wait, chat_id))
+            return
+        entry = heapq.heappop(self.queues[chat_id])
+        self.in_flight.add(chat_id)
+        self.executor.submit(self.__send, chat_id, entry)
+
+    def __send(self, chat_id: int, entry: Tuple[int, int, float, Callable[[], Any], concurrent.futures.Future]) -> None:
+        _, _, enqueued, call, future = entry
+        retry_after = None
+        try:
+            result = call()
+        except RetryAfter as error:
+            retry_after = error.retry_after
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+        with self.condition:
+            self.in_flight.discard(chat_id)
+            queue = self.queues[chat_id]
+            if retry_after is not None:
+                self.logger.warning(f'Flood limit hit in chat {chat_id}, retrying in {retry_after} s')
+                self.retried += 1
+                heapq.heappush(queue, entry)
+                heapq.heappush(self.sleeping, (time.monotonic() + retry_after, chat_id))
+            else:
+                self.queue_depth -= 1
+                if future.exception() is None:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                self.latencies.append(time.monotonic() - enqueued)
+                if queue:
+                    priority, sequence, *_ = queue[0]
+                    heapq.heappush(self.ready, (priority, sequence, chat_id))
+                else:
+                    del self.queues[chat_id]
+                    # A bucket that has refilled is the same as a new one, so idle chats don't keep theirs
+                    bucket = self.chat_buckets[chat_id]
+                    bucket.refill(time.monotonic())
+                    if bucket.tokens >= bucket.capacity:
+                        del self.chat_buckets[chat_id]
+            self.condition.notify()
@@ -0,0 +1,88 @@
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Set
+
+
+class TimingWheel:
+    """Timers for many keys, checked by one periodic call to `advance` instead of a job per key.
+
+    Time is counted in ticks of `tick` seconds. A deadline sits in the slot of
+    the lowest of `levels` wheels of `slots` slots that covers it, and when a
+    higher wheel's slot comes up its keys are moved down to the wheels below,
+    so scheduling is O(1) and every key is moved at most `levels` times.
+
+    Rescheduling a key only records its new deadline. The key stays in its old
+    slot and is moved on when that slot comes up, so keys touched on every
+    update, like the last activity of a room, cost a dict write.
+    """
+
+    def __init__(self, tick: float = 1., slots: int = 64, levels: int = 4,
+                 clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self.wheels: List[List[Set[Hashable]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.deadlines: Dict[Hashable, int] = {}
+        self.current = self.__now()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def schedule(self, key: Hashable, delay: float) -> None:
+        """Expires `key` after `delay` seconds, instead of its previous deadline if it has one"""
+        with self.lock:
+            deadline = self.current + max(1, math.ceil(delay / self.tick))
+            old_deadline = self.deadlines.get(key)
+            self.deadlines[key] = deadline
+            # A key already placed for an earlier deadline is moved on when it gets there
+            if old_deadline is None or deadline < old_deadline:
+                self.__place(key, deadline)
+
+    def cancel(self, key: Hashable) -> None:
+        with self.lock:
+            self.deadlines.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.deadlines
+
+    def advance(self) -> List[Hashable]:
+        """Moves the wheels to the current time and returns the keys that expired, which are no longer scheduled"""
+        expired = []
+        now = self.__now()
+        with self.lock:
+            while self.current < now:
+                self.current += 1
+                for level in range(self.levels - 1, 0, -1):
+                    span = self.slots ** level
+                    if self.current % span == 0:
+                        self.__cascade(self.wheels[level], (self.current // span) % self.slots, expired)
+                self.__cascade(self.wheels[0], self.current % self.slots, expired)
+        return expired
+
+    def __now(self) -> int:
+        return int(self.clock() / self.tick)
+
+    def __cascade(self, wheel: List[Set[Hashable]], slot: int, expired: List[Hashable]) -> None:
+        keys, wheel[slot] = wheel[slot], set()
+        for key in keys:
+            deadline = self.deadlines.get(key)
+            if deadline is None:
+                continue
+            if deadline <= self.current:
+                del self.deadlines[key]
+                expired.append(key)
+            else:
+                self.__place(key, deadline)
+
+    def __place(self, key: Hashable, deadline: int) -> None:
+        # The lowest wheel whose current turn the deadline is in, so its slot comes up before the deadline
+        for level in range(self.levels):
+            span = self.slots ** level
+            if deadline // (span * self.slots) == self.current // (span * self.slots):
+                self.wheels[level][(deadline // span) % self.slots].add(key)
+                return
+        # Further than the wheels reach, checked again when they start their next turn
+        self.wheels[-1][0].add(key)
@@ -0,0 +1,59 @@
+import multiprocessing
+import urllib.parse
+from typing import Callable, Optional
+
+from telegram import Update
+from telegram.ext import Updater
+
+from bot.telegram_extensions.webhook_server import WebhookServer
+
+
+def start_dispatching(updater: Updater) -> None:
+    """Starts the dispatcher and the job queue the way `Updater.start_polling` does, for updates put to the
+    dispatcher's queue by someone else. `Updater.stop` stops them as usual
+    """
+    updater.running = True
+    updater.job_queue.start()
+    updater._init_thread(updater.dispatcher.start, 'dispatcher')
+
+
+def receive_updates(updater: Updater, webhook_url: Optional[str] = None, webhook_port: int = 8443,
+                    webhook_secret: Optional[str] = None, max_pending_updates: int = 1000,
+                    backlog: Optional[Callable[[], int]] = None) -> None:
+    """Polls for updates, or with a `webhook_url` receives them on `webhook_port`, until the process gets a stop
+    signal. The URL should be an HTTPS proxy to that port. Without a `webhook_secret` a random one is registered with
+    the webhook for this run
+    """
+    if webhook_url is None:
+        updater.start_polling()
+        updater.idle()
+        return
+
+    webhook_server = WebhookServer(
+        updater.bot, updater.dispatcher.update_queue,
+        port=webhook_port, path=urllib.parse.urlsplit(webhook_url).path or '/', secret_token=webhook_secret,
+        max_pending_updates=max_pending_updates, backlog=backlog,
+    )
+    webhook_server.start()
+    start_dispatching(updater)
+    updater.bot.set_webhook(webhook_url, api_kwargs={'secret_token': webhook_server.secret_token})
+    updater.idle()
+    webhook_server.stop()
+
+
+def read_updates(updater: Updater, updates: multiprocessing.Queue,
+                 on_broadcast: Optional[Callable[[Update], None]] = None) -> None:
+    """Dispatches updates sent through `updates` as `(data, broadcast)` pairs until it gets None. Updates that were
+    sent to every shard are passed to `on_broadcast` before they are dispatched
+    """
+    start_dispatching(updater)
+    while True:
+        item = updates.get()
+        if item is None:
+            break
+        data, broadcast = item
+        update = Update.de_json(data, updater.bot)
+        if broadcast and on_broadcast is not None:
+            on_broadcast(update)
+        updater.dispatcher.update_queue.put(update)
+    updater.stop()
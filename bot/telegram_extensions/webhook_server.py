@@ -0,0 +1,148 @@
+import asyncio
+import hmac
+import json
+import logging
+import queue
+import secrets
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import telegram
+
+
+class WebhookServer:
+    """Receives updates from Telegram over HTTP and puts them to the dispatcher's update queue.
+
+    Runs an asyncio server on its own thread with keep-alive connections.
+    Requests without the secret token set with `setWebhook` are refused; a
+    random token is made up when none is given. When
+    `backlog()` reaches `max_pending_updates` updates are answered with 429, so
+    Telegram keeps them and delivers them again later instead of the bot
+    running out of memory.
+    """
+
+    SECRET_TOKEN_HEADER = 'x-telegram-bot-api-secret-token'
+    MAX_BODY_SIZE = 1 << 20
+    REASONS = {
+        200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+        413: 'Payload Too Large', 429: 'Too Many Requests',
+    }
+
+    def __init__(self,
+                 bot: telegram.Bot,
+                 update_queue: queue.Queue,
+                 listen: str = '0.0.0.0',
+                 port: int = 8443,
+                 path: str = '/',
+                 secret_token: Optional[str] = None,
+                 max_pending_updates: int = 1000,
+                 backlog: Optional[Callable[[], int]] = None):
+        self.bot = bot
+        self.update_queue = update_queue
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token if secret_token else secrets.token_urlsafe(32)
+        self.max_pending_updates = max_pending_updates
+        self.backlog = backlog if backlog is not None else update_queue.qsize
+
+        self.accepted = 0
+        self.rejected = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.ready = threading.Event()
+        self.connections: Set[asyncio.StreamWriter] = set()
+        self.logger = logging.getLogger(__name__)
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.__run, name='WebhookServer', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        self.logger.info(f'Listening for updates on {self.listen}:{self.port}{self.path}')
+
+    def stop(self) -> None:
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+        if self.thread is not None:
+            self.thread.join()
+
+    def __run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.__serve())
+            # Closing the open keep-alive connections lets their handlers finish
+            for writer in self.connections:
+                writer.close()
+            self.loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self.loop), return_exceptions=True))
+        finally:
+            self.loop.close()
+
+    async def __serve(self) -> None:
+        self.server = await asyncio.start_server(self.__handle_connection, self.listen, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    async def __handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > self.MAX_BODY_SIZE:
+                    await self.__respond(writer, 413, keep_alive=False)
+                    break
+                body = await reader.readexactly(length)
+                status, response_headers = self.__accept(method, target, headers, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.__respond(writer, status, keep_alive, response_headers)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def __accept(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str]]:
+        if target != self.path:
+            return 404, {}
+        if method != 'POST':
+            return 405, {}
+        if not hmac.compare_digest(headers.get(self.SECRET_TOKEN_HEADER, ''), self.secret_token):
+            self.logger.warning('Refused an update without a valid secret token')
+            return 403, {}
+        if self.backlog() >= self.max_pending_updates:
+            self.rejected += 1
+            return 429, {'Retry-After': '1'}
+        try:
+            update = telegram.Update.de_json(json.loads(body), self.bot)
+        except (ValueError, TypeError, KeyError):
+            return 400, {}
+        self.update_queue.put(update)
+        self.accepted += 1
+        return 200, {}
+
+    async def __respond(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool,
+                        headers: Optional[Dict[str, str]] = None) -> None:
+        lines = [f'HTTP/1.1 {status} {self.REASONS[status]}', 'Content-Length: 0']
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
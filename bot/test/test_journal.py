@@ -0,0 +1,195 @@
+import shutil
+
+import telegram
+
+from bot.storage.journal import snapshot
+from bot.storage.journal.controller import JournaledStorageController
+from bot.storage.journal.journal import Journal
+
+
+# Of the same size, so each takes a third of a segment
+RECORDS = [('record', 'a'), ('record', 'b'), ('record', 'c')]
+USERS = [telegram.User(1, 'Аня', False, username='anya'), telegram.User(2, 'Боря', False)]
+
+
+def open_controller(directory, **kwargs):
+    return JournaledStorageController(directory, commit_interval=0.001, sync=False, **kwargs)
+
+
+def fill(controller, rooms):
+    for idx in range(rooms):
+        room_id = str(-idx - 1)
+        controller.create_room(room_id)
+        for user in USERS:
+            controller.add_user_to_room(room_id, user)
+        controller.start_game(room_id, [('кичкинка', 'безделушка')])
+        controller.add_questions(room_id, [('гяповать', 'кричать')])
+        controller.add_user_question_message_id(room_id, 1, idx)
+        controller.add_poll(room_id, f'poll{idx}', idx)
+    controller.set_conversation_state((-1,), 'WAIT_ANS')
+
+
+def state(controller):
+    rooms = {}
+    for room_id, room in sorted(controller.storage.rooms.items()):
+        rooms[room_id] = (
+            [(question.word, question.description) for question in room.game.question_set.questions],
+            {user_id: (user.first_name, user.username) for user_id, user in room.participants.items()},
+            dict(room.game_state.user_question_message_id), room.game_state.poll_id,
+        )
+    return (
+        rooms, dict(controller.storage.poll_rooms), dict(controller.storage.private_message_rooms),
+        {user_id: set(room_ids) for user_id, room_ids in controller.storage.user_rooms.items()},
+        controller.get_conversation_states(),
+    )
+
+
+def write_records(directory, records):
+    journal = Journal(directory, commit_interval=0.001, sync=False)
+    journal.open(0)
+    for record in records:
+        journal.append(record)
+    journal.close()
+    return Journal.segment_path(directory, 0)
+
+
+def test_reading_stops_at_a_crc_mismatch(tmp_path):
+    path = write_records(tmp_path, RECORDS)
+    data = bytearray(path.read_bytes())
+    # The last byte of the second record's payload
+    second_end = 2 * len(data) // 3 - 1
+    data[second_end] ^= 0xff
+    path.write_bytes(bytes(data))
+    assert list(Journal.read(path)) == RECORDS[:1]
+
+
+def test_reading_stops_at_a_torn_tail(tmp_path):
+    path = write_records(tmp_path, RECORDS)
+    data = path.read_bytes()
+    for cut in (1, Journal.HEADER.size + 1, len(data) // 3 - 1):
+        path.write_bytes(data[:len(data) - cut])
+        assert list(Journal.read(path)) == RECORDS[:2]
+
+
+def test_recovers_up_to_a_torn_write(tmp_path):
+    controller = open_controller(tmp_path)
+    fill(controller, 2)
+    controller.flush()
+    expected = state(controller)
+    controller.create_room('-3')
+    controller.close()
+    segment_path = Journal.segment_path(tmp_path, Journal.segments(tmp_path)[-1])
+    data = segment_path.read_bytes()
+    segment_path.write_bytes(data[:-3])
+
+    controller = open_controller(tmp_path)
+    try:
+        assert state(controller) == expected
+        # New changes never go after the torn record
+        controller.create_room('-4')
+        controller.flush()
+        assert segment_path.read_bytes() == data[:-3]
+    finally:
+        controller.close()
+    controller = open_controller(tmp_path)
+    try:
+        assert '-4' in controller.storage.rooms
+    finally:
+        controller.close()
+
+
+def test_commits_records_appended_together_at_once(tmp_path, monkeypatch):
+    syncs = []
+    monkeypatch.setattr('bot.storage.journal.journal.os.fsync', syncs.append)
+    journal = Journal(tmp_path, commit_interval=0.1)
+    journal.open(0)
+    for idx in range(100):
+        journal.append(('record', idx))
+    journal.flush()
+    assert len(syncs) == 1
+    journal.append(('record', 100))
+    journal.close()
+    assert len(syncs) == 2
+    assert list(Journal.read(Journal.segment_path(tmp_path, 0))) == [('record', idx) for idx in range(101)]
+
+
+def test_snapshot_replaces_the_segments(tmp_path):
+    controller = open_controller(tmp_path)
+    fill(controller, 3)
+    controller.snapshot()
+    controller.remove_room('-2')
+    controller.flush()
+    expected = state(controller)
+    controller.close()
+    assert snapshot.snapshots(tmp_path) == [1]
+    assert Journal.segments(tmp_path) == [1]
+
+    controller = open_controller(tmp_path)
+    try:
+        assert state(controller) == expected
+        controller.snapshot()
+        # Only the segment the journal writes to now is left
+        assert len(snapshot.snapshots(tmp_path)) == 1
+        assert Journal.segments(tmp_path) == snapshot.snapshots(tmp_path)
+    finally:
+        controller.close()
+    controller = open_controller(tmp_path)
+    try:
+        assert state(controller) == expected
+    finally:
+        controller.close()
+
+
+def test_recovers_after_a_crash_between_snapshot_and_removing_segments(tmp_path):
+    controller = open_controller(tmp_path)
+    fill(controller, 3)
+    controller.flush()
+    expected = state(controller)
+    saved = tmp_path / 'saved'
+    saved.mkdir()
+    shutil.copy(Journal.segment_path(tmp_path, 0), saved)
+    controller.snapshot()
+    controller.close()
+    # The snapshot was written but the segments it replaces were not removed
+    shutil.copy(saved / Journal.segment_path(tmp_path, 0).name, tmp_path)
+
+    controller = open_controller(tmp_path)
+    try:
+        # Questions are added, so replaying the old segment over the snapshot would duplicate them
+        assert state(controller) == expected
+        controller.snapshot()
+        # The left over segment is removed with the others
+        assert Journal.segments(tmp_path) == snapshot.snapshots(tmp_path)
+    finally:
+        controller.close()
+
+
+def test_snapshot_rooms_are_decoded_when_used(tmp_path):
+    controller = open_controller(tmp_path)
+    fill(controller, 3)
+    controller.snapshot()
+    controller.close()
+
+    controller = open_controller(tmp_path)
+    try:
+        rooms = controller.storage.rooms
+        assert isinstance(rooms, snapshot.EncodedRooms)
+        assert len(rooms.encoded) == 3
+        assert len(rooms) == 3 and '-2' in rooms
+        assert controller.get_user_room_ids(1) == {'-1', '-2', '-3'}
+        assert controller.get_room_id_by_poll_id('poll1') == '-2'
+        assert len(rooms.encoded) == 3
+        assert controller.get_current_word('-2') == 'кичкинка'
+        assert sorted(rooms.encoded) == ['-1', '-3']
+        # Changes to a decoded room go to the next snapshot
+        controller.next_round('-2')
+        controller.snapshot()
+        assert sorted(rooms.encoded) == ['-1', '-3']
+    finally:
+        controller.close()
+    controller = open_controller(tmp_path)
+    try:
+        assert controller.get_current_word('-2') == 'гяповать'
+        assert controller.get_current_word('-1') == 'кичкинка'
+    finally:
+        controller.close()
@@ -0,0 +1,189 @@
+import pathlib
+import threading
+import time
+import types
+
+import pytest
+import telegram
+
+from bot.bot import Bot, chat_id_to_room_id, room_id_to_chat_id
+from bot.messages.message import Message
+from bot.storage.inmemory.controller import InmemoryStorageController
+from bot.storage.journal.controller import JournaledStorageController
+from bot.storage.sqlite.controller import SqliteStorageController
+from bot.telegram_extensions.handlers.conversation_handler import ConversationHandler
+
+
+ASSETS_PATH = pathlib.Path(__file__).parents[2] / 'assets'
+CHAT_ID = -42
+ROOM_ID = chat_id_to_room_id(CHAT_ID)
+USER = telegram.User(1, 'Аня', False)
+
+
+def open_inmemory(tmp_path):
+    return InmemoryStorageController()
+
+
+def open_journaled(tmp_path):
+    return JournaledStorageController(tmp_path, commit_interval=0.001, sync=False)
+
+
+def open_sqlite(tmp_path):
+    return SqliteStorageController(str(tmp_path / 'rooms.db'))
+
+
+CONTROLLERS = [open_inmemory, open_journaled, open_sqlite]
+
+
+def words(controller):
+    return [question.word for question in controller.load_room(ROOM_ID).room.game.question_set.questions]
+
+
+@pytest.mark.parametrize('open_controller', CONTROLLERS)
+def test_added_questions_are_played(tmp_path, open_controller):
+    controller = open_controller(tmp_path)
+    try:
+        controller.create_room(ROOM_ID)
+        controller.add_user_to_room(ROOM_ID, USER)
+        controller.start_game(ROOM_ID, [('кичкинка', 'безделушка')])
+        controller.add_user_description(ROOM_ID, 1, 'что-то маленькое')
+        with pytest.raises(IndexError):
+            controller.next_round(ROOM_ID)
+        controller.add_questions(ROOM_ID, [('гяповать', 'кричать')])
+        controller.add_questions(ROOM_ID, [('цвелый', 'заплесневелый'), ('пуля', 'снаряд')])
+        # Adding questions doesn't touch the round being played
+        assert controller.get_current_word(ROOM_ID) == 'кичкинка'
+        assert controller.get_current_user_descriptions(ROOM_ID) == {1: 'что-то маленькое'}
+        controller.next_round(ROOM_ID)
+        assert controller.get_current_word(ROOM_ID) == 'гяповать'
+        assert controller.get_current_description(ROOM_ID) == 'кричать'
+        assert words(controller) == ['кичкинка', 'гяповать', 'цвелый', 'пуля']
+    finally:
+        controller.close()
+
+
+@pytest.mark.parametrize('open_controller', [open_journaled, open_sqlite])
+def test_added_questions_are_kept(tmp_path, open_controller):
+    controller = open_controller(tmp_path)
+    controller.create_room(ROOM_ID)
+    controller.start_game(ROOM_ID, [('кичкинка', 'безделушка')])
+    controller.add_questions(ROOM_ID, [('гяповать', 'кричать')])
+    controller.close()
+
+    controller = open_controller(tmp_path)
+    try:
+        assert words(controller) == ['кичкинка', 'гяповать']
+        controller.next_round(ROOM_ID)
+        with pytest.raises(IndexError):
+            controller.next_round(ROOM_ID)
+        # A new game starts with its own questions only
+        controller.start_game(ROOM_ID, [('цвелый', 'заплесневелый')])
+        assert words(controller) == ['цвелый']
+    finally:
+        controller.close()
+
+
+@pytest.mark.parametrize('open_controller', CONTROLLERS)
+def test_adding_questions_to_an_unknown_room_raises(tmp_path, open_controller):
+    controller = open_controller(tmp_path)
+    try:
+        with pytest.raises(KeyError):
+            controller.add_questions(ROOM_ID, [('гяповать', 'кричать')])
+    finally:
+        controller.close()
+
+
+class Words(object):
+    """Gives numbered words, to the rooms in `blocked` (every room if it is None) once `released` is set"""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.blocked = None
+        self.lock = threading.Lock()
+        self.taken = 0
+
+    def __call__(self, n, key=None):
+        if self.blocked is None or key in self.blocked:
+            self.released.wait()
+        with self.lock:
+            self.taken += n
+            return [(f'слово{self.taken - idx}', 'значение') for idx in range(n)]
+
+
+@pytest.fixture
+def bot():
+    bot = Bot('123:token', ASSETS_PATH, word_budget=0.5)
+    bot.sent = []
+    bot.words = Words()
+    bot.word_pool.take = bot.words
+    bot.conversation_handler = ConversationHandler(entry_points=[], states={}, fallbacks=[])
+    yield bot
+    bot.words.released.set()
+    bot.fan_out.shutdown()
+    bot.message_scheduler.stop()
+
+
+def command(bot):
+    message = types.SimpleNamespace(reply_text=lambda text, **kwargs: bot.sent.append(text))
+    update = types.SimpleNamespace(effective_chat=telegram.Chat(CHAT_ID, telegram.Chat.GROUP), effective_user=USER,
+                                   message=message)
+    return update, types.SimpleNamespace(bot=None, args=[])
+
+
+def start_game(bot, words_played, state=Bot.State.ROUND_FINISH):
+    bot.storage_controller.create_room(ROOM_ID)
+    bot.storage_controller.add_user_to_room(ROOM_ID, USER)
+    bot.storage_controller.start_game(ROOM_ID, [(f'слово{idx}', 'значение') for idx in range(words_played)])
+    bot.conversation_handler.conversations[(CHAT_ID,)] = state
+
+
+def test_games_are_filled_again_after_a_restart(bot):
+    start_game(bot, 1)
+    bot.words.released.set()
+    bot.resume_question_fills()
+    update, context = command(bot)
+    for _ in range(bot.words_per_game - 1):
+        assert bot.next_command(update, context) == Bot.State.WAIT_ANS
+    assert len(words(bot.storage_controller)) == bot.words_per_game
+    assert bot.next_command(update, context) == Bot.State.INIT_STATE
+    assert bot.sent == [bot.message_reader.format(Message.QUESTIONS_ENDED)]
+
+
+def test_only_games_missing_words_are_filled(bot):
+    start_game(bot, 4)
+    bot.words.released.set()
+    bot.resume_question_fills()
+    bot.conversation_handler.conversations[(CHAT_ID,)] = Bot.State.INIT_STATE
+    bot.storage_controller.start_game(ROOM_ID, [('слово', 'значение')])
+    bot.resume_question_fills()
+    assert bot.question_fills == {}
+    assert len(words(bot.storage_controller)) == 1
+
+
+def test_next_round_waits_for_a_word_at_most_the_word_budget(bot):
+    start_game(bot, 1)
+    bot.resume_question_fills()
+    update, context = command(bot)
+    started = time.monotonic()
+    assert bot.next_command(update, context) == Bot.State.INIT_STATE
+    assert bot.word_budget <= time.monotonic() - started < bot.word_budget + 0.5
+    assert bot.sent == [bot.message_reader.format(Message.QUESTIONS_ENDED)]
+    # The stuck fill was cancelled, so its words don't land in the next game
+    bot.words.released.set()
+    time.sleep(0.1)
+    assert words(bot.storage_controller) == ['слово0']
+
+
+def test_a_stuck_fill_doesnt_hold_up_other_rooms(bot):
+    stuck_rooms = [chat_id_to_room_id(CHAT_ID - idx) for idx in range(1, 9)]
+    bot.words.blocked = set(stuck_rooms)
+    for room_id in stuck_rooms:
+        bot.storage_controller.create_room(room_id)
+        bot.storage_controller.start_game(room_id, [('слово', 'значение')])
+        bot.conversation_handler.conversations[(room_id_to_chat_id(room_id),)] = Bot.State.WAIT_ANS
+    start_game(bot, 1)
+    bot.resume_question_fills()
+    update, context = command(bot)
+    for _ in range(bot.words_per_game - 1):
+        assert bot.next_command(update, context) == Bot.State.WAIT_ANS
+    assert set(bot.question_fills) == set(stuck_rooms)
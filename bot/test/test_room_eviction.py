@@ -0,0 +1,85 @@
+import pathlib
+import types
+
+import pytest
+import telegram
+
+from bot.bot import Bot, chat_id_to_room_id
+from bot.storage.inmemory.controller import InmemoryStorageController
+from bot.telegram_extensions.handlers.conversation_handler import ConversationHandler
+from bot.telegram_extensions.timing_wheel import TimingWheel
+
+
+ASSETS_PATH = pathlib.Path(__file__).parents[2] / 'assets'
+CHAT_ID = -42
+ROOM_ID = chat_id_to_room_id(CHAT_ID)
+IDLE_TIMEOUT = 60
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def bot():
+    storage_controller = InmemoryStorageController()
+    archived = []
+    bot = Bot('123:token', ASSETS_PATH, storage_controller=storage_controller, idle_timeout=IDLE_TIMEOUT,
+              room_archive=archived.append)
+    bot.archived = archived
+    bot.clock = Clock()
+    bot.timing_wheel = TimingWheel(clock=bot.clock)
+    bot.states = []
+    bot.conversation_handler = ConversationHandler(
+        entry_points=[], states={}, fallbacks=[], per_chat=True, per_user=False,
+        state_listener=lambda key, state: bot.states.append((key, state)),
+    )
+    yield bot
+    bot.fan_out.shutdown()
+    bot.message_scheduler.stop()
+
+
+def start_room(bot):
+    bot.storage_controller.create_room(ROOM_ID)
+    bot.storage_controller.add_user_to_room(ROOM_ID, telegram.User(1, 'Аня', False))
+    bot.storage_controller.start_game(ROOM_ID, [('кичкинка', 'безделушка')])
+    bot.storage_controller.add_user_question_message_id(ROOM_ID, 1, 100)
+    bot.conversation_handler.conversations[(CHAT_ID,)] = Bot.State.WAIT_ANS
+    update = types.SimpleNamespace(effective_chat=telegram.Chat(CHAT_ID, telegram.Chat.GROUP))
+    bot.touch_room(update, None)
+
+
+def expire(bot, now):
+    bot.clock.now = now
+    bot.expire_timers(types.SimpleNamespace(bot=None))
+
+
+def test_evicts_idle_rooms(bot):
+    start_room(bot)
+    expire(bot, IDLE_TIMEOUT - 1)
+    assert bot.archived == []
+    assert ROOM_ID in bot.storage_controller.storage.rooms
+
+    expire(bot, IDLE_TIMEOUT)
+    assert [room.id for room in bot.archived] == [ROOM_ID]
+    assert [question.word for question in bot.archived[0].game.question_set.questions] == ['кичкинка']
+    assert ROOM_ID not in bot.storage_controller.storage.rooms
+    assert bot.storage_controller.get_user_room_ids(1) == set()
+    assert bot.conversation_handler.conversations == {}
+    assert bot.states == [((CHAT_ID,), None)]
+    assert len(bot.timing_wheel) == 0
+
+
+def test_keeps_rooms_with_updates(bot):
+    start_room(bot)
+    expire(bot, IDLE_TIMEOUT - 10)
+    bot.touch_room(types.SimpleNamespace(effective_chat=telegram.Chat(CHAT_ID, telegram.Chat.GROUP)), None)
+    expire(bot, IDLE_TIMEOUT + 1)
+    assert bot.archived == []
+    assert bot.conversation_handler.conversations == {(CHAT_ID,): Bot.State.WAIT_ANS}
+    expire(bot, 2 * IDLE_TIMEOUT - 10)
+    assert [room.id for room in bot.archived] == [ROOM_ID]
@@ -0,0 +1,80 @@
+import datetime
+import queue
+
+import telegram
+
+from bot.bot import chat_id_to_room_id
+from bot.shards import ShardRouter, ShardSupervisor, shard_of
+
+
+SHARDS = 4
+BOT = telegram.Bot('123:token')
+
+
+def message_update(update_id, chat, reply_to_message_id=None):
+    reply_to_message = None
+    if reply_to_message_id is not None:
+        reply_to_message = telegram.Message(reply_to_message_id, datetime.datetime.now(), chat, bot=BOT)
+    message = telegram.Message(update_id, datetime.datetime.now(), chat, text='текст',
+                               reply_to_message=reply_to_message, bot=BOT)
+    return telegram.Update(update_id, message=message)
+
+
+def poll_answer_update(update_id, poll_id):
+    poll_answer = telegram.PollAnswer(poll_id, telegram.User(7, 'Игрок', False), [0])
+    return telegram.Update(update_id, poll_answer=poll_answer)
+
+
+def supervisor():
+    supervisor = ShardSupervisor('123:token', None, SHARDS)
+    supervisor.updates = [queue.Queue() for _ in range(SHARDS)]
+    return supervisor
+
+
+def drain(supervisor):
+    result = []
+    for updates in supervisor.updates:
+        items = []
+        while not updates.empty():
+            data, broadcast = updates.get_nowait()
+            items.append((data['update_id'], broadcast))
+        result.append(items)
+    return result
+
+
+def test_routes_chats_to_the_owning_shard():
+    router = ShardRouter(SHARDS)
+    group = telegram.Chat(-100, telegram.Chat.GROUP)
+    assert router.route(message_update(1, group)) == [shard_of(chat_id_to_room_id(-100), SHARDS)]
+    private = telegram.Chat(7, telegram.Chat.PRIVATE)
+    assert router.route(message_update(2, private)) == [shard_of(chat_id_to_room_id(7), SHARDS)]
+
+
+def test_routes_known_replies_and_polls_to_their_shard():
+    router = ShardRouter(SHARDS)
+    router.add_route('private_message', (7, 42), 3)
+    router.add_route('poll', 'poll', 2)
+    assert router.route(message_update(1, telegram.Chat(7, telegram.Chat.PRIVATE), 42)) == [3]
+    assert router.route(poll_answer_update(2, 'poll')) == [2]
+
+
+def test_sends_unknown_replies_and_polls_to_every_shard():
+    router = ShardRouter(SHARDS, max_routes=1)
+    router.add_route('private_message', (7, 42), 3)
+    # Forgotten to make room for a newer route
+    router.add_route('private_message', (7, 43), 1)
+    assert router.route(message_update(1, telegram.Chat(7, telegram.Chat.PRIVATE), 42)) == list(range(SHARDS))
+    assert router.route(poll_answer_update(2, 'unknown')) == list(range(SHARDS))
+
+
+def test_marks_broadcast_replies():
+    shards = supervisor()
+    shards.router.add_route('private_message', (7, 42), 3)
+    private = telegram.Chat(7, telegram.Chat.PRIVATE)
+    shards.route(message_update(1, private, 42))
+    shards.route(message_update(2, private, 43))
+    shards.route(poll_answer_update(3, 'unknown'))
+    routed = drain(shards)
+    assert routed[3] == [(1, False), (2, True), (3, False)]
+    for shard in range(3):
+        assert routed[shard] == [(2, True), (3, False)]
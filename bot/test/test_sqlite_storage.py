@@ -0,0 +1,112 @@
+import pytest
+import telegram
+
+from bot.storage.exceptions import RoomNotFoundError
+from bot.storage.sqlite.controller import SqliteStorageController
+
+
+ROOM_ID = '-1'
+USERS = [telegram.User(1, 'Аня', False, username='anya'), telegram.User(2, 'Боря', False)]
+
+
+def start_room(controller, questions=(('кичкинка', 'безделушка'),)):
+    controller.create_room(ROOM_ID)
+    for user in USERS:
+        controller.add_user_to_room(ROOM_ID, user)
+    controller.start_game(ROOM_ID, questions)
+
+
+def test_reopened_database_has_the_rooms(tmp_path):
+    path = str(tmp_path / 'rooms.db')
+    controller = SqliteStorageController(path)
+    start_room(controller)
+    controller.add_questions(ROOM_ID, [('гяповать', 'кричать')])
+    controller.next_round(ROOM_ID)
+    controller.add_user_question_message_id(ROOM_ID, 1, 100)
+    controller.add_user_description(ROOM_ID, 1, 'что-то громкое')
+    controller.set_poll_description_order(ROOM_ID, [('кричать', None), ('что-то громкое', 1)])
+    controller.add_poll(ROOM_ID, 'poll', 101)
+    controller.add_user_vote(ROOM_ID, 2, 1)
+    controller.set_conversation_state((-1,), 'WAIT_VOTE')
+    controller.set_conversation_state((-2,), 'WAIT_ANS')
+    controller.set_conversation_state((-2,), None)
+    controller.close()
+
+    controller = SqliteStorageController(path)
+    try:
+        users = controller.get_users_in_room(ROOM_ID)
+        assert [(user.id, user.first_name, user.username) for user in users.values()] == [
+            (1, 'Аня', 'anya'), (2, 'Боря', None),
+        ]
+        assert controller.get_current_word(ROOM_ID) == 'гяповать'
+        assert controller.get_current_description(ROOM_ID) == 'кричать'
+        assert controller.get_current_user_descriptions(ROOM_ID) == {1: 'что-то громкое'}
+        assert controller.get_room_id_by_private_message_id(1, 100) == ROOM_ID
+        assert controller.get_description_order(ROOM_ID) == [('кричать', None), ('что-то громкое', 1)]
+        assert controller.get_room_id_by_poll_id('poll') == ROOM_ID
+        assert controller.get_poll_message_id(ROOM_ID) == 101
+        assert controller.get_user_votes(ROOM_ID) == {2: 1}
+        assert controller.get_conversation_states() == {(-1,): 'WAIT_VOTE'}
+        room = controller.load_room(ROOM_ID).room
+        assert [question.word for question in room.game.question_set.questions] == ['кичкинка', 'гяповать']
+    finally:
+        controller.close()
+
+
+def test_open_room_discards_changes_when_the_block_raises(tmp_path):
+    controller = SqliteStorageController(str(tmp_path / 'rooms.db'))
+    try:
+        start_room(controller)
+        with pytest.raises(RuntimeError):
+            with controller.open_room(ROOM_ID) as room:
+                room.add_user_description(1, 'безделушка')
+                raise RuntimeError
+        assert controller.get_current_user_descriptions(ROOM_ID) == {}
+    finally:
+        controller.close()
+
+
+def test_commit_rolls_back_when_a_change_fails(tmp_path):
+    controller = SqliteStorageController(str(tmp_path / 'rooms.db'))
+    try:
+        start_room(controller)
+        handle = controller.load_room(ROOM_ID)
+        handle.add_user_description(1, 'безделушка')
+        handle.add_poll('poll', 101)
+        # The game has a single question, so the last change raises
+        handle.changes.append(('next_round', ()))
+        with pytest.raises(IndexError):
+            controller.commit_room(handle)
+        assert controller.get_current_user_descriptions(ROOM_ID) == {}
+        assert controller.get_room_id_by_poll_id('poll') is None
+    finally:
+        controller.close()
+
+
+def test_next_round_raises_after_the_last_question(tmp_path):
+    controller = SqliteStorageController(str(tmp_path / 'rooms.db'))
+    try:
+        start_room(controller, [('кичкинка', 'безделушка'), ('гяповать', 'кричать')])
+        controller.add_user_description(ROOM_ID, 1, 'безделушка')
+        controller.next_round(ROOM_ID)
+        assert controller.get_current_word(ROOM_ID) == 'гяповать'
+        assert controller.get_current_user_descriptions(ROOM_ID) == {}
+        with pytest.raises(IndexError):
+            controller.next_round(ROOM_ID)
+        assert controller.get_current_word(ROOM_ID) == 'гяповать'
+    finally:
+        controller.close()
+
+
+def test_removed_room_is_gone(tmp_path):
+    controller = SqliteStorageController(str(tmp_path / 'rooms.db'))
+    try:
+        start_room(controller)
+        controller.add_user_question_message_id(ROOM_ID, 1, 100)
+        controller.remove_room(ROOM_ID)
+        with pytest.raises(RoomNotFoundError):
+            controller.get_room_id_by_private_message_id(1, 100)
+        with pytest.raises(KeyError):
+            controller.get_users_in_room(ROOM_ID)
+    finally:
+        controller.close()
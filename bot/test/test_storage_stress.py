@@ -0,0 +1,120 @@
+"""Hammers the in-memory storage controllers from many threads and checks they stay consistent.
+
+Each thread plays games in its own share of the rooms while all threads
+resolve polls and private replies of random rooms through the shared
+indexes, like parallel dispatcher workers would.
+"""
+import random
+import sys
+import threading
+
+import pytest
+import telegram
+
+from bot.storage.exceptions import RoomNotFoundError
+from bot.storage.inmemory.controller import InmemoryStorageController
+from bot.storage.journal.controller import JournaledStorageController
+
+
+ROOMS = 400
+THREADS = 16
+USERS_PER_ROOM = 4
+WORDS_PER_GAME = 4
+
+
+def play(controller, room_ids, all_room_ids, errors):
+    try:
+        for room_id in room_ids:
+            room_idx = -int(room_id)
+            users = [
+                telegram.User(room_idx * USERS_PER_ROOM + user_idx, f'user{user_idx}', False)
+                for user_idx in range(USERS_PER_ROOM)
+            ]
+            controller.create_room(room_id)
+            for user in users:
+                controller.add_user_to_room(room_id, user)
+            controller.start_game(room_id, [('word', 'description')] * WORDS_PER_GAME)
+            for round_idx in range(WORDS_PER_GAME):
+                with controller.open_room(room_id) as room:
+                    for user in users:
+                        room.add_user_question_message_id(user.id, round_idx)
+                for user in users:
+                    assert controller.get_room_id_by_private_message_id(user.id, round_idx) == room_id
+                    with controller.open_room(room_id) as room:
+                        room.add_user_description(user.id, 'answer')
+                with controller.open_room(room_id) as room:
+                    room.add_poll(f'{room_id}:{round_idx}', round_idx)
+                for user in users:
+                    with controller.open_room(controller.get_room_id_by_poll_id(f'{room_id}:{round_idx}')) as room:
+                        room.add_user_vote(user.id, 0)
+                assert len(controller.get_user_votes(room_id)) == USERS_PER_ROOM
+
+                other_room_id = random.choice(all_room_ids)
+                try:
+                    controller.get_room_id_by_private_message_id(-int(other_room_id) * USERS_PER_ROOM, round_idx)
+                except RoomNotFoundError:
+                    pass
+                controller.get_room_id_by_poll_id(f'{other_room_id}:{round_idx}')
+                try:
+                    controller.next_round(room_id)
+                except IndexError:
+                    pass
+            if room_idx % 2:
+                controller.remove_user_from_room(room_id, users[0])
+            else:
+                controller.remove_room(room_id)
+    except Exception as e:
+        errors.append(e)
+
+
+def check_consistency(controller):
+    storage = controller.storage
+    for poll_id, room_id in storage.poll_rooms.items():
+        assert storage.rooms[room_id].game_state.poll_id == poll_id
+    for (user_id, message_id), room_id in storage.private_message_rooms.items():
+        assert storage.rooms[room_id].game_state.user_question_message_id[user_id] == message_id
+    for user_id, room_ids in storage.user_rooms.items():
+        for room_id in room_ids:
+            assert user_id in storage.rooms[room_id].participants
+    for room_id, room in storage.rooms.items():
+        for user_id in room.participants:
+            assert room_id in storage.user_rooms[user_id]
+
+
+@pytest.fixture
+def switch_often():
+    # Threads switch every few bytecodes instead of every 5 ms, so the races get a chance to happen
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize('make_controller', [
+    lambda tmp_path: InmemoryStorageController(lock_stripes=8),
+    lambda tmp_path: JournaledStorageController(tmp_path, snapshot_records=5000, sync=False, lock_stripes=8),
+], ids=['in memory', 'journaled'])
+def test_storage_stays_consistent(make_controller, tmp_path, switch_often):
+    controller = make_controller(tmp_path)
+    room_ids = [str(-room_idx) for room_idx in range(ROOMS)]
+    errors = []
+    threads = [
+        threading.Thread(target=play, args=(controller, room_ids[idx::THREADS], room_ids, errors))
+        for idx in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    controller.close()
+    assert not errors, errors
+    check_consistency(controller)
+    assert len(controller.storage.rooms) == ROOMS // 2
+    if isinstance(controller, JournaledStorageController):
+        recovered = JournaledStorageController(tmp_path)
+        recovered.close()
+        check_consistency(recovered)
+        assert sorted(recovered.storage.rooms) == sorted(controller.storage.rooms)
+        assert recovered.storage.poll_rooms == controller.storage.poll_rooms
+        assert recovered.storage.private_message_rooms == controller.storage.private_message_rooms
+        assert recovered.storage.user_rooms == controller.storage.user_rooms
@@ -0,0 +1,109 @@
+import random
+
+from bot.telegram_extensions.timing_wheel import TimingWheel
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def small_wheel():
+    # Covers 16 ticks, so longer delays wait beyond the top wheel
+    clock = Clock()
+    return TimingWheel(tick=1., slots=4, levels=2, clock=clock), clock
+
+
+def run(wheel, clock, ticks, on_tick=None):
+    """Advances the wheel a tick at a time, calling `on_tick` after each, and returns the tick each key expired at"""
+    expired = {}
+    for _ in range(ticks):
+        clock.now += 1
+        for key in wheel.advance():
+            assert key not in expired
+            expired[key] = int(clock.now)
+        if on_tick is not None:
+            on_tick(int(clock.now))
+    return expired
+
+
+def test_expires_keys_at_their_deadline():
+    wheel, clock = small_wheel()
+    for delay in (1, 3, 4, 5, 15, 16, 17, 100, 300):
+        wheel.schedule(delay, delay)
+    assert run(wheel, clock, 400) == {delay: delay for delay in (1, 3, 4, 5, 15, 16, 17, 100, 300)}
+    assert len(wheel) == 0
+
+
+def test_rounds_delays_up_to_a_tick():
+    wheel, clock = small_wheel()
+    wheel.schedule('zero', 0)
+    wheel.schedule('fraction', 2.5)
+    assert run(wheel, clock, 5) == {'zero': 1, 'fraction': 3}
+
+
+def test_rescheduled_keys_expire_at_the_new_deadline():
+    wheel, clock = small_wheel()
+    wheel.schedule('later', 3)
+    wheel.schedule('earlier', 90)
+    wheel.schedule('touched', 5)
+
+    def on_tick(now):
+        if now == 2:
+            wheel.schedule('later', 40)
+            wheel.schedule('earlier', 6)
+        if now < 30:
+            # Touched on every tick, like the idle timer of an active room
+            wheel.schedule('touched', 5)
+
+    assert run(wheel, clock, 100, on_tick) == {'later': 42, 'earlier': 8, 'touched': 34}
+
+
+def test_cancelled_keys_never_expire():
+    wheel, clock = small_wheel()
+    for key in ('soon', 'far', 'beyond'):
+        wheel.schedule(key, {'soon': 2, 'far': 12, 'beyond': 50}[key])
+    wheel.schedule('kept', 50)
+
+    def on_tick(now):
+        if now == 1:
+            for key in ('soon', 'far', 'beyond'):
+                wheel.cancel(key)
+            assert 'soon' not in wheel
+
+    assert run(wheel, clock, 60, on_tick) == {'kept': 50}
+    # Scheduled again after being cancelled
+    wheel.schedule('soon', 2)
+    assert run(wheel, clock, 2) == {'soon': 62}
+
+
+def test_catches_up_on_missed_ticks():
+    wheel, clock = small_wheel()
+    wheel.schedule('short', 3)
+    wheel.schedule('long', 70)
+    clock.now = 100
+    assert sorted(wheel.advance()) == ['long', 'short']
+
+
+def test_random_schedules_expire_on_time():
+    random_ = random.Random(7)
+    wheel, clock = small_wheel()
+    deadlines = {}
+    for now in range(1, 301):
+        clock.now = now
+        for key in wheel.advance():
+            assert deadlines.pop(key) == now
+        assert all(deadline > now for deadline in deadlines.values())
+        for _ in range(5):
+            key = random_.randrange(50)
+            if random_.random() < 0.2:
+                wheel.cancel(key)
+                deadlines.pop(key, None)
+            else:
+                delay = random_.randrange(1, 80)
+                wheel.schedule(key, delay)
+                deadlines[key] = now + delay
+    assert len(wheel) == len(deadlines)
@@ -0,0 +1,51 @@
+import http.client
+import json
+import queue
+
+import pytest
+import telegram
+
+from bot.telegram_extensions.webhook_server import WebhookServer
+
+
+SECRET_TOKEN = 'test-secret'
+UPDATE = json.dumps({'update_id': 1}).encode('utf8')
+
+
+@pytest.fixture
+def server():
+    server = WebhookServer(telegram.Bot('123:token'), queue.Queue(), listen='127.0.0.1', port=0,
+                           secret_token=SECRET_TOKEN)
+    server.start()
+    yield server
+    server.stop()
+
+
+def post(server, headers):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port)
+    try:
+        connection.request('POST', '/', UPDATE, {'Content-Type': 'application/json', **headers})
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('headers', [{}, {WebhookServer.SECRET_TOKEN_HEADER: 'wrong'}])
+def test_refuses_updates_without_the_secret_token(server, headers):
+    assert post(server, headers) == 403
+    assert server.update_queue.empty()
+    assert server.accepted == 0
+
+
+def test_accepts_updates_with_the_secret_token(server):
+    assert post(server, {WebhookServer.SECRET_TOKEN_HEADER: SECRET_TOKEN}) == 200
+    assert server.update_queue.get_nowait().update_id == 1
+
+
+def test_makes_up_a_secret_token_when_none_is_given():
+    first = WebhookServer(telegram.Bot('123:token'), queue.Queue())
+    second = WebhookServer(telegram.Bot('123:token'), queue.Queue())
+    assert first.secret_token and second.secret_token
+    assert first.secret_token != second.secret_token
@@ -1,7 +1,13 @@
 import logging
+import os
 import pathlib
+from typing import Optional
 
 from bot.bot import Bot
+from bot.shards import ShardSupervisor
+from bot.storage.journal.controller import JournaledStorageController
+from bot.storage.room_archive import RoomArchive
+from bot.storage.sqlite.controller import SqliteStorageController
 
 
 logging.basicConfig(
@@ -10,12 +16,53 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
+def read_token() -> str:
     with open('.token', 'r') as f:
-        TOKEN = f.readline()
+        return f.readline()
+
+
+def make_bot(shard: Optional[int] = None) -> Bot:
+    assets_path = pathlib.Path('assets')
+    corpus_path = assets_path / 'words_ru.corpus'
+    db_path = os.environ.get('ZAVALINKA_DB')
+    if db_path and shard is not None:
+        db_path = f'{db_path}.shard{shard}'
+    journal_path = os.environ.get('ZAVALINKA_JOURNAL')
+    if journal_path and shard is not None:
+        journal_path = os.path.join(journal_path, f'shard{shard}')
+    if journal_path:
+        storage_controller = JournaledStorageController(journal_path)
+    elif db_path:
+        storage_controller = SqliteStorageController(db_path)
+    else:
+        storage_controller = None
+    archive_path = os.environ.get('ZAVALINKA_ARCHIVE')
+    if archive_path and shard is not None:
+        archive_path = f'{archive_path}.shard{shard}'
+    # Telegram's flood limit is for the whole bot, so the shards share it
+    message_rate = 30. if shard is None else 30. / int(os.environ.get('ZAVALINKA_SHARDS', 1))
+    return Bot(read_token(), assets_path, corpus_path if corpus_path.is_file() else None, pathlib.Path('.cache'),
+               storage_controller,
+               workers=int(os.environ.get('ZAVALINKA_WORKERS', 8)),
+               chat_workers=int(os.environ.get('ZAVALINKA_CHAT_WORKERS', 16)),
+               idle_timeout=float(os.environ.get('ZAVALINKA_IDLE_TIMEOUT', 24 * 60 * 60)),
+               word_budget=float(os.environ.get('ZAVALINKA_WORD_BUDGET', 5)),
+               message_rate=message_rate,
+               room_archive=RoomArchive(pathlib.Path(archive_path)) if archive_path else None)
 
-    bot = Bot(TOKEN, pathlib.Path('assets'))
-    bot.start()
+
+def main():
+    webhook_kwargs = dict(
+        webhook_url=os.environ.get('ZAVALINKA_WEBHOOK_URL'),
+        webhook_port=int(os.environ.get('ZAVALINKA_WEBHOOK_PORT', 8443)),
+        webhook_secret=os.environ.get('ZAVALINKA_WEBHOOK_SECRET'),
+        max_pending_updates=int(os.environ.get('ZAVALINKA_MAX_PENDING_UPDATES', 1000)),
+    )
+    shards = int(os.environ.get('ZAVALINKA_SHARDS', 1))
+    if shards > 1:
+        ShardSupervisor(read_token(), make_bot, shards).start(**webhook_kwargs)
+    else:
+        make_bot().start(**webhook_kwargs)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+import logging
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker(object):
+    """Stops calls to a failing service for a while instead of letting every caller wait for it to time out.
+
+    After `failure_threshold` failures in a row the circuit opens and `check` raises `CircuitOpenError`. After
+    `reset_timeout` seconds one call at a time is let through again: a success closes the circuit, a failure opens
+    it for another `reset_timeout`.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30., clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def state(self):
+        with self.lock:
+            return self.__state()
+
+    def check(self):
+        """Raises `CircuitOpenError` unless a call may go through now"""
+        with self.lock:
+            state = self.__state()
+            if state == CircuitBreaker.CLOSED:
+                return
+            if state == CircuitBreaker.HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+        raise CircuitOpenError(f'{self.name} is failing, not calling it for up to {self.reset_timeout} s')
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                self.logger.info(f'{self.name} is back, circuit closed')
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.logger.warning(f'{self.name} failed {self.failures} times in a row, circuit opened')
+                self.opened_at = self.clock()
+            self.probing = False
+
+    def __state(self):
+        if self.opened_at is None:
+            return CircuitBreaker.CLOSED
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return CircuitBreaker.OPEN
+        return CircuitBreaker.HALF_OPEN
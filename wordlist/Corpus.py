@@ -0,0 +1,156 @@
+import math
+import mmap
+import random
+import shutil
+import struct
+import tempfile
+import threading
+
+from wordlist.FrequencyIndex import FrequencyIndex
+from wordlist.Word import Word
+
+
+class CorpusEntry(object):
+    __slots__ = ('text', 'pos', 'zipf', 'meanings')
+
+    def __init__(self, text, pos, zipf, meanings):
+        self.text = text
+        self.pos = pos
+        self.zipf = zipf
+        self.meanings = meanings
+
+
+class CorpusFormat(object):
+    """Layout of a corpus file (all integers little-endian):
+
+    header:  magic, version, entry count, offset of the index
+    records: pos (u8), zipf (f32), meanings count (u16), word, meanings...
+             every string is stored as u16 byte length + utf-8 bytes
+    index:   u64 record offset per entry, in insertion order
+    """
+    magic = b'ZVLC'
+    version = 1
+    header = struct.Struct('<4sHxxIQ')
+    record_header = struct.Struct('<BfH')
+    string_length = struct.Struct('<H')
+    offset = struct.Struct('<Q')
+
+
+class CorpusWriter(object):
+    """Writes a corpus file entry by entry.
+
+    The offsets of the records are spilled to a temporary file and copied
+    after the records on close, so writing a corpus of any size takes the
+    same memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.offsets = tempfile.TemporaryFile()
+        self.file = open(path, 'wb')
+        self.file.write(b'\0' * CorpusFormat.header.size)
+
+    def add(self, text, pos, zipf, meanings):
+        self.offsets.write(CorpusFormat.offset.pack(self.file.tell()))
+        self.count += 1
+        meanings = list(meanings)
+        chunks = [CorpusFormat.record_header.pack(pos.value, zipf, len(meanings))]
+        for string in [text] + meanings:
+            data = string.encode('utf8')[:0xffff]
+            chunks.append(CorpusFormat.string_length.pack(len(data)))
+            chunks.append(data)
+        self.file.write(b''.join(chunks))
+
+    def close(self):
+        index_offset = self.file.tell()
+        self.offsets.seek(0)
+        shutil.copyfileobj(self.offsets, self.file)
+        self.offsets.close()
+        self.file.seek(0)
+        self.file.write(CorpusFormat.header.pack(
+            CorpusFormat.magic, CorpusFormat.version, self.count, index_offset
+        ))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Corpus(object):
+    """Read-only view of a corpus file.
+
+    The file is mapped into memory, so every process that opens the same
+    corpus shares its pages through the OS page cache. The first `sample` for
+    a part of speech builds a frequency index over its entries with meanings,
+    so sampling never reads an entry it would have to reject.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.index_offset = CorpusFormat.header.unpack_from(self.mm, 0)
+        if magic != CorpusFormat.magic or version != CorpusFormat.version:
+            raise ValueError(f'{path} is not a corpus file')
+        self.indexes = {}
+        self.indexes_lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        offset = self.__offset(idx)
+        pos, zipf, meanings_count = CorpusFormat.record_header.unpack_from(self.mm, offset)
+        offset += CorpusFormat.record_header.size
+        strings = []
+        for _ in range(meanings_count + 1):
+            length, = CorpusFormat.string_length.unpack_from(self.mm, offset)
+            offset += CorpusFormat.string_length.size
+            strings.append(self.mm[offset:offset + length].decode('utf8'))
+            offset += length
+        return CorpusEntry(strings[0], Word.POS(pos), zipf, strings[1:])
+
+    def __iter__(self):
+        for idx in range(self.count):
+            yield self[idx]
+
+    def frequency_index(self, pos=None):
+        """Returns the index of the entries with meanings, of part of speech `pos` or of all of them"""
+        key = None if pos is None else pos.value
+        with self.indexes_lock:
+            if key not in self.indexes:
+                entries = []
+                zipfs = []
+                for idx in range(self.count):
+                    entry_pos, zipf, meanings_count = CorpusFormat.record_header.unpack_from(
+                        self.mm, self.__offset(idx)
+                    )
+                    if meanings_count > 0 and (key is None or entry_pos == key):
+                        entries.append(idx)
+                        zipfs.append(zipf)
+                self.indexes[key] = FrequencyIndex(entries, zipfs)
+            return self.indexes[key]
+
+    def sample(self, n, pos=None, min_zipf=-math.inf, max_zipf=math.inf):
+        """Returns `n` distinct `(word, meaning)` pairs with `min_zipf < zipf <= max_zipf`"""
+        entries = self.frequency_index(pos).sample(n, min_zipf, max_zipf)
+        if len(entries) < n:
+            raise LookupError(f'Corpus {self.path} has not enough words matching the filter')
+        words = []
+        for idx in entries:
+            entry = self[idx]
+            words.append((entry.text, random.choice(entry.meanings)))
+        return words
+
+    def close(self):
+        self.mm.close()
+
+    def __offset(self, idx):
+        offset, = CorpusFormat.offset.unpack_from(self.mm, self.index_offset + idx * CorpusFormat.offset.size)
+        return offset
@@ -0,0 +1,216 @@
+import argparse
+import concurrent.futures
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import tarfile
+import time
+
+from wordfreq import zipf_frequency
+
+from wordlist.Corpus import Corpus, CorpusWriter
+from wordlist.WiktionaryHtmlParser import WiktionaryHtmlParser, Word
+
+
+_parser = None
+
+
+def _init_worker(shortcuts):
+    global _parser
+    _parser = WiktionaryHtmlParser(shortcuts, fast=True)
+
+
+def _extract_batch(pages):
+    entries = []
+    for title, html in pages:
+        section = WiktionaryHtmlParser.language_section(html)
+        if section is None:
+            entries.append((title, None))
+            continue
+        try:
+            word = _parser.parse(section, title=title)
+        except Exception:
+            entries.append((title, None))
+            continue
+        if not word.meanings or word.get_pos() != Word.POS.Noun:
+            entries.append((title, None))
+            continue
+        entries.append((title, (word.get_pos().value, zipf_frequency(word.text, 'ru'), word.meanings)))
+    return entries
+
+
+class IngestStats(object):
+    def __init__(self):
+        self.started = time.monotonic()
+        self.pages = 0
+        self.skipped = 0
+        self.words = 0
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / max(time.monotonic() - self.started, 1e-9)
+
+    def __str__(self):
+        return f'{self.pages} pages parsed ({self.pages_per_sec:.1f} pages/sec), ' \
+               f'{self.skipped} unchanged pages skipped, {self.words} words extracted'
+
+
+class DumpIngester(object):
+    """Builds a word corpus from a Wiktionary HTML dump.
+
+    The dump is a Wikimedia Enterprise HTML dump: ndjson lines with `name`,
+    `version.identifier`, `namespace.identifier` and `article_body.html`,
+    either plain, gzipped or packed into a .tar.gz. Pages are streamed and
+    parsed in batches on a process pool with a bounded number of batches in
+    flight, so memory stays flat however large the dump is. Only the Russian
+    section of a page is parsed, and only nouns with meanings are kept, as
+    the Русские_существительные category lists.
+
+    Next to the corpus a `.seen` SQLite database remembers the revision of
+    every page processed; pages whose revision did not change are copied
+    from the previous corpus instead of being parsed again. It is looked up
+    and written page by page, so it doesn't grow the memory either.
+    """
+
+    def __init__(self, shortcuts, workers=None, batch_size=64, report_interval=10.):
+        self.shortcuts = shortcuts
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        self.logger = logging.getLogger(__name__)
+
+    def ingest(self, dump_path, corpus_path):
+        seen_path = f'{corpus_path}.seen'
+        seen = sqlite3.connect(seen_path) if os.path.isfile(corpus_path) and os.path.isfile(seen_path) else None
+        new_seen = self.__create_seen(f'{seen_path}.tmp')
+        stats = IngestStats()
+        last_report = stats.started
+
+        tmp_corpus_path = f'{corpus_path}.tmp'
+        with CorpusWriter(tmp_corpus_path) as writer, concurrent.futures.ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=(self.shortcuts,)) as pool:
+            in_flight = set()
+            batch = []
+            for title, revision, html in self.__read_pages(dump_path):
+                unchanged = seen is not None and self.__seen_revision(seen, title) == revision
+                new_seen.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', (title, revision, unchanged))
+                if unchanged:
+                    stats.skipped += 1
+                    continue
+                batch.append((title, html))
+                if len(batch) < self.batch_size:
+                    continue
+                in_flight.add(pool.submit(_extract_batch, batch))
+                batch = []
+                if len(in_flight) >= 2 * self.workers:
+                    done, in_flight = concurrent.futures.wait(
+                        in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    self.__write_results(writer, done, stats)
+                if time.monotonic() - last_report >= self.report_interval:
+                    last_report = time.monotonic()
+                    self.logger.info(stats)
+            if batch:
+                in_flight.add(pool.submit(_extract_batch, batch))
+            self.__write_results(writer, concurrent.futures.as_completed(in_flight), stats)
+
+            if seen is not None:
+                seen.close()
+                old_corpus = Corpus(corpus_path)
+                for entry in old_corpus:
+                    row = new_seen.execute('SELECT unchanged FROM pages WHERE title = ?', (entry.text,)).fetchone()
+                    if row is not None and row[0]:
+                        writer.add(entry.text, entry.pos, entry.zipf, entry.meanings)
+                        stats.words += 1
+                old_corpus.close()
+
+        new_seen.commit()
+        new_seen.close()
+        os.replace(tmp_corpus_path, corpus_path)
+        os.replace(f'{seen_path}.tmp', seen_path)
+        self.logger.info(stats)
+        return stats
+
+    @staticmethod
+    def __write_results(writer, futures, stats):
+        for future in futures:
+            for title, entry in future.result():
+                stats.pages += 1
+                if entry is None:
+                    continue
+                pos, zipf, meanings = entry
+                writer.add(title, Word.POS(pos), zipf, meanings)
+                stats.words += 1
+
+    @staticmethod
+    def __read_pages(dump_path):
+        for line in DumpIngester.__read_lines(dump_path):
+            page = json.loads(line)
+            if page.get('namespace', {}).get('identifier', 0) != 0:
+                continue
+            html = page.get('article_body', {}).get('html')
+            if not html:
+                continue
+            yield page['name'], str(page.get('version', {}).get('identifier', '')), html
+
+    @staticmethod
+    def __read_lines(dump_path):
+        if dump_path.endswith(('.tar.gz', '.tgz')):
+            with tarfile.open(dump_path, 'r|gz') as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    yield from tar.extractfile(member)
+        elif dump_path.endswith('.gz'):
+            with gzip.open(dump_path, 'rb') as f:
+                yield from f
+        else:
+            with open(dump_path, 'rb') as f:
+                yield from f
+
+    @staticmethod
+    def __create_seen(seen_path):
+        if os.path.exists(seen_path):
+            os.remove(seen_path)
+        seen = sqlite3.connect(seen_path)
+        # The file only replaces the previous one once it is complete, so it needs no journal
+        seen.execute('PRAGMA journal_mode=OFF')
+        seen.execute('PRAGMA synchronous=OFF')
+        seen.execute(
+            'CREATE TABLE pages (title TEXT PRIMARY KEY, revision TEXT NOT NULL, unchanged INTEGER NOT NULL) '
+            'WITHOUT ROWID'
+        )
+        return seen
+
+    @staticmethod
+    def __seen_revision(seen, title):
+        row = seen.execute('SELECT revision FROM pages WHERE title = ?', (title,)).fetchone()
+        return row[0] if row is not None else None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Build a word corpus from a Wiktionary HTML dump')
+    arg_parser.add_argument('dump', help='ndjson, ndjson.gz or tar.gz Wiktionary HTML dump')
+    arg_parser.add_argument('corpus', help='corpus file to create or refresh')
+    arg_parser.add_argument('--shortcuts', help='saved HTML of the Викисловарь:Условные_сокращения page')
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--batch-size', type=int, default=64)
+    args = arg_parser.parse_args()
+
+    if args.shortcuts is not None:
+        with open(args.shortcuts, encoding='utf8') as f:
+            shortcuts = WiktionaryHtmlParser(f.read()).shortcuts
+    else:
+        from wordlist.WiktionarySearcher import WiktionarySearcher
+        shortcuts = WiktionarySearcher().parser.shortcuts
+
+    DumpIngester(shortcuts, args.workers, args.batch_size).ingest(args.dump, args.corpus)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
+    )
+    main()
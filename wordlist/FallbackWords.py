@@ -0,0 +1,42 @@
+import csv
+import pathlib
+import random
+import threading
+
+from wordlist.FrequencyIndex import FrequencyIndex
+
+
+class FallbackWords(object):
+    """Words with meanings bundled with the package, to play with when Wiktionary can't be reached in time.
+
+    The file has a header and `word`, `zipf` and `meaning` columns, so loading it doesn't need wordfreq.
+    """
+    path = pathlib.Path(__file__).with_name('fallback_ru.tsv')
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        if path is not None:
+            self.path = path
+        with open(self.path, encoding='utf8', newline='') as f:
+            rows = list(csv.reader(f, delimiter='\t'))[1:]
+        self.words = [(word, meaning) for word, zipf, meaning in rows]
+        self.index = FrequencyIndex(list(range(len(rows))), [float(zipf) for word, zipf, meaning in rows])
+
+    @classmethod
+    def default(cls):
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    def sample(self, n, min_zipf, max_zipf):
+        """Returns `n` `(word, meaning)` pairs, from the band as far as it has enough words and then from the others"""
+        chosen = self.index.sample(n, min_zipf, max_zipf)
+        if len(chosen) < n:
+            in_band = set(chosen)
+            chosen += [idx for idx in self.index.sample(len(self.index)) if idx not in in_band][:n - len(chosen)]
+        if len(chosen) < n:
+            chosen += random.choices(range(len(self.words)), k=n - len(chosen))
+        return [self.words[idx] for idx in chosen]
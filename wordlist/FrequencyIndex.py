@@ -0,0 +1,62 @@
+import array
+import bisect
+import math
+import random
+
+
+class FrequencyIndex(object):
+    """Words sorted by their zipf frequency, so the words of a frequency band are a contiguous range found by
+    binary search.
+
+    Bands are `(min_zipf, max_zipf)` and hold the words with `min_zipf < zipf <= max_zipf`; `BANDS` names the
+    ones rooms choose from.
+    """
+    BANDS = {
+        'easy': (2.5, math.inf),
+        'medium': (1., 2.5),
+        'hard': (-math.inf, 1.),
+    }
+
+    def __init__(self, words, zipfs):
+        order = sorted(range(len(words)), key=zipfs.__getitem__)
+        self.words = [words[idx] for idx in order]
+        self.zipfs = array.array('d', (zipfs[idx] for idx in order))
+
+    @classmethod
+    def from_words(cls, words, lang='ru'):
+        """Looks every word up in one pass over the wordfreq list instead of calling `zipf_frequency` per word.
+
+        wordfreq keeps its list in buckets of one centibel, the n-th of them holding the words with zipf
+        `9 - n / 100`, which is what `zipf_frequency` returns for a single lowercase word. Words that are not in
+        the list get zipf 0.
+        """
+        from wordfreq import get_frequency_list
+        words = list(words)
+        wanted = {}
+        for idx, word in enumerate(words):
+            wanted.setdefault(word.lower(), []).append(idx)
+        zipfs = [0.] * len(words)
+        for bucket_idx, bucket in enumerate(get_frequency_list(lang)):
+            zipf = round(9 - bucket_idx / 100, 2)
+            for word in wanted.keys() & bucket:
+                for idx in wanted.pop(word):
+                    zipfs[idx] = zipf
+            if not wanted:
+                break
+        return cls(words, zipfs)
+
+    def __len__(self):
+        return len(self.words)
+
+    def range(self, min_zipf=-math.inf, max_zipf=math.inf):
+        """Returns the `(start, stop)` positions in `words` of the band"""
+        return bisect.bisect_right(self.zipfs, min_zipf), bisect.bisect_right(self.zipfs, max_zipf)
+
+    def count(self, min_zipf=-math.inf, max_zipf=math.inf):
+        start, stop = self.range(min_zipf, max_zipf)
+        return stop - start
+
+    def sample(self, n, min_zipf=-math.inf, max_zipf=math.inf):
+        """Returns `n` distinct words of the band, or all of them if it has fewer"""
+        start, stop = self.range(min_zipf, max_zipf)
+        return [self.words[idx] for idx in random.sample(range(start, stop), min(n, stop - start))]
@@ -1,23 +1,121 @@
+import concurrent.futures
+import itertools
+import logging
 import random
-from typing import List, Tuple
+import time
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 
-from wordfreq import zipf_frequency
+from wordlist.CircuitBreaker import CircuitOpenError
+from wordlist.Corpus import Corpus
+from wordlist.FallbackWords import FallbackWords
+from wordlist.FrequencyIndex import FrequencyIndex
 
-from wordlist.WiktionarySearcher import WiktionarySearcher
+# wordfreq, requests and bs4 take a good part of a second to import, so they are only imported when words are
+# generated, or by `warm_up`
+if TYPE_CHECKING:
+    from wordlist.WiktionarySearcher import WiktionarySearcher
 
+logger = logging.getLogger(__name__)
 
-def generate_wordlist(n: int) -> List[Tuple[str, str]]:
-    wiki = WiktionarySearcher()
+
+def warm_up(url: Optional[str] = None, cache_path: Optional[str] = None, sections: bool = False) -> None:
+    """Imports what generating words from Wiktionary needs and builds the frequency index of its nouns"""
+    from wordlist.WiktionarySearcher import WiktionarySearcher
+    WiktionarySearcher.shared(url, cache_path, sections).frequency_index()
+
+
+def _candidates(index: FrequencyIndex, min_zipf: float, max_zipf: float, batch: int = 64) -> Iterator[str]:
+    """Returns an endless iterator over words of the band in random order, which doesn't repeat a word within
+    `batch` words
+    """
+    if not index.count(min_zipf, max_zipf):
+        raise LookupError(f'No words with zipf frequency in ({min_zipf}, {max_zipf}]')
+    return itertools.chain.from_iterable(index.sample(batch, min_zipf, max_zipf) for _ in itertools.repeat(None))
+
+
+def _accept(wiki: 'WiktionarySearcher', word: str) -> Optional[Tuple[str, str]]:
+    meanings = wiki.search_meaning(word)
+    if not meanings:
+        return None
+    return word, random.choice(meanings)
+
+
+def _prepare(url: Optional[str], cache_path: Optional[str], sections: bool, min_zipf: float, max_zipf: float,
+             pool_size: int) -> Tuple['WiktionarySearcher', Iterator[str]]:
+    from wordlist.WiktionarySearcher import WiktionarySearcher
+    wiki = WiktionarySearcher.shared(url, cache_path, sections, pool_size)
+    return wiki, _candidates(wiki.frequency_index(), min_zipf, max_zipf)
+
+
+def _timeout(deadline: Optional[float], timeout: Optional[float] = None) -> Optional[float]:
+    if deadline is None:
+        return timeout
+    remaining = max(0., deadline - time.monotonic())
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _fetch(words: List[Tuple[str, str]], n: int, url: Optional[str], cache_path: Optional[str], sections: bool,
+           min_zipf: float, max_zipf: float, concurrency: int, deadline: Optional[float], hedge_delay: float) -> None:
+    """Appends words fetched from Wiktionary to `words` until it has `n` of them. Raises `TimeoutError` once
+    `deadline` passes and `CircuitOpenError` once the site is known to be failing
+    """
+    # Fetches are never waited for past the deadline: the ones still running finish in the background, bounded by
+    # the request timeouts
+    executor = concurrent.futures.ThreadPoolExecutor(2 * concurrency)
+    try:
+        prepared = executor.submit(_prepare, url, cache_path, sections, min_zipf, max_zipf, 2 * concurrency)
+        if not concurrent.futures.wait([prepared], _timeout(deadline)).done:
+            raise TimeoutError('Wiktionary searcher is not ready in time')
+        wiki, candidates = prepared.result()
+        in_flight = set()
+        while len(words) < n:
+            while len(in_flight) < min(concurrency, n - len(words)):
+                in_flight.add(executor.submit(_accept, wiki, next(candidates)))
+            done, in_flight = concurrent.futures.wait(
+                in_flight, _timeout(deadline, hedge_delay), concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f'Found {len(words)} of {n} words in time')
+                if len(in_flight) < 2 * concurrency:
+                    # Nothing came back for `hedge_delay`, so one more word is tried alongside the slow ones
+                    in_flight.add(executor.submit(_accept, wiki, next(candidates)))
+                continue
+            for future in done:
+                try:
+                    word = future.result()
+                except CircuitOpenError:
+                    raise
+                except Exception as e:
+                    logger.debug(f'Failed to fetch a word: {e!r}')
+                    continue
+                if word is not None and len(words) < n:
+                    words.append(word)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def generate_wordlist(n: int, corpus: Optional[Corpus] = None, concurrency: int = 1,
+                      url: Optional[str] = None, cache_path: Optional[str] = None,
+                      sections: bool = False, difficulty: str = 'hard', budget: Optional[float] = None,
+                      hedge_delay: float = 2., fallback: bool = False) -> List[Tuple[str, str]]:
+    """Returns `n` `(word, meaning)` pairs of words in the `difficulty` band of `FrequencyIndex.BANDS`.
+
+    Without a corpus words are fetched from Wiktionary `concurrency` at a time, and when none of the fetches comes
+    back for `hedge_delay` seconds another word is fetched alongside them, up to twice `concurrency`. Generation
+    stops after `budget` seconds, or at once when the circuit breaker of the site is open. The missing words are then
+    taken from `FallbackWords` if `fallback` is set, otherwise `TimeoutError` or `CircuitOpenError` is raised.
+    """
+    min_zipf, max_zipf = FrequencyIndex.BANDS[difficulty]
+    if corpus is not None:
+        return corpus.sample(n, min_zipf=min_zipf, max_zipf=max_zipf)
+    deadline = None if budget is None else time.monotonic() + budget
     words = []
-    while len(words) < n:
-        try:
-            word = wiki.generate_word()
-        except Exception as e:
-            continue
-        word, meanings = word.text, word.meanings
-        if not meanings:
-            continue
-        freq = zipf_frequency(word, 'ru')
-        if freq <= 1:
-            words.append((word, random.choice(meanings)))
+    try:
+        _fetch(words, n, url, cache_path, sections, min_zipf, max_zipf, concurrency, deadline, hedge_delay)
+    except Exception as e:
+        if not fallback:
+            raise
+        logger.warning(f'Taking {n - len(words)} of {n} words from the fallback list: {e!r}')
+        words.extend(FallbackWords.default().sample(n - len(words), min_zipf, max_zipf))
     return words
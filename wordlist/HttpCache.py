@@ -0,0 +1,149 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+
+class HttpCache(object):
+    """Disk cache of successful GET responses.
+
+    Entries younger than `ttl` seconds are served without touching the
+    network, older ones are revalidated with If-None-Match/If-Modified-Since.
+    The least recently used entries are evicted once the bodies take more
+    than `max_size` bytes. `get` requests the network with a `fetch` callable
+    that takes the arguments of `requests.get`.
+    """
+
+    def __init__(self, path, max_size=64 * 1024 * 1024, ttl=24 * 60 * 60):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        os.makedirs(path, exist_ok=True)
+        self.__load()
+
+    def get(self, fetch, url, **kwargs):
+        key = hashlib.sha1(url.encode('utf8')).hexdigest()
+        with self.lock:
+            meta = self.entries.get(key)
+            if meta is not None:
+                self.entries.move_to_end(key)
+        if meta is not None and time.time() - meta['validated'] < self.ttl:
+            body = self.__read_body(key)
+            if body is not None:
+                self.__touch(key)
+                return self.__response(url, meta, body)
+
+        headers = dict(kwargs.pop('headers', {}))
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        r = fetch(url, headers=headers, **kwargs)
+
+        if r.status_code == requests.codes.not_modified and meta is not None:
+            body = self.__read_body(key)
+            if body is not None:
+                meta['validated'] = time.time()
+                self.__write_meta(key, meta)
+                return self.__response(url, meta, body)
+            r = fetch(url, **kwargs)
+        if r.status_code == requests.codes.ok and 'no-store' not in r.headers.get('Cache-Control', ''):
+            self.__store(key, url, r)
+        return r
+
+    def __store(self, key, url, r):
+        body = r.content
+        meta = {
+            'url': url,
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'encoding': r.encoding,
+            'validated': time.time(),
+            'size': len(body),
+        }
+        tmp_path = self.__file(key, 'body.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, self.__file(key, 'body'))
+        self.__write_meta(key, meta)
+        with self.lock:
+            old_meta = self.entries.pop(key, None)
+            if old_meta is not None:
+                self.size -= old_meta['size']
+            self.entries[key] = meta
+            self.size += meta['size']
+            evicted = []
+            while self.size > self.max_size and len(self.entries) > 1:
+                evicted_key, evicted_meta = self.entries.popitem(last=False)
+                self.size -= evicted_meta['size']
+                evicted.append(evicted_key)
+        for evicted_key in evicted:
+            self.__remove(evicted_key)
+
+    def __touch(self, key):
+        try:
+            os.utime(self.__file(key, 'meta'))
+        except OSError:
+            pass
+
+    def __load(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.meta'):
+                continue
+            key = name[:-len('.meta')]
+            try:
+                with open(self.__file(key, 'meta'), encoding='utf8') as f:
+                    meta = json.load(f)
+                used = os.path.getmtime(self.__file(key, 'meta'))
+            except (OSError, ValueError):
+                continue
+            entries.append((used, key, meta))
+        for used, key, meta in sorted(entries, key=lambda entry: entry[0]):
+            self.entries[key] = meta
+            self.size += meta['size']
+        # The cache may have been left larger by a run with a larger `max_size`
+        while self.size > self.max_size and len(self.entries) > 1:
+            evicted_key, evicted_meta = self.entries.popitem(last=False)
+            self.size -= evicted_meta['size']
+            self.__remove(evicted_key)
+
+    def __read_body(self, key):
+        try:
+            with open(self.__file(key, 'body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def __write_meta(self, key, meta):
+        tmp_path = self.__file(key, 'meta.tmp')
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.__file(key, 'meta'))
+
+    def __remove(self, key):
+        for suffix in ('meta', 'body'):
+            try:
+                os.remove(self.__file(key, suffix))
+            except OSError:
+                pass
+
+    def __file(self, key, suffix):
+        return os.path.join(self.path, f'{key}.{suffix}')
+
+    @staticmethod
+    def __response(url, meta, body):
+        r = requests.Response()
+        r.status_code = requests.codes.ok
+        r.url = url
+        r.encoding = meta['encoding']
+        r._content = body
+        return r
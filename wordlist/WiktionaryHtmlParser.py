@@ -1,56 +1,140 @@
-from enum import Enum
+import re
 import string
 
 import bs4
 
-
-class Word(object):
-    class POS(Enum):
-        Noun = 1
-        Adj = 2
-        Verb = 3
-        Other = 4
-
-    def __init__(self, text=None, grammar=None, meanings=None):
-        self.text = text
-        self.grammar = grammar
-        self.meanings = meanings
-
-    def get_pos(self):
-        if 'существительное' in self.grammar:
-            return Word.POS.Noun
-        elif 'прилагательное' in self.grammar:
-            return Word.POS.Adj
-        elif 'глагол' in self.grammar:
-            return Word.POS.Verb
-        else:
-            return Word.POS.Other
+from wordlist.Word import Word
 
 
 class WiktionaryHtmlParser(object):
-    def __init__(self, shortcuts=None):
+    """Extracts a `Word` from a rendered Wiktionary page.
+
+    In fast mode only the page heading, the morphology heading and the first
+    list after the semantics heading are cut out of the page and parsed, which
+    is several times faster than building a tree of the whole page. Pages the
+    fast path can't slice are parsed in full.
+
+    The grammar of a word is the text of its morphology section, from its
+    heading to the next one.
+    """
+    ol_start = re.compile(r'<ol[\s>]')
+    heading_start = re.compile(r'<h([1-6])[\s>]', re.IGNORECASE)
+    heading_name = re.compile(r'^h[1-6]$')
+
+    def __init__(self, shortcuts=None, fast=False):
         self.shortcuts = self.__parse_shortcuts(shortcuts)
+        self.fast = fast
+
+    def parse_meanings(self, html_doc):
+        """Returns the meanings listed in a fragment holding just the meanings section"""
+        meanings = bs4.BeautifulSoup(html_doc, 'html.parser').find('ol')
+        return self.__parse_list(meanings) if meanings is not None else []
 
-    def parse(self, html_doc):
+    def parse(self, html_doc, title=None):
+        if self.fast:
+            word = self.__parse_fast(html_doc, title)
+            if word is not None:
+                return word
         soup = bs4.BeautifulSoup(html_doc, 'html.parser')
-        word = soup.find('h1', id='firstHeading').get_text()
+        if title is None:
+            word = soup.find('h1', id='firstHeading').get_text()
+        else:
+            word = title
         grammar = self.__fetch_grammar(soup)
         meanings = self.__fetch_meanings(soup)
         return Word(word, grammar, meanings)
 
+    @staticmethod
+    def language_section(html_doc, language='Русский'):
+        """Cuts the section of `language` out of a page, or returns None if the page has none"""
+        id_start = html_doc.find(f' id="{language}"')
+        if id_start == -1:
+            return None
+        start = html_doc.rfind('<h1', 0, id_start)
+        if start == -1:
+            return None
+        end_match = re.compile(r'<h1[\s>]', re.IGNORECASE).search(html_doc, id_start)
+        return html_doc[start:end_match.start() if end_match is not None else len(html_doc)]
+
     def __fetch_grammar(self, soup):
         morphology = soup.find(id='Морфологические_и_синтаксические_свойства')
-        grammar = morphology.get_text() #.find_next('p').find_next('p')
-        return grammar
+        heading = morphology if self.heading_name.match(morphology.name) else \
+            morphology.find_parent(self.heading_name) or morphology
+        strings = []
+        for element in heading.next_elements:
+            if isinstance(element, bs4.Tag) and self.heading_name.match(element.name):
+                break
+            if isinstance(element, bs4.NavigableString) and not isinstance(element, bs4.Comment):
+                strings.append(str(element))
+        return self.__normalize_space(''.join(strings))
 
     def __fetch_meanings(self, soup):
         semantics = soup.find(id='Семантические_свойства')
         meanings = self.__parse_list(semantics.find_next('ol'))
         return meanings
 
+    def __parse_fast(self, html_doc, title):
+        if title is None:
+            heading = self.__slice_element(html_doc, 'firstHeading', 'h1')
+            if heading is None:
+                return None
+            title = bs4.BeautifulSoup(heading, 'html.parser').find('h1').get_text()
+        morphology = self.__slice_section(html_doc, 'Морфологические_и_синтаксические_свойства')
+        semantics_start = html_doc.find(' id="Семантические_свойства"')
+        if morphology is None or semantics_start == -1:
+            return None
+        ol_match = self.ol_start.search(html_doc, semantics_start)
+        if ol_match is None:
+            return None
+        meanings = self.__slice_element(html_doc, None, 'ol', ol_match.start())
+        if meanings is None:
+            return None
+        grammar = self.__normalize_space(bs4.BeautifulSoup(morphology, 'html.parser').get_text())
+        meanings = self.__parse_list(bs4.BeautifulSoup(meanings, 'html.parser').find('ol'))
+        return Word(title, grammar, meanings)
+
+    def __slice_section(self, html_doc, element_id):
+        """Slices from the heading with `element_id` up to the next heading"""
+        id_start = html_doc.find(f' id="{element_id}"')
+        if id_start == -1:
+            return None
+        start = html_doc.rfind('<', 0, id_start)
+        if self.heading_start.match(html_doc, start) is None:
+            return None
+        heading = self.__slice_element(html_doc, None, None, start)
+        if heading is None:
+            return None
+        end_match = self.heading_start.search(html_doc, start + len(heading))
+        return html_doc[start:end_match.start() if end_match is not None else len(html_doc)]
+
+    @staticmethod
+    def __normalize_space(text):
+        return ' '.join(text.split())
+
+    @staticmethod
+    def __slice_element(html_doc, element_id, tag_name=None, start=None):
+        if start is None:
+            id_start = html_doc.find(f' id="{element_id}"')
+            if id_start == -1:
+                return None
+            start = html_doc.rfind('<', 0, id_start)
+        name_match = re.match(r'<([a-zA-Z][a-zA-Z0-9]*)', html_doc[start:start + 16])
+        if name_match is None or tag_name is not None and name_match.group(1).lower() != tag_name:
+            return None
+        name = name_match.group(1).lower()
+        depth = 0
+        for tag in re.compile(rf'<(/?){name}[\s>/]', re.IGNORECASE).finditer(html_doc, start):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                end = html_doc.find('>', tag.end() - 1)
+                return html_doc[start:end + 1] if end != -1 else None
+        return None
+
     def __parse_shortcuts(self, html_doc):
         if html_doc is None:
             return dict()
+        if isinstance(html_doc, dict):
+            return dict(html_doc)
         soup = bs4.BeautifulSoup(html_doc, 'html.parser')
         items = soup.find_all('li')
         shortcuts = {}
@@ -1,22 +1,106 @@
+import collections
+import json
 import logging
+import os
 import random
+import threading
+import time
 
 import requests
 import urllib
+from urllib3.util.request import ACCEPT_ENCODING
 
+from wordlist.CircuitBreaker import CircuitBreaker
+from wordlist.FrequencyIndex import FrequencyIndex
+from wordlist.HttpCache import HttpCache
 from wordlist.WiktionaryHtmlParser import WiktionaryHtmlParser
 
 
 class WiktionarySearcher(object):
+    """Fetches words from Wiktionary.
+
+    By default whole article pages are downloaded. With `sections=True` the
+    section list of a word is requested through the MediaWiki parse API, and
+    then only the sections needed: the meanings for `search_meaning`, the
+    morphology and semantics for `generate_word`. The section lists of the
+    last `section_index_size` words are kept, so a word seen before costs a
+    single request.
+
+    `frequency_index` lists the nouns category once and indexes its titles by
+    frequency, so words of a given frequency band are picked before anything
+    about them is fetched.
+
+    Every request gives up after `timeout` (connect, read) seconds and goes
+    through a circuit breaker shared by the searchers of the same site, so
+    once it keeps failing requests fail at once with `CircuitOpenError`.
+    Server errors and 429 responses count as failures.
+    """
     url = 'https://ru.wiktionary.org/wiki/'
+    shortcuts_ttl = 7 * 24 * 60 * 60
+    nouns_category = 'Категория:Русские_существительные'
+    section_anchors = ('Морфологические_и_синтаксические_свойства', 'Семантические_свойства')
+    meaning_anchors = ('Значение', 'Семантические_свойства')
+    section_index_size = 10000
 
-    def __init__(self):
-        self.parser = WiktionaryHtmlParser(self.__fetch_shortcuts())
+    __shared = {}
+    __shared_lock = threading.Lock()
+    __breakers = {}
+    __breakers_lock = threading.Lock()
+
+    def __init__(self, url=None, pool_size=10, cache_path=None, sections=False, timeout=(3.05, 10.)):
+        if url is not None:
+            self.url = url
+        self.timeout = timeout
+        with self.__breakers_lock:
+            # Kept apart from the searchers, which are not created while the site is down
+            self.breaker = self.__breakers.setdefault(self.url, CircuitBreaker(self.url))
+        self.api_url = self.url.replace('/wiki/', '/w/api.php')
+        self.sections = sections
         self.logger = logging.getLogger(__name__)
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.pool_size = 0
+        self.grow_pool(pool_size)
+        self.cache_path = cache_path
+        self.cache = HttpCache(os.path.join(cache_path, 'http')) if cache_path is not None else None
+        self.parser = WiktionaryHtmlParser(self.__load_shortcuts(), fast=True)
+        self.__frequency_index = None
+        self.__frequency_index_lock = threading.Lock()
+        self.__section_indexes = collections.OrderedDict()
+        self.__section_indexes_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url=None, cache_path=None, sections=False, pool_size=10):
+        """Returns a process-wide searcher, so the shortcuts page is fetched and parsed only once.
+
+        Its connection pool is grown to `pool_size` if it is smaller, so no caller's requests queue for a connection.
+        """
+        key = (url, cache_path, sections)
+        with cls.__shared_lock:
+            if key not in cls.__shared:
+                cls.__shared[key] = cls(url, pool_size=pool_size, cache_path=cache_path, sections=sections)
+            else:
+                cls.__shared[key].grow_pool(pool_size)
+            return cls.__shared[key]
+
+    def grow_pool(self, pool_size):
+        """Keeps up to `pool_size` connections to the site open, unless the pool is larger already"""
+        if pool_size <= self.pool_size:
+            return
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_size = pool_size
 
     def search_meaning(self, word):
+        if self.sections:
+            try:
+                return self.__fetch_meanings(word)
+            except LookupError:
+                self.logger.warning(f'Coudn\'t find meaning for word {word}')
+                return
         encoded_word = urllib.parse.quote_plus(word)
-        r = requests.get(WiktionarySearcher.url + encoded_word)
+        r = self.__get(self.url + encoded_word, cached=True)
         if r.status_code == requests.codes.not_found:
             self.logger.warning(f'Coudn\'t find meaning for word {word}')
             return
@@ -25,6 +109,12 @@ class WiktionarySearcher(object):
             return
         return self.parser.parse(r.text).meanings
 
+    def frequency_index(self):
+        with self.__frequency_index_lock:
+            if self.__frequency_index is None:
+                self.__frequency_index = FrequencyIndex.from_words(self.__load_cached('nouns.json', self.__fetch_nouns))
+            return self.__frequency_index
+
     def generate_word(self):
         pos = random.choice([
             'Русские_существительные',
@@ -32,19 +122,126 @@ class WiktionarySearcher(object):
             # 'Русские_глаголы',
             # 'Русские_наречия',
         ])
-        url = WiktionarySearcher.url + urllib.parse.quote_plus(f'Служебная:RandomInCategory/{pos}')
-        r = requests.get(url)
+        url = self.url + urllib.parse.quote_plus(f'Служебная:RandomInCategory/{pos}')
+        if self.sections:
+            r = self.__get(url, allow_redirects=False)
+            if not r.is_redirect:
+                r.raise_for_status()
+                raise LookupError(f'{url} did not redirect to a word')
+            title = urllib.parse.urlsplit(r.headers['Location']).path.split('/wiki/', 1)[-1]
+            return self.__fetch_sections(urllib.parse.unquote(title))
+        r = self.__get(url)
         if r.status_code != requests.codes.ok:
             r.raise_for_status()
             return
         word = self.parser.parse(r.text)
         return word
 
+    def __fetch_meanings(self, title):
+        title, indexes = self.__section_index(title)
+        anchor = next((anchor for anchor in self.meaning_anchors if anchor in indexes), None)
+        if anchor is None:
+            raise LookupError(f'{title} has no semantics section')
+        return self.parser.parse_meanings(self.__section_text(title, indexes[anchor]))
+
+    def __fetch_sections(self, title):
+        title, indexes = self.__section_index(title)
+        if any(anchor not in indexes for anchor in self.section_anchors):
+            raise LookupError(f'{title} has no morphology or semantics section')
+        fragments = [self.__section_text(title, indexes[anchor]) for anchor in self.section_anchors]
+        return self.parser.parse(''.join(fragments), title=title)
+
+    def __section_index(self, title):
+        """Returns the normalized title of a page and the index of each of its sections by anchor"""
+        with self.__section_indexes_lock:
+            section_index = self.__section_indexes.get(title)
+            if section_index is not None:
+                self.__section_indexes.move_to_end(title)
+                return section_index
+        page = self.__parse_api(page=title, prop='sections')
+        indexes = {}
+        for section in page['sections']:
+            indexes.setdefault(section['anchor'], section['index'])
+        section_index = page['title'], indexes
+        with self.__section_indexes_lock:
+            self.__section_indexes[title] = section_index
+            if len(self.__section_indexes) > self.section_index_size:
+                self.__section_indexes.popitem(last=False)
+        return section_index
+
+    def __section_text(self, title, index):
+        return self.__parse_api(page=title, prop='text', section=index, disableeditsection=1, disabletoc=1)['text']
+
+    def __parse_api(self, **params):
+        params.update(action='parse', format='json', formatversion=2)
+        r = self.__get(f'{self.api_url}?{urllib.parse.urlencode(params)}', cached=True)
+        r.raise_for_status()
+        response = r.json()
+        if 'error' in response:
+            raise LookupError(response['error'].get('info'))
+        return response['parse']
+
+    def __get(self, url, cached=False, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if cached and self.cache is not None:
+            return self.cache.get(self.__request, url, **kwargs)
+        return self.__request(url, **kwargs)
+
+    def __request(self, url, **kwargs):
+        # Only requests that reach the site go through the breaker, cache hits say nothing about it
+        self.breaker.check()
+        try:
+            r = self.session.get(url, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if r.status_code >= 500 or r.status_code == requests.codes.too_many_requests:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return r
+
+    def __load_shortcuts(self):
+        if self.cache_path is None:
+            return self.__fetch_shortcuts()
+        return self.__load_cached('shortcuts.json', lambda: WiktionaryHtmlParser(self.__fetch_shortcuts()).shortcuts)
+
+    def __load_cached(self, filename, fetch):
+        """Returns what `fetch` returns, kept as JSON in `cache_path` for `shortcuts_ttl` seconds"""
+        if self.cache_path is None:
+            return fetch()
+        path = os.path.join(self.cache_path, filename)
+        try:
+            if time.time() - os.path.getmtime(path) < self.shortcuts_ttl:
+                with open(path, encoding='utf8') as f:
+                    return json.load(f)
+        except (OSError, ValueError):
+            pass
+        value = fetch()
+        with open(f'{path}.tmp', 'w', encoding='utf8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+        return value
+
+    def __fetch_nouns(self):
+        params = dict(
+            action='query', list='categorymembers', cmtitle=self.nouns_category, cmnamespace=0, cmprop='title',
+            cmlimit='max', format='json', formatversion=2,
+        )
+        titles = []
+        while True:
+            r = self.__get(f'{self.api_url}?{urllib.parse.urlencode(params)}')
+            r.raise_for_status()
+            response = r.json()
+            titles.extend(member['title'] for member in response['query']['categorymembers'])
+            if 'continue' not in response:
+                return titles
+            params.update(response['continue'])
+
     def __fetch_shortcuts(self):
-        url = WiktionarySearcher.url + urllib.parse.quote_plus('Викисловарь:Условные_сокращения')
-        r = requests.get(url)
+        url = self.url + urllib.parse.quote_plus('Викисловарь:Условные_сокращения')
+        r = self.__get(url, cached=True)
         if r.status_code != requests.codes.ok:
             r.raise_for_status()
             return
         return r.text
-
@@ -0,0 +1,25 @@
+from enum import Enum
+
+
+class Word(object):
+    class POS(Enum):
+        Noun = 1
+        Adj = 2
+        Verb = 3
+        Other = 4
+
+    def __init__(self, text=None, grammar=None, meanings=None):
+        self.text = text
+        self.grammar = grammar
+        self.meanings = meanings
+
+    def get_pos(self):
+        grammar = self.grammar.lower()
+        if 'существительное' in grammar:
+            return Word.POS.Noun
+        elif 'прилагательное' in grammar:
+            return Word.POS.Adj
+        elif 'глагол' in grammar:
+            return Word.POS.Verb
+        else:
+            return Word.POS.Other
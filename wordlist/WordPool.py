@@ -0,0 +1,121 @@
+import collections
+import logging
+import threading
+
+
+class WordPool(object):
+    """Bounded pool of ready `(word, meaning)` pairs.
+
+    A background thread calls `source(n)` to top the pool up to
+    `high_watermark` every time it drops below `low_watermark`, so `take`
+    normally returns without touching the network. Words already given to a
+    key (a room) are not given to it again among its last `history_size` words,
+    until the key is forgotten. When the pool runs dry `take` generates the
+    missing words with `in_place_source`, `source` by default, which can be
+    one that is bounded in time. If that only gives words the key has had
+    already, they are given again rather than waiting for new ones.
+    """
+
+    def __init__(self, source, low_watermark=16, high_watermark=64, refill_batch=4, history_size=1000,
+                 retry_delay=5., in_place_source=None):
+        assert 0 <= low_watermark < high_watermark
+        self.source = source
+        self.in_place_source = in_place_source or source
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.refill_batch = refill_batch
+        self.history_size = history_size
+        self.retry_delay = retry_delay
+        self.words = collections.deque()
+        self.history = collections.defaultdict(collections.OrderedDict)
+        self.condition = threading.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.thread = None
+        self.stopped = False
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        """Starts filling the pool in the background, unless it has been started already"""
+        with self.condition:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.__run, name='WordPool', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def take(self, n, key=None):
+        words = []
+        with self.condition:
+            history = self.history[key]
+            skipped = []
+            while len(words) < n and self.words:
+                word = self.words.popleft()
+                if word[0] in history:
+                    skipped.append(word)
+                    continue
+                self.__remember(history, word)
+                words.append(word)
+            self.words.extend(skipped)
+            self.hits += len(words)
+            self.misses += n - len(words)
+            if len(self.words) < self.low_watermark:
+                self.condition.notify()
+
+        while len(words) < n:
+            self.logger.info(f'Word pool is empty, generating {n - len(words)} words in place')
+            generated = list(self.in_place_source(n - len(words)))
+            new_words = []
+            with self.condition:
+                for word in generated:
+                    if word[0] not in history:
+                        self.__remember(history, word)
+                        new_words.append(word)
+            if not new_words:
+                self.logger.warning(f'No new words for {key} generated in place, giving repeated ones')
+                new_words = generated[:n - len(words)]
+            words.extend(new_words)
+        return words
+
+    def forget(self, key):
+        """Drops the words given to `key`, once it won't take any more"""
+        with self.condition:
+            self.history.pop(key, None)
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {'size': len(self.words), 'hits': self.hits, 'misses': self.misses}
+
+    def __remember(self, history, word):
+        history[word[0]] = None
+        if len(history) > self.history_size:
+            history.popitem(last=False)
+
+    def __run(self):
+        while True:
+            with self.condition:
+                while not self.stopped and len(self.words) >= self.low_watermark:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                missing = self.high_watermark - len(self.words)
+            while missing > 0:
+                try:
+                    words = self.source(min(missing, self.refill_batch))
+                except Exception:
+                    self.logger.exception('Failed to generate words for the pool')
+                    with self.condition:
+                        if self.condition.wait_for(lambda: self.stopped, self.retry_delay):
+                            return
+                    continue
+                with self.condition:
+                    self.words.extend(words)
+                    missing = self.high_watermark - len(self.words)
+            self.logger.info(f'Word pool refilled: {self.stats}')
@@ -1 +1,4 @@
-from .Generator import generate_wordlist
\ No newline at end of file
+from .Corpus import Corpus, CorpusWriter
+from .FrequencyIndex import FrequencyIndex
+from .Generator import generate_wordlist, warm_up
+from .WordPool import WordPool
\ No newline at end of file
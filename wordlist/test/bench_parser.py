@@ -0,0 +1,25 @@
+import pathlib
+import sys
+import timeit
+import tracemalloc
+
+from wordlist.WiktionaryHtmlParser import WiktionaryHtmlParser
+
+
+def measure(parser, pages):
+    seconds = timeit.timeit(lambda: [parser.parse(page) for page in pages], number=20) / 20 / len(pages)
+    tracemalloc.start()
+    for page in pages:
+        parser.parse(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+if __name__ == '__main__':
+    pages_path = pathlib.Path(sys.argv[1] if len(sys.argv) > 1 else pathlib.Path(__file__).parent / 'pages')
+    pages = [path.read_text(encoding='utf8') for path in pages_path.glob('*.html') if ':' not in path.stem]
+
+    for name, parser in [('full', WiktionaryHtmlParser()), ('fast', WiktionaryHtmlParser(fast=True))]:
+        seconds, peak = measure(parser, pages)
+        print(f'{name}: {seconds * 1e3:.2f} ms/page, peak {peak / 1024:.0f} KiB')
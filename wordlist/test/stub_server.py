@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import http.server
+import json
+import pathlib
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+
+PAGES_PATH = pathlib.Path(__file__).parent / 'pages'
+
+
+class StubWiktionary(object):
+    """Local stand-in for ru.wiktionary.org serving the recorded pages from `pages/`.
+
+    Besides /wiki/ pages it answers the parse API (`prop=sections` and
+    `prop=text&section=N`), lists the recorded words as category members
+    `category_page_size` at a time, redirects Служебная:RandomInCategory to a
+    random recorded word and gzips responses when asked to.
+
+    Faults are injected by setting `status`, which every request is then
+    answered with, and `stalls`, seconds to hold the requests for a title
+    before answering.
+
+    `revalidations` lists the title and status of every request that came
+    with If-None-Match.
+    """
+    category_page_size = 2
+    heading = re.compile(r'<div class="mw-heading mw-heading(\d)"><h\d id="([^"]+)">(.*?)</h\d></div>')
+
+    def __init__(self, delay=0.):
+        self.delay = delay
+        self.status = None
+        self.stalls = {}
+        self.pages = {
+            path.stem: path.read_bytes() for path in PAGES_PATH.glob('*.html')
+        }
+        self.words = [title for title in self.pages if ':' not in title]
+        self.lock = threading.Lock()
+        self.requests = []
+        self.revalidations = []
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.clients = set()
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.__make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_port}/wiki/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, path, query):
+        if path == '/w/api.php':
+            return self.respond_api(query)
+        title = urllib.parse.unquote_plus(path[len('/wiki/'):])
+        if title.startswith('Служебная:RandomInCategory/'):
+            location = '/wiki/' + urllib.parse.quote(random.choice(self.words))
+            return 302, {'Location': location}, b''
+        if title not in self.pages:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'text/html; charset=UTF-8'}, self.pages[title]
+
+    def respond_api(self, query):
+        if query.get('list') == 'categorymembers':
+            return self.respond_category(query)
+        page = self.pages.get(query['page'])
+        if page is None:
+            body = {'error': {'code': 'missingtitle', 'info': "The page you specified doesn't exist."}}
+        else:
+            sections = self.sections(page.decode('utf8'))
+            if query['prop'] == 'sections':
+                body = {'parse': {'title': query['page'], 'sections': [
+                    {'index': str(idx + 1), 'level': str(level), 'line': line, 'anchor': anchor}
+                    for idx, (level, anchor, line, text) in enumerate(sections)
+                ]}}
+            else:
+                body = {'parse': {'title': query['page'], 'text': sections[int(query['section']) - 1][3]}}
+        # Like the API with formatversion=2, text is sent as UTF-8 rather than escaped
+        body = json.dumps(body, ensure_ascii=False).encode('utf8')
+        return 200, {'Content-Type': 'application/json; charset=utf-8'}, body
+
+    def respond_category(self, query):
+        offset = int(query.get('cmcontinue', 0))
+        body = {'query': {'categorymembers': [
+            {'ns': 0, 'title': title} for title in self.words[offset:offset + self.category_page_size]
+        ]}}
+        if offset + self.category_page_size < len(self.words):
+            body['continue'] = {'cmcontinue': str(offset + self.category_page_size), 'continue': '-||'}
+        return 200, {'Content-Type': 'application/json; charset=utf-8'}, json.dumps(body).encode('utf8')
+
+    def sections(self, html_doc):
+        content_end = html_doc.rfind('</div></div></div></div>')
+        headings = list(self.heading.finditer(html_doc, 0, content_end))
+        sections = []
+        for idx, heading in enumerate(headings):
+            level = int(heading.group(1))
+            end = next((
+                next_heading.start() for next_heading in headings[idx + 1:] if int(next_heading.group(1)) <= level
+            ), content_end)
+            sections.append((level, heading.group(2), heading.group(3), html_doc[heading.start():end]))
+        return sections
+
+    def __make_handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                title = (
+                    query.get('page', query.get('cmtitle', '')) if url.path == '/w/api.php' else
+                    urllib.parse.unquote_plus(url.path[len('/wiki/'):])
+                )
+                with stub.lock:
+                    stub.requests.append(title)
+                    stub.clients.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay + stub.stalls.get(title, 0.))
+                    if stub.status is not None:
+                        status, headers, body = stub.status, {}, b''
+                    else:
+                        status, headers, body = stub.respond(url.path, query)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+                if status == 200:
+                    headers['ETag'] = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if headers['ETag'] == self.headers.get('If-None-Match'):
+                        status, body = 304, b''
+                if 'If-None-Match' in self.headers:
+                    with stub.lock:
+                        stub.revalidations.append((title, status))
+                if 'gzip' in self.headers.get('Accept-Encoding', '') and body:
+                    headers['Content-Encoding'] = 'gzip'
+                    body = gzip.compress(body)
+                with stub.lock:
+                    stub.bytes_sent += len(body)
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # The client gave up on a stalled request
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,74 @@
+import time
+
+from wordlist.HttpCache import HttpCache
+from wordlist.WiktionarySearcher import WiktionarySearcher
+
+from stub_server import StubWiktionary
+
+
+def test_shared_searcher_is_reused():
+    with StubWiktionary() as stub:
+        assert WiktionarySearcher.shared(stub.url) is WiktionarySearcher.shared(stub.url)
+        assert stub.requests == ['Викисловарь:Условные_сокращения']
+
+
+def test_warm_restart_makes_no_requests(tmp_path):
+    with StubWiktionary() as stub:
+        meanings = WiktionarySearcher(stub.url, cache_path=str(tmp_path)).search_meaning('кичкинка')
+        assert len(stub.requests) == 2
+
+        searcher = WiktionarySearcher(stub.url, cache_path=str(tmp_path))
+        assert searcher.search_meaning('кичкинка') == meanings
+        assert searcher.parser.shortcuts
+        assert len(stub.requests) == 2
+
+
+def test_stale_entries_are_revalidated(tmp_path):
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher(stub.url, cache_path=str(tmp_path))
+        searcher.cache.ttl = 0
+        meanings = searcher.search_meaning('кичкинка')
+        assert searcher.search_meaning('кичкинка') == meanings
+        assert stub.requests[-2:] == ['кичкинка', 'кичкинка']
+        assert stub.revalidations == [('кичкинка', 304)]
+
+
+def test_lru_eviction(tmp_path):
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher(stub.url)
+        page_size = len(stub.pages['кичкинка'])
+        cache = HttpCache(str(tmp_path), max_size=2 * page_size + page_size // 2)
+        for word in ('кичкинка', 'гяповать', 'кичкинка', 'цвелый'):
+            cache.get(searcher.session.get, stub.url + word)
+            time.sleep(0.01)
+        requests_before = len(stub.requests)
+
+        cache = HttpCache(str(tmp_path), max_size=cache.max_size)
+        cache.get(searcher.session.get, stub.url + 'кичкинка')
+        assert len(stub.requests) == requests_before
+        cache.get(searcher.session.get, stub.url + 'гяповать')
+        assert len(stub.requests) == requests_before + 1
+
+
+def test_loading_trims_to_max_size(tmp_path):
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher(stub.url)
+        for word in ('кичкинка', 'гяповать', 'цвелый'):
+            HttpCache(str(tmp_path)).get(searcher.session.get, stub.url + word)
+            time.sleep(0.01)
+        page_size = len(stub.pages['кичкинка'])
+        cache = HttpCache(str(tmp_path), max_size=page_size + page_size // 2)
+        assert cache.size <= cache.max_size
+        assert len(list(tmp_path.glob('*.body'))) == 1
+        requests_before = len(stub.requests)
+        cache.get(searcher.session.get, stub.url + 'цвелый')
+        assert len(stub.requests) == requests_before
+
+
+def test_shared_searcher_grows_its_pool():
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher.shared(stub.url, pool_size=2)
+        assert WiktionarySearcher.shared(stub.url, pool_size=32) is searcher
+        assert searcher.session.get_adapter(stub.url)._pool_maxsize == 32
+        WiktionarySearcher.shared(stub.url, pool_size=4)
+        assert searcher.pool_size == 32
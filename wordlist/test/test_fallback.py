@@ -0,0 +1,118 @@
+import time
+
+import pytest
+import requests
+
+from wordlist.CircuitBreaker import CircuitBreaker, CircuitOpenError
+from wordlist.FallbackWords import FallbackWords
+from wordlist.FrequencyIndex import FrequencyIndex
+from wordlist.Generator import generate_wordlist
+from wordlist.WiktionarySearcher import WiktionarySearcher
+
+from stub_server import StubWiktionary
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_and_probes():
+    clock = Clock()
+    breaker = CircuitBreaker('site', failure_threshold=2, reset_timeout=10., clock=clock)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock.now = 10.
+    breaker.check()
+    # Only one call probes the site at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 20.
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_fallback_words_prefer_the_band():
+    words = FallbackWords()
+    min_zipf, max_zipf = FrequencyIndex.BANDS['easy']
+    easy = words.index.count(min_zipf, max_zipf)
+    sample = words.sample(easy + 2, min_zipf, max_zipf)
+    assert len(sample) == len(set(sample)) == easy + 2
+    assert len(words.sample(len(words.words) + 1, min_zipf, max_zipf)) == len(words.words) + 1
+
+
+def test_generation_falls_back_when_wiktionary_is_down():
+    with StubWiktionary() as stub:
+        stub.status = 503
+        with pytest.raises(requests.HTTPError):
+            generate_wordlist(2, url=stub.url)
+        started = time.monotonic()
+        words = generate_wordlist(4, url=stub.url, budget=1., fallback=True)
+        assert time.monotonic() - started < 1.5
+        assert len(words) == 4
+        assert set(words) <= set(FallbackWords.default().words)
+
+        # Every attempt fails on the first request, until the circuit opens
+        with pytest.raises(CircuitOpenError):
+            for _ in range(10):
+                with pytest.raises(requests.HTTPError):
+                    generate_wordlist(1, url=stub.url)
+        requests_made = len(stub.requests)
+        with pytest.raises(CircuitOpenError):
+            generate_wordlist(1, url=stub.url)
+        assert len(stub.requests) == requests_made
+
+
+def test_generation_stops_at_the_budget():
+    with StubWiktionary() as stub:
+        stub.stalls = {word: 2. for word in stub.words}
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            generate_wordlist(1, url=stub.url, budget=0.5)
+        assert time.monotonic() - started < 1.
+
+
+def test_slow_fetches_are_hedged():
+    with StubWiktionary() as stub:
+        stub.stalls = {word: 2. for word in stub.words if word != 'кичкинка'}
+        started = time.monotonic()
+        words = generate_wordlist(1, concurrency=2, url=stub.url, hedge_delay=0.1)
+        assert time.monotonic() - started < 1.
+    assert [word for word, meaning in words] == ['кичкинка']
+
+
+def test_request_timeout_counts_as_failure():
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher(stub.url, timeout=0.2)
+        stub.stalls = {'кичкинка': 1.}
+        with pytest.raises(requests.Timeout):
+            searcher.search_meaning('кичкинка')
+        assert searcher.breaker.failures == 1
+
+
+def test_cache_hits_bypass_the_breaker(tmp_path):
+    with StubWiktionary() as stub:
+        searcher = WiktionarySearcher(stub.url, cache_path=str(tmp_path))
+        meanings = searcher.search_meaning('кичкинка')
+        for _ in range(searcher.breaker.failure_threshold):
+            searcher.breaker.record_failure()
+        requests_made = len(stub.requests)
+        assert searcher.search_meaning('кичкинка') == meanings
+        # Served from the cache, which neither closes the circuit nor waits for it
+        assert searcher.breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            searcher.search_meaning('гяповать')
+        assert len(stub.requests) == requests_made
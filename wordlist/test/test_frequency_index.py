@@ -0,0 +1,42 @@
+import math
+
+import pytest
+from wordfreq import zipf_frequency
+
+from wordlist.Corpus import Corpus, CorpusWriter
+from wordlist.FrequencyIndex import FrequencyIndex
+from wordlist.Word import Word
+
+
+def test_bulk_lookup_matches_zipf_frequency():
+    words = ['шиворот', 'Слово', 'кот', 'бахтарма', 'несуществующееслово']
+    index = FrequencyIndex.from_words(words)
+    assert sorted(zip(index.zipfs, index.words)) == sorted(
+        (zipf_frequency(word, 'ru'), word) for word in words
+    )
+
+
+def test_band_ranges():
+    index = FrequencyIndex(['a', 'b', 'c', 'd', 'e'], [3., 0., 1., 2.5, 1.5])
+    assert list(index.zipfs) == [0., 1., 1.5, 2.5, 3.]
+    assert index.count(*FrequencyIndex.BANDS['hard']) == 2
+    assert index.count(*FrequencyIndex.BANDS['medium']) == 2
+    assert index.count(*FrequencyIndex.BANDS['easy']) == 1
+    assert index.count() == len(index) == 5
+    assert sorted(index.sample(10, 1., 2.5)) == ['d', 'e']
+    assert len(set(index.sample(3))) == 3
+    assert index.sample(1, 3., math.inf) == []
+
+
+def test_corpus_samples_only_words_of_the_band(tmp_path):
+    path = tmp_path / 'words.corpus'
+    with CorpusWriter(path) as writer:
+        for idx in range(100):
+            writer.add(f'word{idx}', Word.POS.Noun, idx / 20, [f'meaning{idx}'])
+        writer.add('meaningless', Word.POS.Noun, 0., [])
+    corpus = Corpus(path)
+    words = corpus.sample(21, max_zipf=1.)
+    assert sorted(words) == sorted((f'word{idx}', f'meaning{idx}') for idx in range(21))
+    with pytest.raises(LookupError):
+        corpus.sample(22, max_zipf=1.)
+    corpus.close()
@@ -0,0 +1,46 @@
+import pytest
+
+from wordlist.Generator import generate_wordlist
+
+from stub_server import StubWiktionary
+
+
+def test_serial_generation():
+    with StubWiktionary() as stub:
+        words = generate_wordlist(3, url=stub.url)
+    assert len(words) == 3
+    assert all(word != 'шиворот' for word, meaning in words)
+
+
+def test_concurrent_generation_reuses_connections():
+    with StubWiktionary(delay=0.05) as stub:
+        words = generate_wordlist(8, concurrency=4, url=stub.url)
+    assert len(words) == 8
+    assert 1 < stub.max_in_flight <= 4
+    assert len(stub.clients) <= 4
+
+
+def test_concurrent_generation_stops_after_enough_words():
+    with StubWiktionary(delay=0.05) as stub:
+        generate_wordlist(2, concurrency=4, url=stub.url)
+        fetches = len(stub.requests)
+    assert fetches <= 1 + 4 * 4
+
+
+def test_generation_with_section_fetches():
+    with StubWiktionary() as stub:
+        words = generate_wordlist(3, concurrency=2, url=stub.url, sections=True)
+    assert len(words) == 3
+
+
+def test_generation_fetches_only_words_of_the_band():
+    with StubWiktionary() as stub:
+        words = generate_wordlist(8, url=stub.url, difficulty='hard')
+    assert len(words) == 8
+    assert 'шиворот' not in stub.requests
+
+
+def test_generation_from_empty_band():
+    with StubWiktionary() as stub:
+        with pytest.raises(LookupError):
+            generate_wordlist(2, url=stub.url, difficulty='medium')
@@ -0,0 +1,101 @@
+import json
+import pathlib
+
+import pytest
+
+from wordlist.Corpus import Corpus, CorpusWriter
+from wordlist.DumpIngester import DumpIngester
+from wordlist.WiktionaryHtmlParser import WiktionaryHtmlParser
+from wordlist.Word import Word
+
+
+PAGES_PATH = pathlib.Path(__file__).parent / 'pages'
+SHORTCUTS = WiktionaryHtmlParser(
+    (PAGES_PATH / 'Викисловарь:Условные_сокращения.html').read_text(encoding='utf8')
+).shortcuts
+TITLES = ['бахтарма', 'гяповать', 'кичкинка', 'цвелый']
+
+
+def page(title):
+    return (PAGES_PATH / f'{title}.html').read_text(encoding='utf8')
+
+
+def write_dump(path, pages):
+    with open(path, 'w', encoding='utf8') as f:
+        for title, revision, html in pages:
+            f.write(json.dumps({
+                'name': title,
+                'version': {'identifier': revision},
+                'namespace': {'identifier': 0},
+                'article_body': {'html': html},
+            }, ensure_ascii=False) + '\n')
+
+
+def read_corpus(path):
+    corpus = Corpus(path)
+    entries = {entry.text: (entry.pos, entry.meanings) for entry in corpus}
+    corpus.close()
+    return entries
+
+
+def test_corpus_round_trip(tmp_path):
+    path = tmp_path / 'words.corpus'
+    entries = [
+        ('кичкинка', Word.POS.Noun, 1.5, ['маленькая девочка', 'что-то маленькое']),
+        ('гяповать', Word.POS.Verb, 0., ['кричать']),
+        ('пусто', Word.POS.Other, 3.25, []),
+    ]
+    with CorpusWriter(path) as writer:
+        for entry in entries:
+            writer.add(*entry)
+
+    corpus = Corpus(path)
+    assert len(corpus) == len(entries)
+    assert [(entry.text, entry.pos, entry.zipf, entry.meanings) for entry in corpus] == entries
+    assert corpus[1].text == 'гяповать'
+    with pytest.raises(IndexError):
+        corpus[len(entries)]
+    corpus.close()
+
+    path.write_bytes(b'not a corpus' * 4)
+    with pytest.raises(ValueError):
+        Corpus(path)
+
+
+def test_reingesting_parses_only_changed_pages(tmp_path):
+    dump_path = str(tmp_path / 'dump.ndjson')
+    corpus_path = str(tmp_path / 'words.corpus')
+    ingester = DumpIngester(SHORTCUTS, workers=1, batch_size=2)
+
+    write_dump(dump_path, [(title, 1, page(title)) for title in TITLES])
+    stats = ingester.ingest(dump_path, corpus_path)
+    assert (stats.pages, stats.skipped, stats.words) == (4, 0, 4)
+    first = read_corpus(corpus_path)
+    assert sorted(first) == TITLES
+    assert {pos for pos, meanings in first.values()} == {Word.POS.Noun}
+
+    # кичкинка has a new revision, now with the text of гяповать, and цвелый is gone from the dump
+    write_dump(dump_path, [
+        ('бахтарма', 1, page('бахтарма')), ('гяповать', 1, page('гяповать')), ('кичкинка', 2, page('гяповать')),
+    ])
+    stats = ingester.ingest(dump_path, corpus_path)
+    assert (stats.pages, stats.skipped, stats.words) == (1, 2, 3)
+    second = read_corpus(corpus_path)
+    assert sorted(second) == ['бахтарма', 'гяповать', 'кичкинка']
+    assert second['бахтарма'] == first['бахтарма']
+    assert second['кичкинка'] == first['гяповать']
+
+    stats = ingester.ingest(dump_path, corpus_path)
+    assert (stats.pages, stats.skipped, stats.words) == (0, 3, 3)
+    assert read_corpus(corpus_path) == second
+
+
+def test_keeps_only_russian_nouns(tmp_path):
+    dump_path = str(tmp_path / 'dump.ndjson')
+    corpus_path = str(tmp_path / 'words.corpus')
+    foreign = page('бахтарма').replace('id="Русский">Русский', 'id="Английский">Английский')
+    verb = page('гяповать').replace('Существительное, неодушевлённое, женский род', 'Глагол, несовершенный вид')
+    write_dump(dump_path, [('бахтарма', 1, foreign), ('гяповать', 1, verb), ('кичкинка', 1, page('кичкинка'))])
+    stats = DumpIngester(SHORTCUTS, workers=1).ingest(dump_path, corpus_path)
+    assert (stats.pages, stats.words) == (3, 1)
+    assert list(read_corpus(corpus_path)) == ['кичкинка']
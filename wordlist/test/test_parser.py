@@ -0,0 +1,25 @@
+import pathlib
+
+import pytest
+
+from wordlist.WiktionaryHtmlParser import WiktionaryHtmlParser
+
+
+PAGES_PATH = pathlib.Path(__file__).parent / 'pages'
+SHORTCUTS = (PAGES_PATH / 'Викисловарь:Условные_сокращения.html').read_text(encoding='utf8')
+WORD_PAGES = [path for path in PAGES_PATH.glob('*.html') if ':' not in path.stem]
+
+
+@pytest.mark.parametrize('path', WORD_PAGES, ids=lambda path: path.stem)
+def test_fast_parse_matches_full_parse(path):
+    html_doc = path.read_text(encoding='utf8')
+    full = WiktionaryHtmlParser(SHORTCUTS).parse(html_doc)
+    fast = WiktionaryHtmlParser(SHORTCUTS, fast=True).parse(html_doc)
+    assert (fast.text, fast.grammar, fast.meanings) == (full.text, full.grammar, full.meanings)
+
+
+def test_fast_parse_falls_back_to_full_parse():
+    html_doc = (PAGES_PATH / 'кичкинка.html').read_text(encoding='utf8').replace('</ol>', '')
+    full = WiktionaryHtmlParser(SHORTCUTS).parse(html_doc)
+    fast = WiktionaryHtmlParser(SHORTCUTS, fast=True).parse(html_doc)
+    assert fast.meanings == full.meanings
@@ -0,0 +1,51 @@
+from wordlist.WiktionarySearcher import WiktionarySearcher
+
+from stub_server import StubWiktionary
+
+
+def test_section_fetch_matches_page_fetch():
+    with StubWiktionary() as stub:
+        for word in stub.words:
+            page_meanings = WiktionarySearcher(stub.url).search_meaning(word)
+            assert WiktionarySearcher(stub.url, sections=True).search_meaning(word) == page_meanings
+
+
+def test_section_fetch_of_random_word():
+    with StubWiktionary() as stub:
+        word = WiktionarySearcher(stub.url, sections=True).generate_word()
+    assert word.text in stub.words
+    assert stub.requests[-3:] == [word.text] * 3
+
+
+def test_section_fetch_of_missing_word():
+    with StubWiktionary() as stub:
+        assert WiktionarySearcher(stub.url, sections=True).search_meaning('несуществующее') is None
+
+
+def test_section_fetch_sends_fewer_bytes():
+    with StubWiktionary() as stub:
+        page_searcher = WiktionarySearcher(stub.url)
+        section_searcher = WiktionarySearcher(stub.url, sections=True)
+        stub.bytes_sent = 0
+        page_searcher.search_meaning('кичкинка')
+        page_bytes, stub.bytes_sent = stub.bytes_sent, 0
+        requests_before = len(stub.requests)
+        section_searcher.search_meaning('кичкинка')
+        # The section list and the meanings
+        assert len(stub.requests) == requests_before + 2
+        assert stub.bytes_sent <= page_bytes / 5
+        stub.bytes_sent = 0
+        section_searcher.search_meaning('кичкинка')
+        # Only the meanings, once the section list is known
+        assert len(stub.requests) == requests_before + 3
+        assert stub.bytes_sent <= page_bytes / 10
+
+
+def test_frequency_index_lists_every_page_of_the_category(tmp_path):
+    with StubWiktionary() as stub:
+        index = WiktionarySearcher(stub.url, cache_path=str(tmp_path)).frequency_index()
+        assert sorted(index.words) == sorted(stub.words)
+        listings = stub.requests.count(WiktionarySearcher.nouns_category)
+        assert listings == -(-len(stub.words) // stub.category_page_size)
+        WiktionarySearcher(stub.url, cache_path=str(tmp_path)).frequency_index()
+        assert stub.requests.count(WiktionarySearcher.nouns_category) == listings
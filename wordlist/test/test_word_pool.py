@@ -0,0 +1,94 @@
+import itertools
+import time
+
+from wordlist.WordPool import WordPool
+
+
+WORDS = [(f'слово{idx}', f'значение {idx}') for idx in range(8)]
+
+
+class Source(object):
+    def __init__(self, fail=False):
+        self.words = itertools.cycle(WORDS)
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, n):
+        if self.fail:
+            raise ConnectionError('wiktionary is down')
+        self.batches.append(n)
+        return [next(self.words) for _ in range(n)]
+
+
+def wait_for(predicate, timeout=5.):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_refills_between_watermarks():
+    source = Source()
+    pool = WordPool(source, low_watermark=4, high_watermark=8, refill_batch=3)
+    pool.start()
+    try:
+        wait_for(lambda: pool.stats['size'] == 8)
+        assert source.batches == [3, 3, 2]
+        # Staying at the low watermark doesn't refill
+        pool.take(4)
+        time.sleep(0.1)
+        assert pool.stats['size'] == 4
+        pool.take(1)
+        wait_for(lambda: pool.stats['size'] == 8)
+        assert source.batches == [3, 3, 2, 3, 2]
+    finally:
+        pool.stop()
+
+
+def test_counts_hits_and_misses():
+    pool = WordPool(Source(), low_watermark=2, high_watermark=4)
+    pool.start()
+    try:
+        wait_for(lambda: pool.stats['size'] == 4)
+        assert len(pool.take(3)) == 3
+        assert pool.stats['hits'] == 3
+        assert pool.stats['misses'] == 0
+    finally:
+        pool.stop()
+    pool = WordPool(Source())
+    assert len(pool.take(2)) == 2
+    assert pool.stats == {'size': 0, 'hits': 0, 'misses': 2}
+
+
+def test_does_not_repeat_words_in_a_room():
+    pool = WordPool(Source())
+    words = pool.take(4, 'room') + pool.take(4, 'room')
+    assert sorted(words) == sorted(WORDS)
+    # Other rooms may get the same words
+    assert pool.take(4, 'other') == WORDS[:4]
+
+
+def test_repeats_words_when_no_new_ones_are_generated():
+    pool = WordPool(Source())
+    pool.take(8, 'room')
+    assert pool.take(2, 'room') == WORDS[:2]
+
+
+def test_forgets_rooms():
+    pool = WordPool(Source())
+    pool.take(2, 'room')
+    pool.forget('room')
+    pool.forget('unknown')
+    assert 'room' not in pool.history
+    assert pool.take(2, 'room') == WORDS[2:4]
+
+
+def test_generates_in_place_when_the_pool_is_empty():
+    fallback = [('запасное', 'значение')]
+    pool = WordPool(Source(fail=True), retry_delay=0.01, in_place_source=lambda n: fallback * n)
+    pool.start()
+    try:
+        assert pool.take(1, 'room') == fallback
+        assert pool.stats == {'size': 0, 'hits': 0, 'misses': 1}
+    finally:
+        pool.stop()